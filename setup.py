@@ -126,7 +126,7 @@ case second 'm'.  Any other spelling is incorrect.""",
         'python-dateutil>=2.0',
         'passlib',
         'requests',
-        'sqlalchemy>=1.4.0',
+        'sqlalchemy>=1.4.33',
         'zope.component',
         'zope.configuration',
         'zope.event',
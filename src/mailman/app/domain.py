@@ -17,8 +17,17 @@
 
 """Application level domain support."""
 
-from mailman.interfaces.domain import DomainDeletingEvent
-from mailman.interfaces.listmanager import IListManager
+from mailman.interfaces.domain import (
+    DomainCreatedEvent,
+    DomainDeletedEvent,
+    DomainDeletingEvent,
+)
+from mailman.interfaces.listmanager import (
+    IListManager,
+    ListCreatedEvent,
+    ListDeletedEvent,
+)
+from mailman.model.domain import lists_generation
 from public import public
 from zope.component import getUtility
 
@@ -32,3 +41,11 @@ def handle_DomainDeletingEvent(event):
     list_manager = getUtility(IListManager)
     for mailing_list in event.domain.mailing_lists:
         list_manager.delete(mailing_list)
+
+
+@public
+def handle_ListOrDomainEvent(event):
+    """Make the LMTP servers forget the addresses they resolved."""
+    if isinstance(event, (ListCreatedEvent, ListDeletedEvent,
+                          DomainCreatedEvent, DomainDeletedEvent)):
+        lists_generation.bump()
@@ -31,6 +31,7 @@ def initialize():
     """Initialize global event subscribers."""
     event.subscribers.extend([
         domain.handle_DomainDeletingEvent,
+        domain.handle_ListOrDomainEvent,
         i18n.handle_ConfigurationUpdatedEvent,
         language_manager.handle_ConfigurationUpdatedEvent,
         membership.handle_SubscriptionEvent,
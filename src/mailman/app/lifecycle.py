@@ -22,6 +22,7 @@ import shutil
 import logging
 
 from contextlib import suppress
+from lazr.config import as_timedelta
 from mailman.config import config
 from mailman.interfaces.address import IEmailValidator
 from mailman.interfaces.domain import (
@@ -33,6 +34,7 @@ from mailman.interfaces.mailinglist import InvalidListNameError
 from mailman.interfaces.member import MemberRole
 from mailman.interfaces.styles import IStyleManager
 from mailman.interfaces.usermanager import IUserManager
+from mailman.model.generation import GenerationCounter
 from mailman.utilities.modules import call_name
 from public import public
 from zope.component import getUtility
@@ -42,6 +44,17 @@ log = logging.getLogger('mailman.error')
 # These are the only characters allowed in list names.  A more restrictive
 # class can be specified in config.mailman.listname_chars.
 _listname_chars = re.compile('[-_.+=!$*{}~0-9a-z]', re.IGNORECASE)
+# Bumped when mailing lists are created or deleted and the task runner is to
+# regenerate the MTA support files later, see `[mta]regenerate_delay`.
+mta_generation = GenerationCounter('mta')
+public(mta_generation=mta_generation)
+
+
+def _mta_changed(method, mlist):
+    if as_timedelta(config.mta.regenerate_delay).total_seconds() > 0:
+        mta_generation.bump()
+    else:
+        getattr(call_name(config.mta.incoming), method)(mlist)
 
 
 @public
@@ -99,7 +112,7 @@ def create_list(fqdn_listname, owners=None, style_name=None):
     if style is not None:
         style.apply(mlist)
     # Coordinate with the MTA, as defined in the configuration file.
-    call_name(config.mta.incoming).create(mlist)
+    _mta_changed('create', mlist)
     # Create any owners that don't yet exist, and subscribe all addresses as
     # owners of the mailing list.
     user_manager = getUtility(IUserManager)
@@ -121,4 +134,4 @@ def remove_list(mlist):
     # Delete the mailing list from the database.
     getUtility(IListManager).delete(mlist)
     # Do the MTA-specific list deletion tasks
-    call_name(config.mta.incoming).delete(mlist)
+    _mta_changed('delete', mlist)
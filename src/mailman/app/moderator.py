@@ -199,7 +199,7 @@ def handle_message(mlist, id, action, comment=None, forward=None):
             pendings.find(pend_type='held message', mlist=mlist))
         if len(all_held_pendings) == 0:
             # This is mostly meant to handle old held message pendings
-            # that don't have the list_id pendedkeyvalue, which makes it
+            # that don't have a list_id, which makes it
             # very expensive to find the right pending to delete.
             all_held_pendings = pendings.find(pend_type='held message')
         for token, data in all_held_pendings:
@@ -24,6 +24,7 @@ import unittest
 from mailman.app.lifecycle import (
     create_list,
     InvalidListNameError,
+    mta_generation,
     remove_list,
 )
 from mailman.interfaces.address import InvalidEmailAddressError
@@ -34,6 +35,21 @@ from mailman.testing.layers import ConfigLayer
 from zope.component import getUtility
 
 
+class RecordingMTA:
+    """Record the calls to the MTA."""
+
+    calls = []
+
+    def create(self, mlist):
+        self.calls.append(('create', mlist.list_id))
+
+    def delete(self, mlist):
+        self.calls.append(('delete', mlist.list_id))
+
+    def regenerate(self, directory=None):
+        self.calls.append(('regenerate', None))
+
+
 class TestLifecycle(unittest.TestCase):
     """Test the high level list lifecycle API."""
 
@@ -99,3 +115,35 @@ class TestLifecycle(unittest.TestCase):
         shutil.rmtree(mlist.data_path)
         remove_list(mlist)
         self.assertIsNone(getUtility(IListManager).get('ant@example.com'))
+
+
+class TestMTAChanges(unittest.TestCase):
+    """Test telling the MTA about created and deleted mailing lists."""
+
+    layer = ConfigLayer
+
+    def setUp(self):
+        RecordingMTA.calls = []
+
+    @configuration('mta', incoming='mailman.app.tests.test_lifecycle.'
+                   'RecordingMTA')
+    def test_tell_mta(self):
+        mlist = create_list('ant@example.com')
+        remove_list(mlist)
+        self.assertEqual(RecordingMTA.calls, [
+            ('create', 'ant.example.com'),
+            ('delete', 'ant.example.com'),
+            ])
+
+    @configuration('mta', incoming='mailman.app.tests.test_lifecycle.'
+                   'RecordingMTA', regenerate_delay='10s')
+    def test_regenerate_later(self):
+        # With a regeneration delay, the task runner regenerates the MTA
+        # support files later.
+        generation = mta_generation.get()
+        create_list('ant@example.com')
+        self.assertNotEqual(mta_generation.get(), generation)
+        generation = mta_generation.get()
+        remove_list(create_list('bee@example.com'))
+        self.assertNotEqual(mta_generation.get(), generation)
+        self.assertEqual(RecordingMTA.calls, [])
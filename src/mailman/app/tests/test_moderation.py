@@ -258,7 +258,7 @@ Message-ID: <alpha>
     def test_all_pendings_removed_old(self):
         # This is different from the testcase above in that it
         # handles the old style HeldMessagePendable where the
-        # list_id is not added to pendedkeyvalue. It is only
+        # list_id is not added to the pendable. It is only
         # meant so that new versions can handle old pendables.
         request_id = hold_message(self._mlist, self._msg)
         # The hold chain does more.
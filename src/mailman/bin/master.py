@@ -17,8 +17,10 @@
 
 """Master subprocess watcher."""
 
+import gc
 import os
 import sys
+import time
 import click
 import signal
 import socket
@@ -27,11 +29,12 @@ import logging
 from datetime import timedelta
 from enum import Enum
 from flufl.lock import Lock, NotLockedError, TimeOutError
-from lazr.config import as_boolean
+from lazr.config import as_boolean, as_timedelta
 from mailman.config import config
 from mailman.core.i18n import _
 from mailman.core.initialize import initialize
 from mailman.core.logging import reopen
+from mailman.utilities.modules import find_name
 from mailman.utilities.options import I18nCommand, validate_runner_spec
 from mailman.version import MAILMAN_VERSION_FULL
 from public import public
@@ -41,6 +44,8 @@ DOT = '.'
 LOCK_LIFETIME = timedelta(days=1, hours=6)
 SECONDS_IN_A_DAY = 86400
 SUBPROC_START_WAIT = timedelta(seconds=20)
+# How often the master looks for exited runners while it autoscales queues.
+AUTOSCALE_POLL_SECONDS = 1
 
 # Environment variables to forward into subprocesses.
 PRESERVE_ENVS = (
@@ -66,6 +71,17 @@ PRESERVE_ENVS = (
     'PYTHONHOME',
     )
 
+# The signals the master handles itself.  These are blocked while forking
+# runners directly, until the child has reset their handlers.
+MASTER_SIGNALS = {
+    signal.SIGALRM,
+    signal.SIGCHLD,
+    signal.SIGHUP,
+    signal.SIGINT,
+    signal.SIGTERM,
+    signal.SIGUSR1,
+    }
+
 
 @public
 class WatcherState(Enum):
@@ -236,6 +252,14 @@ class PIDWatcher:
         """
         return self._pids.pop(pid)
 
+    def items(self):
+        """Iterate over the process ids and their information.
+
+        :return: An iterator over (process-id, process-information) pairs.
+        """
+        for pid, info in list(self._pids.items()):
+            yield pid, info
+
     def drop(self, pid):
         """Remove and return existing process information.
 
@@ -252,6 +276,21 @@ class PIDWatcher:
         return self._pids.pop(pid, None)
 
 
+class Autoscaler:
+    """The autoscaling settings and state of one queue."""
+
+    def __init__(self, name, runner_config):
+        self.name = name
+        self.minimum = int(runner_config.instances)
+        self.maximum = int(runner_config.max_instances)
+        self.backlog = int(runner_config.autoscale_backlog)
+        self.interval = as_timedelta(
+            runner_config.autoscale_interval).total_seconds()
+        # The depth of the queue at the last check.
+        self.depth = None
+        self.next_check = time.monotonic() + self.interval
+
+
 @public
 class Loop:
     """Main control loop class."""
@@ -262,6 +301,11 @@ class Loop:
         self._restartable = restartable
         self._config_file = config_file
         self._kids = PIDWatcher()
+        self._fork = as_boolean(config.mailman.fork_runners)
+        # Runner name -> Autoscaler, for the autoscaled queues.
+        self._autoscaled = {}
+        # The process ids of runners stopped because their queue shrank.
+        self._stopping = set()
 
     def install_signal_handlers(self):
         """Install various signals handlers for control from the master."""
@@ -343,6 +387,8 @@ class Loop:
         :return: The process id of the child runner.
         :rtype: int
         """
+        if self._fork:
+            return self._fork_runner(spec)
         pid = os.fork()
         if pid:
             # Parent.
@@ -382,6 +428,136 @@ class Loop:
         # We should never get here.
         raise RuntimeError('os.execle() failed')
 
+    def _fork_runner(self, spec):
+        """Start a runner in a child process without exec'ing.
+
+        The child inherits the master's initialized system, so it only has to
+        re-create the resources which can't be shared between processes.
+
+        :param spec: A runner spec, e.g. name:slice:count
+        :type spec: string
+        :return: The process id of the child runner.
+        :rtype: int
+        """
+        blocked = signal.pthread_sigmask(signal.SIG_BLOCK, MASTER_SIGNALS)
+        pid = os.fork()
+        if pid:
+            # Parent.
+            signal.pthread_sigmask(signal.SIG_SETMASK, blocked)
+            return pid
+        # Child.  Never return from here, or the child would go on running
+        # the master's code.
+        status = 1
+        try:
+            signal.alarm(0)
+            for signum in MASTER_SIGNALS:
+                signal.signal(signum, signal.SIG_DFL)
+            signal.pthread_sigmask(signal.SIG_SETMASK, blocked)
+            os.environ['MAILMAN_UNDER_MASTER_CONTROL'] = '1'
+            reopen()
+            config.db.after_fork()
+            # Avoid a circular import.
+            from mailman.bin.runner import make_runner
+            name, slice_number, count = spec.split(':')
+            runner = make_runner(name, int(slice_number), int(count))
+            runner.set_signals()
+            self._log.info('{} runner started.'.format(runner.name))
+            runner.run()
+            self._log.info('{} runner exiting.'.format(runner.name))
+            status = runner.status
+        except SystemExit as error:
+            status = error.code if isinstance(error.code, int) else 1
+        except BaseException:
+            self._log.exception('Runner {} failed'.format(spec))
+        finally:
+            logging.shutdown()
+            os._exit(status)
+
+    def _recover(self, name):
+        """Recover the backup files of an autoscaled queue.
+
+        Only the files which aren't claimed by a live runner are recovered.
+
+        :param name: The runner name.
+        :type name: string
+        """
+        runner_config = getattr(config, 'runner.' + name)
+        switchboard_class = find_name(runner_config.switchboard)
+        switchboard_class(
+            name, config.switchboards[name].queue_directory,
+            recover=True, lease=True)
+
+    def _start_worker(self, name, slot, restarts=0):
+        """Start a runner for an autoscaled queue.
+
+        :param name: The runner name.
+        :type name: string
+        :param slot: The number of this runner, used in the logs.
+        :type slot: int
+        :param restarts: The number of times this runner was restarted.
+        :type restarts: int
+        """
+        # The runners of an autoscaled queue all process the whole queue.
+        pid = self._start_runner('{0}:0:1'.format(name))
+        info = (name, slot, self._autoscaled[name].maximum, restarts)
+        self._kids.add(pid, info)
+        return pid
+
+    def _autoscale(self):
+        """Grow or shrink the autoscaled queues' runners as needed."""
+        now = time.monotonic()
+        for autoscaler in self._autoscaled.values():
+            if now < autoscaler.next_check:
+                continue
+            autoscaler.next_check = now + autoscaler.interval
+            name = autoscaler.name
+            workers = {
+                info[1]: pid for pid, info in self._kids.items()
+                if info[0] == name and pid not in self._stopping
+                }
+            depth = len(config.switchboards[name].files)
+            previous, autoscaler.depth = autoscaler.depth, depth
+            # The net number of files processed since the last check.  If
+            # this is less than what's in the queue now, the queue won't be
+            # empty by the next check.
+            drained = (0 if previous is None else previous - depth)
+            if (depth > autoscaler.backlog * len(workers) and
+                    drained < depth and
+                    len(workers) < autoscaler.maximum):
+                slot = min(set(range(autoscaler.maximum)) - set(workers))
+                self._log.info(
+                    'Queue {0} holds {1:d} files, starting runner {2:d}/{3:d}'
+                    .format(name, depth, slot + 1, autoscaler.maximum))
+                self._start_worker(name, slot)
+            elif depth == 0 and len(workers) > autoscaler.minimum:
+                slot = max(workers)
+                pid = workers[slot]
+                self._log.info(
+                    'Queue {0} is empty, stopping runner {1:d}/{2:d}'.format(
+                        name, slot + 1, autoscaler.maximum))
+                self._stopping.add(pid)
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:              # pragma: nocover
+                    pass
+
+    def _wait(self):
+        """Wait for a runner to exit.
+
+        While waiting, the autoscaled queues are checked.
+
+        :return: The process id and exit status of the runner.
+        :rtype: 2-tuple
+        """
+        if not self._autoscaled:
+            return os.wait()
+        while True:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid != 0:
+                return pid, status
+            self._autoscale()
+            time.sleep(AUTOSCALE_POLL_SECONDS)
+
     def start_runners(self, runner_names=None):
         """Start all the configured runners.
 
@@ -397,6 +573,16 @@ class Loop:
                     'Unexpected runner configuration section name: {}'.format(
                         runner_config.name))
                 runner_names.append(runner_config.name[7:])
+        if self._fork:
+            # Import the runner classes once, here, so that all the runners
+            # share the pages of the modules they need.  Keep the garbage
+            # collector from touching the objects which exist at this point,
+            # which would copy their pages into every runner.
+            for name in runner_names:
+                runner_config = getattr(config, 'runner.' + name)
+                if as_boolean(runner_config.start):
+                    find_name(runner_config['class'])
+            gc.freeze()
         # For each runner we want to start, find their config section, which
         # will tell us the name of the class to instantiate, along with the
         # number of hash space slices to manage.
@@ -407,8 +593,16 @@ class Loop:
             if not as_boolean(runner_config.start):
                 continue
             # Find out how many runners to instantiate.  This must be a power
-            # of 2.
+            # of 2, unless the queue is autoscaled.
             count = int(runner_config.instances)
+            if runner_config.path and int(runner_config.max_instances) > count:
+                self._autoscaled[name] = Autoscaler(name, runner_config)
+                # Before any runner of the queue starts, pick up the work of
+                # runners which died.
+                self._recover(name)
+                for slot in range(count):
+                    self._start_worker(name, slot)
+                continue
             assert (count & (count - 1)) == 0, (
                 'Runner "{0}", not a power of 2: {1}'.format(name, count))
             for slice_number in range(count):
@@ -444,7 +638,7 @@ class Loop:
         self._pause()
         while True:
             try:
-                pid, status = os.wait()
+                pid, status = self._wait()
             except ChildProcessError:
                 # No children?  We're done.
                 break
@@ -473,6 +667,13 @@ class Loop:
             rname, slice_number, count, restarts = self._kids.pop(pid)
             config_name = 'runner.' + rname
             restart = self._restartable
+            if pid in self._stopping:
+                # We stopped this one because its queue shrank.
+                self._stopping.discard(pid)
+                restart = False
+            if rname in self._autoscaled:
+                # Pick up the work the runner left behind.
+                self._recover(rname)
             # Don't restart if the runner explicitly asks not to be
             # restarted.
             if why == signal.SIGTERM:
@@ -502,7 +703,9 @@ Runner {0} reached maximum restart limit of {1:d}, not restarting.""".format(
                          rname, max_restarts))
             # Now perhaps restart the process unless it exited with a
             # SIGTERM or we aren't restarting.
-            if restart:
+            if restart and rname in self._autoscaled:
+                self._start_worker(rname, slice_number, restarts)
+            elif restart:
                 spec = '{0}:{1:d}:{2:d}'.format(rname, slice_number, count)
                 new_pid = self._start_runner(spec)
                 new_info = (rname, slice_number, count, restarts)
@@ -544,7 +747,8 @@ Runner {0} reached maximum restart limit of {1:d}, not restarting.""".format(
     Start and watch the configured runners, ensuring that they stay alive and
     kicking.  Each runner is forked and exec'd in turn, with the master waiting
     on their process ids.  When it detects a child runner has exited, it may
-    restart it.
+    restart it.  With the fork_runners setting, runners are forked from the
+    initialized master without exec'ing.
 
     The runners respond to SIGINT, SIGTERM, SIGUSR1 and SIGHUP.  SIGINT,
     SIGTERM and SIGUSR1 all cause a runner to exit cleanly.  The master will
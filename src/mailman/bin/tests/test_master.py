@@ -17,6 +17,7 @@
 
 """Test master watcher utilities."""
 
+import gc
 import os
 import time
 import signal
@@ -31,7 +32,13 @@ from importlib.resources import path
 from io import StringIO
 from mailman.bin import master
 from mailman.config import config
-from mailman.testing.helpers import LogFileMark, TestableMaster
+from mailman.testing.helpers import (
+    configuration,
+    get_queue_messages,
+    LogFileMark,
+    specialized_message_from_string as mfs,
+    TestableMaster,
+)
 from mailman.testing.layers import ConfigLayer
 from unittest.mock import patch
 
@@ -351,3 +358,136 @@ Exiting.
                 pass
         m.thread.join()
         m.cleanup()
+
+    @configuration('mailman', fork_runners='yes')
+    def test_fork_runners(self):
+        # The runners can be forked from the master without exec'ing a new
+        # interpreter.
+        self.addCleanup(gc.unfreeze)
+        m = TestableMaster()
+        mark = LogFileMark('mailman.runner')
+        m.start('command')
+        kids = list(m._kids)
+        self.assertEqual(len(kids), 1)
+        old_kid = kids[0]
+        start = time.time()
+        while ("runner started." not in mark.read()
+               and time.time() - start < 10):
+            time.sleep(0.1)
+        # The runner is still running this interpreter.
+        with open('/proc/{}/cmdline'.format(old_kid), 'rb') as fp:
+            kid_cmdline = fp.read()
+        with open('/proc/self/cmdline', 'rb') as fp:
+            self.assertEqual(kid_cmdline, fp.read())
+        mark = LogFileMark('mailman.runner')
+        start = time.time()
+        while old_kid in set(m._kids) and time.time() - start < 10:
+            time.sleep(0.1)
+            m._sigterm_handler(None, None)
+        start = time.time()
+        needle = "command runner caught SIGTERM.  Stopping."
+        while (needle not in mark.read()
+               and time.time() - start < 10):
+            time.sleep(0.1)
+        self.assertIn(needle, mark.read())
+        m.thread.join()
+        self.assertEqual(len(list(m._kids)), 0)
+        m.cleanup()
+
+
+class TestAutoscaling(unittest.TestCase):
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._loop = master.Loop(restartable=False)
+        self._pids = iter(range(10000, 10100))
+        self._killed = []
+        start_runner = patch.object(
+            self._loop, '_start_runner',
+            side_effect=lambda spec: next(self._pids))
+        kill = patch('mailman.bin.master.os.kill',
+                     side_effect=lambda pid, signum: self._killed.append(pid))
+        with ExitStack() as resources:
+            self._specs = resources.enter_context(start_runner)
+            resources.enter_context(kill)
+            self.addCleanup(resources.pop_all().close)
+        self._switchboard = config.switchboards['command']
+
+    def _enqueue(self, count):
+        for n in range(count):
+            self._switchboard.enqueue(mfs("""\
+From: anne@example.com
+Message-ID: <{}>
+
+""".format(len(self._switchboard.files))))
+
+    def _process(self, count):
+        for filebase in self._switchboard.files[:count]:
+            self._switchboard.dequeue(filebase)
+            self._switchboard.finish(filebase)
+
+    def _check(self):
+        # Force a check of the autoscaled queues.
+        for autoscaler in self._loop._autoscaled.values():
+            autoscaler.next_check = 0
+        self._loop._autoscale()
+
+    def _workers(self):
+        return sorted(info[1] for pid, info in self._loop._kids.items()
+                      if pid not in self._loop._stopping)
+
+    @configuration('runner.command', instances=1, max_instances=3,
+                   autoscale_backlog=2)
+    def test_grow_and_shrink(self):
+        self._loop.start_runners(['command'])
+        self.assertEqual(self._workers(), [0])
+        # The runners process the whole queue.
+        self._specs.assert_called_once_with('command:0:1')
+        # A small queue doesn't need another runner.
+        self._enqueue(2)
+        self._check()
+        self.assertEqual(self._workers(), [0])
+        # A deep queue does.
+        self._enqueue(3)
+        self._check()
+        self.assertEqual(self._workers(), [0, 1])
+        self._check()
+        self.assertEqual(self._workers(), [0, 1, 2])
+        # But never more than the maximum.
+        self._check()
+        self.assertEqual(self._workers(), [0, 1, 2])
+        # When the queue is empty, the runners are stopped one by one, down
+        # to the minimum.
+        get_queue_messages('command')
+        self._check()
+        self.assertEqual(self._workers(), [0, 1])
+        self._check()
+        self._check()
+        self.assertEqual(self._workers(), [0])
+        self.assertEqual(self._killed, [10002, 10001])
+
+    @configuration('runner.command', instances=1, max_instances=3,
+                   autoscale_backlog=1)
+    def test_draining_queue_does_not_grow(self):
+        # A deep queue which is being drained quickly enough doesn't need
+        # more runners.
+        self._loop.start_runners(['command'])
+        self._enqueue(10)
+        self._check()
+        self.assertEqual(self._workers(), [0, 1])
+        # The runners processed 6 files since the last check, more than the
+        # 4 left in the queue.
+        self._process(6)
+        self._check()
+        self.assertEqual(self._workers(), [0, 1])
+
+    @configuration('runner.command', instances=1, max_instances=2)
+    def test_recover_on_start(self):
+        # Backup files left behind by dead runners are recovered before the
+        # runners of an autoscaled queue are started.
+        self._enqueue(1)
+        filebase = self._switchboard.files[0]
+        self._switchboard.dequeue(filebase)
+        self._loop.start_runners(['command'])
+        self.assertEqual(self._switchboard.files, [filebase])
+        self.assertEqual(self._switchboard.get_files('.bak'), [])
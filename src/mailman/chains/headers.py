@@ -28,6 +28,7 @@ from mailman.core.i18n import _
 from mailman.interfaces.chain import LinkAction
 from mailman.interfaces.rules import IRule
 from public import public
+from weakref import WeakKeyDictionary
 from zope.interface import implementer
 
 
@@ -43,7 +44,7 @@ def _make_rule_name(suffix):
     return 'header-match-{}'.format(suffix)
 
 
-def make_link(header, pattern, chain=None, suffix=None):
+def make_link(header, pattern, chain=None, suffix=None, matcher=None):
     """Create a Link object.
 
     The link action is to defer by default, since at the end of all the
@@ -60,13 +61,15 @@ def make_link(header, pattern, chain=None, suffix=None):
     :type chain: string
     :param suffix: An optional name suffix for the rule.
     :type suffix: string
+    :param matcher: The optional `HeaderMatcher` the rule belongs to.
+    :type matcher: `HeaderMatcher`
     :return: The link representing this rule check.
     :rtype: `ILink`
     """
     rule_name = _make_rule_name(suffix)
     if rule_name in config.rules:
         del config.rules[rule_name]
-    rule = HeaderMatchRule(header, pattern, suffix)
+    rule = HeaderMatchRule(header, pattern, suffix, matcher)
     if chain is None:
         return Link(rule)
     return Link(rule, LinkAction.jump, chain)
@@ -76,9 +79,15 @@ def make_link(header, pattern, chain=None, suffix=None):
 class HeaderMatchRule:
     """Header matching rule used by header-match chain."""
 
-    def __init__(self, header, pattern, suffix=None):
+    def __init__(self, header, pattern, suffix=None, matcher=None):
         self.header = header
         self.pattern = pattern
+        self.matcher = matcher
+        try:
+            self.cre = re.compile(pattern, re.IGNORECASE)
+        except re.error as error:
+            self.cre = None
+            self.error = error.msg
         self.name = _make_rule_name(suffix)
         self.description = '{}: {}'.format(header, pattern)
         # XXX I think we should do better here, somehow recording that a
@@ -96,34 +105,123 @@ class HeaderMatchRule:
 
     def check(self, mlist, msg, msgdata):
         """See `IRule`."""
-        # Collect all the headers in all subparts.
-        headers = []
-        for p in msg.walk():
-            headers.extend(p.get_all(self.header, []))
-        for value in headers:
-            if isinstance(value, Header):
-                value = value.encode()
-            # RFC2047 decode, but don't change value as it affects the msg.
-            new_value = str(make_header(decode_header(value)))
-            try:
-                mo = re.search(self.pattern, new_value, re.IGNORECASE)
-            except re.error as error:
+        if self.matcher is None:
+            values = _header_values(msg, self.header)
+        else:
+            values = self.matcher.candidates(msg, self.header)
+        for value, new_value in values:
+            if self.cre is None:
                 log.error(
                     "Invalid regexp '{}' in header_matches for {}: {}".format(
-                        self.pattern, mlist.list_id, error.msg))
+                        self.pattern, mlist.list_id, self.error))
                 return False
-            else:
-                if mo:
-                    msgdata['moderation_sender'] = msg.sender
-                    with _.defer_translation():
-                        # This will be translated at the point of use.
-                        msgdata.setdefault('moderation_reasons', []).append(
-                            (_('Header "{}" matched a header rule'),
-                             str(self.header) + ": " + str(value)))
-                    return True
+            if self.cre.search(new_value):
+                msgdata['moderation_sender'] = msg.sender
+                with _.defer_translation():
+                    # This will be translated at the point of use.
+                    msgdata.setdefault('moderation_reasons', []).append(
+                        (_('Header "{}" matched a header rule'),
+                         str(self.header) + ": " + str(value)))
+                return True
         return False
 
 
+def _header_values(msg, header):
+    """Return the values of a header in all the parts of a message.
+
+    :param msg: The message.
+    :param header: The header field name.
+    :return: A list of (value, decoded value) pairs, where value is the
+        header value as a string, and decoded value is its RFC 2047 decoding.
+    """
+    values = []
+    for part in msg.walk():
+        for value in part.get_all(header, []):
+            if isinstance(value, Header):
+                value = value.encode()
+            # RFC2047 decode, but don't change value as it affects the msg.
+            values.append((value, str(make_header(decode_header(value)))))
+    return values
+
+
+@public
+class HeaderMatcher:
+    """The compiled header matches of a mailing list or the configuration.
+
+    Every header match still gets its own rule and link, so rule hits and
+    jump chains are unchanged.  The patterns are compiled only once, and the
+    patterns for the same header are also combined into a single
+    alternation.  The header values are decoded and searched with the
+    alternation once per message, and the rules only search the values which
+    matched it.
+    """
+
+    def __init__(self, entries):
+        """Compile the header matches.
+
+        :param entries: The header matches, as (header, pattern, chain,
+            suffix) tuples, in order.  These are the arguments to
+            `make_link()`.
+        :type entries: tuple
+        """
+        self.key = entries
+        self.links = [
+            make_link(header, pattern, chain, suffix, self)
+            for header, pattern, chain, suffix in entries
+            ]
+        by_header = {}
+        for link in self.links:
+            by_header.setdefault(
+                link.rule.header.lower(), []).append(link.rule.cre)
+        # Patterns with groups may contain back references, which would
+        # refer to the wrong group in the alternation.  Such headers, and
+        # headers with an invalid pattern, are not filtered.
+        self._filters = {}
+        for header, cres in by_header.items():
+            if any(cre is None or cre.groups > 0 for cre in cres):
+                continue
+            try:
+                self._filters[header] = re.compile('|'.join(
+                    '(?:{})'.format(cre.pattern) for cre in cres),
+                    re.IGNORECASE)
+            except re.error:
+                # Some inline flags are only allowed at the start of a
+                # pattern.
+                pass
+        self._candidates = WeakKeyDictionary()
+
+    def register(self):
+        """Register the rules, in case they were removed."""
+        for link in self.links:
+            config.rules[link.rule.name] = link.rule
+
+    def forget(self, msg):
+        """Forget the candidate values of a message.
+
+        :param msg: The message which is about to be checked (again).
+        """
+        self._candidates.pop(msg, None)
+
+    def candidates(self, msg, header):
+        """Return the header values which may match the header's patterns.
+
+        :param msg: The message.
+        :param header: The header field name.
+        :return: The (value, decoded value) pairs which matched the
+            combined patterns of the header.
+        """
+        key = header.lower()
+        values = self._candidates.setdefault(msg, {})
+        if key not in values:
+            cre = self._filters.get(key)
+            values[key] = [
+                (value, new_value)
+                for value, new_value in _header_values(msg, header)
+                if cre is None or cre.search(new_value)
+                ]
+        return values[key]
+
+
 @public
 class HeaderMatchChain(Chain):
     """Default header matching chain.
@@ -138,6 +236,10 @@ class HeaderMatchChain(Chain):
         # configuration file, the database, and any explicitly added header
         # checks (via the .extend() method).
         self._extended_links = []
+        # The compiled configuration file header checks, and the compiled
+        # header matches of each mailing list, by list id.
+        self._config_matcher = None
+        self._list_matchers = {}
 
     def extend(self, header, pattern):
         """Extend the existing header matches.
@@ -156,10 +258,21 @@ class HeaderMatchChain(Chain):
             if rule_name.startswith('header-match-'):
                 del config.rules[rule_name]
         self._extended_links = []
+        self._config_matcher = None
+        self._list_matchers = {}
+
+    def _get_matcher(self, matcher, entries, msg):
+        if matcher is None or matcher.key != entries:
+            matcher = HeaderMatcher(entries)
+        else:
+            matcher.register()
+        matcher.forget(msg)
+        return matcher
 
     def get_links(self, mlist, msg, msgdata):
         """See `IChain`."""
         # First return all the configuration file links.
+        entries = []
         for index, line in enumerate(
                 config.antispam.header_checks.splitlines()):
             if len(line.strip()) == 0:
@@ -170,7 +283,10 @@ class HeaderMatchChain(Chain):
                           'contains bogus line: {}'.format(line))
                 continue
             rule_name = 'config-{}'.format(index)
-            yield make_link(parts[0], parts[1].lstrip(), suffix=rule_name)
+            entries.append((parts[0], parts[1].lstrip(), None, rule_name))
+        self._config_matcher = self._get_matcher(
+            self._config_matcher, tuple(entries), msg)
+        yield from self._config_matcher.links
         # Then return all the explicitly added links.
         yield from self._extended_links
         # If any of the above rules matched, they will have deferred their
@@ -178,11 +294,17 @@ class HeaderMatchChain(Chain):
         # file.  For security considerations, this takes precedence over
         # list-specific matches.
         yield Link('any', LinkAction.jump, config.antispam.jump_chain)
-        # Then return all the list-specific header matches.
+        # Then return all the list-specific header matches.  The compiled
+        # matches are only rebuilt when the list's header matches change.
+        entries = []
         for index, entry in enumerate(mlist.header_matches):
             # Jump to the default antispam chain if the entry chain is None.
             chain = (config.antispam.jump_chain
                      if entry.chain is None
                      else entry.chain)
             rule_name = '{}-{}'.format(mlist.list_id, index)
-            yield make_link(entry.header, entry.pattern, chain, rule_name)
+            entries.append((entry.header, entry.pattern, chain, rule_name))
+        matcher = self._get_matcher(
+            self._list_matchers.get(mlist.list_id), tuple(entries), msg)
+        self._list_matchers[mlist.list_id] = matcher
+        yield from matcher.links
@@ -442,18 +442,13 @@ A message body.
             self.assertEqual(event.mlist, self._mlist)
             self.assertEqual(event.msg, msg)
 
-    @unittest.expectedFailure
     @configuration('antispam', header_checks="""
     Header1: a+
     """, jump_chain='hold')
     def test_reuse_rules(self):
         # Test that existing header-match rules are used instead of creating
-        # new ones.
-        # MAS Reusing existing rules is problematic. If the rule with say
-        # position = 0 is deleted the following rule should become
-        # header-match-<list-id>-0 but that rule has the old values for
-        # header and pattern.
-        # See https://gitlab.com/mailman/mailman/-/issues/818
+        # new ones, as long as the header matches don't change.  See
+        # test_rules_rebuilt_after_change for the case where they do.
         chain = config.chains['header-match']
         header_matches = IHeaderMatchList(self._mlist)
         header_matches.append('Header2', 'b+')
@@ -526,3 +521,73 @@ body
         self.assertEqual(msgdata['moderation_reasons'],
                          [('Header "{}" matched a header rule',
                            'subject: Bad subject')])
+
+    def test_rules_rebuilt_after_change(self):
+        # When a header match is deleted, the following rule takes over its
+        # name with its own header and pattern.
+        chain = config.chains['header-match']
+        header_matches = IHeaderMatchList(self._mlist)
+        header_matches.append('Foo', 'a+', 'reject')
+        header_matches.append('Bar', 'b+', 'discard')
+        def get_rules():                          # noqa: E306
+            return [
+                link.rule
+                for link in chain.get_links(self._mlist, Message(), {})
+                if link.rule.name.startswith('header-match-test')
+                ]
+        rules_1 = get_rules()
+        del header_matches[0]
+        rules_2 = get_rules()
+        self.assertEqual(len(rules_2), 1)
+        self.assertEqual(rules_2[0].name, rules_1[0].name)
+        self.assertEqual((rules_2[0].header, rules_2[0].pattern),
+                         ('bar', 'b+'))
+        self.assertIs(config.rules[rules_2[0].name], rules_2[0])
+
+    def test_combined_patterns(self):
+        # The patterns for the same header are searched together, but the
+        # rule hit is recorded for the pattern which matched.
+        header_matches = IHeaderMatchList(self._mlist)
+        header_matches.append('Subject', 'spam', 'hold')
+        header_matches.append('X-Other', 'eggs', 'hold')
+        header_matches.append('Subject', 'viagra', 'discard')
+        msg = mfs("""\
+From: anne@example.com
+To: test@example.com
+Subject: Cheap VIAGRA
+Message-ID: <ant>
+
+body
+""")
+        msgdata = {}
+        events = []
+        with event_subscribers(events.append):
+            process(self._mlist, msg, msgdata, start_chain='header-match')
+        self.assertEqual(len(events), 1)
+        self.assertIsInstance(events[0], DiscardEvent)
+        self.assertEqual(msgdata['rule_hits'],
+                         ['header-match-test.example.com-2'])
+        self.assertEqual(msgdata['rule_misses'], [
+            'header-match-test.example.com-0',
+            'header-match-test.example.com-1',
+            ])
+
+    def test_back_reference_pattern(self):
+        # Patterns with groups are not combined with the others, since their
+        # back references would refer to the wrong groups.
+        header_matches = IHeaderMatchList(self._mlist)
+        header_matches.append('Subject', 'spam', 'hold')
+        header_matches.append('Subject', r'(\w)\1\1', 'discard')
+        msg = mfs("""\
+From: anne@example.com
+To: test@example.com
+Subject: Zzz
+Message-ID: <ant>
+
+body
+""")
+        events = []
+        with event_subscribers(events.append):
+            process(self._mlist, msg, {}, start_chain='header-match')
+        self.assertEqual(len(events), 1)
+        self.assertIsInstance(events[0], DiscardEvent)
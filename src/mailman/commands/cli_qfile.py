@@ -21,6 +21,7 @@ import click
 import pickle
 
 from mailman.core.i18n import _
+from mailman.core.switchboard import RAW_MAGIC, read_queue_file
 from mailman.interfaces.command import ICLISubCommand
 from mailman.utilities.interact import interact
 from mailman.utilities.options import I18nCommand
@@ -58,11 +59,18 @@ def qfile(doprint, interactive, qfile):
     m = []
     printer = PrettyPrinter(indent=4)
     with open(qfile, 'rb') as fp:
-        while True:
-            try:
-                m.append(pickle.load(fp))
-            except EOFError:
-                break
+        if fp.read(len(RAW_MAGIC)) == RAW_MAGIC:
+            # A raw format queue file holds exactly one message and its
+            # metadata.
+            fp.seek(0)
+            m.extend(read_queue_file(fp))
+        else:
+            fp.seek(0)
+            while True:
+                try:
+                    m.append(pickle.load(fp))
+                except EOFError:
+                    break
     if doprint:
         print(_('[----- start pickle -----]'))
         for i, obj in enumerate(m):
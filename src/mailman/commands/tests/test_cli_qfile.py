@@ -22,7 +22,13 @@ import unittest
 from click.testing import CliRunner
 from contextlib import ExitStack
 from mailman.commands.cli_qfile import qfile
+from mailman.config import config
+from mailman.testing.helpers import (
+    configuration,
+    specialized_message_from_string as mfs,
+)
 from mailman.testing.layers import ConfigLayer
+from os.path import join
 from pickle import dump
 from tempfile import NamedTemporaryFile
 from unittest.mock import patch
@@ -57,3 +63,28 @@ a simple string
             self._command.invoke(qfile, (tmp_qfile.name, '-i'))
             mock.assert_called_once_with(
                 banner="Number of objects found (see the variable 'm'): 1")
+
+    @configuration('mailman', queue_file_format='raw')
+    def test_print_raw(self):
+        msg = mfs("""\
+From: anne@example.com
+To: test@example.com
+Message-ID: <ant>
+
+A message.
+""")
+        switchboard = config.switchboards['shunt']
+        filebase = switchboard.enqueue(msg, listid='test.example.com')
+        path = join(switchboard.queue_directory, filebase + '.pck')
+        results = self._command.invoke(qfile, (path,))
+        lines = results.output.splitlines()
+        self.assertEqual(lines[:6], [
+            '[----- start pickle -----]',
+            '<----- start object 1 ----->',
+            'From: anne@example.com',
+            'To: test@example.com',
+            'Message-ID: <ant>',
+            '',
+            ])
+        self.assertIn("'listid': 'test.example.com'", results.output)
+        self.assertEqual(lines[-1], '[----- end pickle -----]')
@@ -28,7 +28,7 @@ from lazr.config import as_boolean, as_timedelta
 from mailman.config import config
 from mailman.core.i18n import _
 from mailman.core.logging import reopen
-from mailman.core.switchboard import Switchboard
+from mailman.core.switchboard import group_sync
 from mailman.interfaces.languages import ILanguageManager
 from mailman.interfaces.listmanager import IListManager
 from mailman.interfaces.runner import (
@@ -36,6 +36,7 @@ from mailman.interfaces.runner import (
     RunnerCrashEvent,
     RunnerInterrupt,
 )
+from mailman.utilities.modules import find_name
 from mailman.utilities.string import expand
 from public import public
 from zope.component import getUtility
@@ -47,6 +48,10 @@ dlog = logging.getLogger('mailman.debug')
 elog = logging.getLogger('mailman.error')
 rlog = logging.getLogger('mailman.runner')
 
+# The number of queue files a runner fetches from its switchboard per pass,
+# unless its batch size is larger.
+FETCH_COUNT = 100
+
 
 @public
 @implementer(IRunner)
@@ -67,12 +72,21 @@ class Runner:
         substitutions = config.paths
         substitutions['name'] = name
         numslices = int(section.instances)
+        # The runners of an autoscaled queue all share the whole queue.  They
+        # claim the queue files they process, and the master recovers the
+        # backup files of runners which died.
+        self.autoscaled = int(section.max_instances) > numslices
         # Check whether the runner is queue runner or not; non-queue runner
         # should not have queue_directory or switchboard instance.
         if self.is_queue_runner:
             self.queue_directory = expand(section.path, None, substitutions)
-            self.switchboard = Switchboard(
-                name, self.queue_directory, slice, numslices, True)
+            switchboard_class = find_name(section.switchboard)
+            if self.autoscaled:
+                self.switchboard = switchboard_class(
+                    name, self.queue_directory, lease=True)
+            else:
+                self.switchboard = switchboard_class(
+                    name, self.queue_directory, slice, numslices, True)
         else:
             self.queue_directory = None
             self.switchboard = None
@@ -82,7 +96,19 @@ class Runner:
                             self.sleep_time.seconds +
                             self.sleep_time.microseconds / 1.0e6)
         self.max_restarts = int(section.max_restarts)
+        self.batch_size = int(section.batch_size)
         self.start = as_boolean(section.start)
+        # With inotify wakeups, the runner is woken as soon as a message is
+        # enqueued and only sleeps for sleep_time when there is nothing to
+        # do.  Fall back to polling where the queue can't be watched.
+        self.wakeup = section.wakeup
+        if self.wakeup not in ('poll', 'inotify'):
+            raise ValueError('Invalid wakeup for runner {}: {}'.format(
+                name, self.wakeup))
+        self._watching = (
+            self.wakeup == 'inotify' and
+            self.switchboard is not None and
+            self.switchboard.watch())
         self._stop = False
         self.status = 0
 
@@ -150,18 +176,34 @@ class Runner:
         """See `IRunner`."""
         me = self.__class__.__name__
         dlog.debug('[%s] starting oneloop', me)
-        # List all the files in our queue directory.  The switchboard is
-        # guaranteed to hand us the files in FIFO order.
+        # Get the next files in our queue directory.  The switchboard is
+        # guaranteed to hand us the files in FIFO order.  Only a bounded
+        # number is fetched per pass, so that indexed switchboards don't read
+        # a deep backlog every time; the runner comes back for more right
+        # away as long as it found any.
         if self.switchboard is None:
             files = []
         else:
-            files = self.switchboard.files
+            files = self.switchboard.next_files(
+                max(self.batch_size, FETCH_COUNT))
+        if self.batch_size > 1:
+            for start in range(0, len(files), self.batch_size):
+                self._one_batch(files[start:start + self.batch_size])
+                dlog.debug('[%s] checking short circuit', me)
+                if self._short_circuit():
+                    dlog.debug('[%s] short circuiting', me)
+                    break
+            dlog.debug('[%s] ending oneloop: %s', me, len(files))
+            return len(files)
         for filebase in files:
             dlog.debug('[%s] processing filebase: %s', me, filebase)
             try:
                 # Ask the switchboard for the message and metadata objects
                 # associated with this queue file.
                 msg, msgdata = self.switchboard.dequeue(filebase)
+            except FileNotFoundError:
+                # Another runner sharing the queue got to it first.
+                continue
             except Exception as error:
                 # This used to just catch email.Errors.MessageParseError, but
                 # other problems can occur in message parsing, e.g.
@@ -219,6 +261,74 @@ class Runner:
         dlog.debug('[%s] ending oneloop: %s', me, len(files))
         return len(files)
 
+    def _one_batch(self, files):
+        """Process a batch of queue files in a single transaction.
+
+        Each file is processed inside its own savepoint so that a failure
+        only rolls back and shunts that one entry.  Queue files enqueued
+        while processing the batch are synced to disk together, and the
+        batch's own queue files are only removed once the transaction has
+        been committed.  If the runner dies part way through, the backup
+        files are recovered and the whole batch is processed again.
+
+        :param files: The file bases to process.
+        :type files: list
+        """
+        me = self.__class__.__name__
+        finished = []
+        with group_sync():
+            for filebase in files:
+                dlog.debug('[%s] processing filebase: %s', me, filebase)
+                try:
+                    msg, msgdata = self.switchboard.dequeue(filebase)
+                except FileNotFoundError:
+                    continue
+                except Exception as error:
+                    self._log(error)
+                    elog.error(
+                        'Skipping and preserving unparseable message: %s',
+                        filebase)
+                    finished.append((filebase, True))
+                    continue
+                savepoint = config.db.store.begin_nested()
+                try:
+                    self._process_one_file(msg, msgdata)
+                except Exception as error:
+                    self._log(error)
+                    if savepoint.is_active:
+                        savepoint.rollback()
+                    else:
+                        # The processing committed the transaction before it
+                        # failed, so roll back whatever it did since then.
+                        config.db.abort()
+                    msgdata['whichq'] = self.switchboard.name
+                    try:
+                        shunt = config.switchboards['shunt']
+                        new_filebase = shunt.enqueue(msg, msgdata)
+                        elog.error('SHUNTING: %s', new_filebase)
+                        finished.append((filebase, False))
+                    except Exception as error:
+                        self._log(error)
+                        elog.error(
+                            'SHUNTING FAILED, preserving original entry: %s',
+                            filebase)
+                        finished.append((filebase, True))
+                else:
+                    # The processing may already have committed the whole
+                    # transaction, taking the savepoint with it.
+                    if savepoint.is_active:
+                        savepoint.commit()
+                    finished.append((filebase, False))
+                if self._short_circuit():
+                    break
+            dlog.debug('[%s] doing periodic', me)
+            self._do_periodic()
+        dlog.debug('[%s] committing batch of %s', me, len(finished))
+        config.db.commit()
+        for filebase, preserve in finished:
+            dlog.debug('[%s] finishing filebase: %s', me, filebase)
+            self.switchboard.finish(filebase, preserve=preserve)
+
     def _process_one_file(self, msg, msgdata):
         """See `IRunner`."""
         # Do some common sanity checking on the message metadata.  It's got to
@@ -256,16 +366,7 @@ class Runner:
         # will be the list's preferred language.  However, we must take
         # special care to reset the defaults, otherwise subsequent messages
         # may be translated incorrectly.
-        if mlist is None:
-            language_manager = getUtility(ILanguageManager)
-            language = language_manager[config.mailman.default_language]
-        elif msg.sender:
-            member = mlist.members.get_member(msg.sender)
-            language = (member.preferred_language
-                        if member is not None
-                        else mlist.preferred_language)
-        else:
-            language = mlist.preferred_language
+        language = self._language(mlist, msg, msgdata)
         with _.using(language.code):
             msgdata['lang'] = language.code
             try:
@@ -277,6 +378,26 @@ class Runner:
         if keepqueued:
             self.switchboard.enqueue(msg, msgdata)
 
+    def _language(self, mlist, msg, msgdata):
+        # Return the language of the sender if they are a member of the list,
+        # otherwise the list's preferred language.  Looking the member up
+        # takes a query, so the first runner to do it records the result in
+        # the metadata, keyed by the list and the sender it was resolved for.
+        # The runners after it reuse the result while those don't change.
+        language_manager = getUtility(ILanguageManager)
+        sender = msg.sender
+        resolved = msgdata.get('sender_language')
+        if resolved is not None:
+            list_id, resolved_sender, code = resolved
+            if (list_id == mlist.list_id and resolved_sender == sender and
+                    code in language_manager):
+                return language_manager[code]
+        member = (mlist.members.get_member(sender) if sender else None)
+        language = (mlist.preferred_language if member is None
+                    else member.preferred_language)
+        msgdata['sender_language'] = (mlist.list_id, sender, language.code)
+        return language
+
     def _log(self, exc):
         elog.error('Uncaught runner exception: %s', exc)
         s = StringIO()
@@ -285,7 +406,8 @@ class Runner:
 
     def _clean_up(self):
         """See `IRunner`."""
-        pass
+        if self.switchboard is not None:
+            self.switchboard.close()
 
     def _dispose(self, mlist, msg, msgdata):
         """See `IRunner`."""
@@ -299,7 +421,10 @@ class Runner:
         """See `IRunner`."""
         if filecnt or self.sleep_float <= 0:
             return
-        time.sleep(self.sleep_float)
+        if self._watching:
+            self.switchboard.wait(self.sleep_float)
+        else:
+            time.sleep(self.sleep_float)
 
     def _short_circuit(self):
         """See `IRunner`."""
@@ -22,20 +22,37 @@ subclass).  Metadata is represented as a Python dictionary.  For every
 message/metadata pair in a queue, a single file containing two pickles is
 written.  First, the message is written to the pickle, then the metadata
 dictionary is written.
+
+Alternatively, queue files can be written in the raw format.  These start
+with a short header giving the format version and the length of the pickled
+metadata dictionary, followed by the metadata and then the message's RFC 5322
+bytes.  Both formats can always be read.
 """
 
 import os
 import time
 import email
+import errno
+import fcntl
 import pickle
+import struct
 import hashlib
 import logging
+import sqlite3
+import threading
 
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.generator import BytesGenerator
+from email.parser import BytesParser
+from io import BytesIO
 from mailman.config import config
 from mailman.email.message import Message
 from mailman.interfaces.configuration import ConfigurationUpdatedEvent
 from mailman.interfaces.switchboard import ISwitchboard
 from mailman.utilities.filesystem import makedirs
+from mailman.utilities.inotify import DirectoryWatcher
+from mailman.utilities.modules import find_name
 from mailman.utilities.string import expand
 from public import public
 from zope.interface import implementer
@@ -54,6 +71,153 @@ MAX_BAK_COUNT = 3
 
 elog = logging.getLogger('mailman.error')
 
+# Raw format queue files start with this magic and a format version byte,
+# followed by the length of the pickled metadata.  No pickle starts with the
+# magic, so the two formats can be told apart by their first bytes.
+RAW_MAGIC = b'MMQ'
+RAW_VERSION = 1
+RAW_HEADER = struct.Struct('>3sBI')
+
+# The instance attributes a parsed message may have and still be stored in the
+# raw format.
+_MESSAGE_ATTRIBUTES = frozenset(vars(Message())) | {'original_size'}
+
+# While group_sync() is active in a thread, this holds the list of queue files
+# enqueued by that thread whose fsync has been deferred.
+_deferred = threading.local()
+
+
+def _sync(filenames):
+    # Flush the deferred queue files to disk, followed by the directories they
+    # were renamed into.  The first fsync usually commits the file system
+    # journal for all of them, making the rest cheap.
+    directories = set()
+    for filename in filenames:
+        directories.add(os.path.dirname(filename))
+        try:
+            fd = os.open(filename, os.O_RDONLY)
+        except FileNotFoundError:
+            # It's already been processed by another runner.
+            continue
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    for directory in directories:
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+@public
+def as_raw(msg):
+    """Return a message as RFC 5322 bytes, if it can be parsed back.
+
+    Only plain Message trees with string headers and no extra attributes
+    (other than `original_size`) survive being flattened and parsed again
+    unchanged.  Other messages have to be pickled instead.
+
+    :param msg: The message object, or the message text.
+    :return: The bytes of the message, or None if it can't be faithfully
+        stored as bytes.
+    """
+    if isinstance(msg, str):
+        return msg.encode('utf-8', 'surrogateescape')
+    for part in msg.walk():
+        if type(part) is not Message:
+            return None
+        if not set(vars(part)) <= _MESSAGE_ATTRIBUTES:
+            return None
+        if not all(isinstance(value, str) for name, value in part._headers):
+            return None
+    fp = BytesIO()
+    try:
+        # The envelope sender is kept in the metadata, since it isn't always
+        # a valid From_ line.  Don't fold headers, so they read back as they
+        # were written.
+        BytesGenerator(fp, mangle_from_=False, maxheaderlen=0).flatten(msg)
+    except (KeyError, LookupError, UnicodeEncodeError):
+        return None
+    return fp.getvalue()
+
+
+def _read_raw_metadata(fp):
+    # Return the metadata of a raw format queue file, leaving the file
+    # positioned at the start of the message bytes.  Return None and rewind
+    # the file if it isn't in the raw format.
+    header = fp.read(RAW_HEADER.size)
+    if not header.startswith(RAW_MAGIC):
+        fp.seek(0)
+        return None
+    magic, version, length = RAW_HEADER.unpack(header)
+    if version != RAW_VERSION:
+        raise ValueError(
+            'Unsupported queue file format version: {}'.format(version))
+    return pickle.loads(fp.read(length))
+
+
+def _write_raw(fp, rawmsg, data):
+    metadata = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+    fp.write(RAW_HEADER.pack(RAW_MAGIC, RAW_VERSION, len(metadata)))
+    fp.write(metadata)
+    fp.write(rawmsg)
+
+
+@public
+def read_queue_file(fp):
+    """Read the message and metadata from an open queue file.
+
+    Queue files in both the pickle and the raw formats are understood.  In
+    the raw format, the message is parsed straight from the file without
+    first reading it into memory.
+
+    :param fp: The queue file, open for binary reading.
+    :return: A 2-tuple of the message object and the metadata dictionary.
+    """
+    data = _read_raw_metadata(fp)
+    if data is None:
+        msg = pickle.load(fp)
+        data = pickle.load(fp)
+        original_size = None
+        if data.get('_parsemsg'):
+            # Calculate the original size of the text now so that we won't
+            # have to generate the message later when we do size restriction
+            # checking.
+            original_size = len(msg)
+            msg = email.message_from_string(msg, Message)
+    else:
+        msg = BytesParser(Message).parse(fp)
+        msg.set_unixfrom(data.pop('_unixfrom', None))
+        original_size = data.pop('_original_size', None)
+    if original_size is not None:
+        msg.original_size = original_size
+        if data.get('_parsemsg'):
+            data['original_size'] = original_size
+    return msg, data
+
+
+@public
+@contextmanager
+def group_sync():
+    """Share the cost of syncing enqueued files to disk.
+
+    Within this context, `ISwitchboard.enqueue()` in the current thread does
+    not fsync each queue file as it is written.  Instead, all of them are
+    synced, along with their queue directories, when the context exits.
+    Nested contexts are folded into the outermost one.
+    """
+    if getattr(_deferred, 'filenames', None) is not None:
+        yield
+        return
+    _deferred.filenames = filenames = []
+    try:
+        yield
+    finally:
+        _deferred.filenames = None
+        _sync(filenames)
+
 
 @public
 @implementer(ISwitchboard)
@@ -61,7 +225,7 @@ class Switchboard:
     """See `ISwitchboard`."""
 
     def __init__(self, name, queue_directory,
-                 slice=None, numslices=1, recover=False):
+                 slice=None, numslices=1, recover=False, lease=False):
         """Create a switchboard object.
 
         :param name: The queue name.
@@ -76,6 +240,11 @@ class Switchboard:
         :type numslices: int
         :param recover: True if backup files should be recovered.
         :type recover: bool
+        :param lease: True if several processes share this queue without
+            slicing it.  Every dequeued file is then locked until it is
+            finished, so that it is processed only once, and only backup
+            files which aren't locked by a live process are recovered.
+        :type lease: bool
         """
         assert (numslices & (numslices - 1)) == 0, (
             'Not a power of 2: {}'.format(numslices))
@@ -91,9 +260,31 @@ class Switchboard:
         if numslices != 1:
             self._lower = ((shamax + 1) * slice) / numslices
             self._upper = (((shamax + 1) * (slice + 1)) / numslices) - 1
+        self._watcher = None
+        # File base -> file descriptor holding the lock on the queue file.
+        self._leases = ({} if lease else None)
         if recover:
             self.recover_backup_files()
 
+    def _lock(self, filename):
+        # Return a file descriptor holding an exclusive lock on the file, or
+        # None if another process holds the lock.  The lock goes away with
+        # the process, even if it crashes.
+        fd = os.open(filename, os.O_RDONLY)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        return fd
+
+    def _in_slice(self, filebase):
+        # Is the queue file with this base name in our slice?
+        if self._lower is None:
+            return True
+        when, digest = filebase.split('+', 1)
+        return self._lower <= int(digest, 16) <= self._upper
+
     def enqueue(self, _msg, _metadata=None, **_kws):
         """See `ISwitchboard`."""
         if _metadata is None:
@@ -106,7 +297,13 @@ class Switchboard:
         list_id = data.get('listid', '--nolist--')
         # Get some data for the input to the sha hash.
         now = repr(time.time())
-        if data.get('_plaintext'):
+        rawmsg = None
+        if config.mailman.queue_file_format == 'raw':
+            rawmsg = as_raw(_msg)
+        if rawmsg is not None:
+            protocol = 0 if data.get('_plaintext') else None
+            msgsave = rawmsg
+        elif data.get('_plaintext'):
             protocol = 0
             msgsave = pickle.dumps(str(_msg), protocol)
         else:
@@ -132,13 +329,27 @@ class Switchboard:
         # We have to tell the dequeue() method whether to parse the message
         # object or not.
         data['_parsemsg'] = (protocol == 0)
-        # Write to the pickle file the message object and metadata.
+        # Write to the pickle file the message object and metadata.  Inside
+        # group_sync() the fsync is deferred until the group is complete.
+        deferred = getattr(_deferred, 'filenames', None)
         with open(tmpfile, 'wb') as fp:
-            fp.write(msgsave)
-            pickle.dump(data, fp, protocol)
+            if rawmsg is None:
+                fp.write(msgsave)
+                pickle.dump(data, fp, protocol)
+            else:
+                if protocol == 0:
+                    data['_original_size'] = len(str(_msg))
+                else:
+                    data['_unixfrom'] = _msg.get_unixfrom()
+                    if hasattr(_msg, 'original_size'):
+                        data['_original_size'] = _msg.original_size
+                _write_raw(fp, rawmsg, data)
             fp.flush()
-            os.fsync(fp.fileno())
+            if deferred is None:
+                os.fsync(fp.fileno())
         os.rename(tmpfile, filename)
+        if deferred is not None:
+            deferred.append(filename)
         return filebase
 
     def dequeue(self, filebase):
@@ -146,23 +357,28 @@ class Switchboard:
         # Calculate the filename from the given filebase.
         filename = os.path.join(self.queue_directory, filebase + '.pck')
         backfile = os.path.join(self.queue_directory, filebase + '.bak')
-        # Read the message object and metadata.
-        with open(filename, 'rb') as fp:
-            # Move the file to the backup file name for processing.  If this
-            # process crashes uncleanly the .bak file will be used to
-            # re-instate the .pck file in order to try again.
-            os.rename(filename, backfile)
-            msg = pickle.load(fp)
-            data = pickle.load(fp)
-        if data.get('_parsemsg'):
-            # Calculate the original size of the text now so that we won't
-            # have to generate the message later when we do size restriction
-            # checking.
-            original_size = len(msg)
-            msg = email.message_from_string(msg, Message)
-            msg.original_size = original_size
-            data['original_size'] = original_size
-        return msg, data
+        lease = None
+        if self._leases is not None:
+            # Claim the file before moving it, so that another process which
+            # got hold of it too backs off.
+            lease = self._lock(filename)
+            if lease is None:
+                raise FileNotFoundError(
+                    errno.ENOENT, 'Claimed by another process', filename)
+        try:
+            # Read the message object and metadata.
+            with open(filename, 'rb') as fp:
+                # Move the file to the backup file name for processing.  If
+                # this process crashes uncleanly the .bak file will be used to
+                # re-instate the .pck file in order to try again.
+                os.rename(filename, backfile)
+                if lease is not None:
+                    self._leases[filebase] = lease
+                    lease = None
+                return read_queue_file(fp)
+        finally:
+            if lease is not None:
+                os.close(lease)
 
     def finish(self, filebase, preserve=False):
         """See `ISwitchboard`."""
@@ -184,13 +400,64 @@ class Switchboard:
         except EnvironmentError:
             elog.exception(
                 'Failed to unlink/preserve backup file: %s', bakfile)
+        finally:
+            if self._leases is not None and filebase in self._leases:
+                os.close(self._leases.pop(filebase))
+
+    def watch(self):
+        """See `ISwitchboard`."""
+        if self._watcher is None:
+            try:
+                self._watcher = DirectoryWatcher(self.queue_directory)
+            except OSError as error:
+                elog.error('Cannot watch queue directory %s, polling: %s',
+                           self.queue_directory, error)
+                return False
+        return True
+
+    def wait(self, timeout):
+        """See `ISwitchboard`."""
+        if self._watcher is None:
+            time.sleep(timeout)
+            return True
+        # Queue files are always renamed into place, so the names reported by
+        # the watcher tell us whether there is new work in our slice without
+        # looking at the queue directory.
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            names = self._watcher.read(remaining)
+            if names is None:
+                # Events were lost, so there may be anything in the queue.
+                return True
+            for name in names:
+                filebase, extension = os.path.splitext(name)
+                if extension != '.pck':
+                    continue
+                try:
+                    if self._in_slice(filebase):
+                        return True
+                except ValueError:
+                    continue
+
+    def close(self):
+        """See `ISwitchboard`."""
+        if self._watcher is not None:
+            self._watcher.close()
+            self._watcher = None
 
     @property
     def files(self):
         """See `ISwitchboard`."""
         return self.get_files()
 
-    def get_files(self, extension='.pck'):
+    def next_files(self, count):
+        """See `ISwitchboard`."""
+        return self.get_files(count=count)
+
+    def get_files(self, extension='.pck', count=None):
         """See `ISwitchboard`."""
         times = {}
         lower = self._lower
@@ -211,7 +478,8 @@ class Switchboard:
                     key += DELTA
                 times[key] = filebase
         # FIFO sort
-        return [times[k] for k in sorted(times)]
+        files = [times[k] for k in sorted(times)]
+        return files if count is None else files[:count]
 
     def recover_backup_files(self):
         """See `ISwitchboard`."""
@@ -224,35 +492,371 @@ class Switchboard:
         for filebase in self.get_files('.bak'):
             src = os.path.join(self.queue_directory, filebase + '.bak')
             dst = os.path.join(self.queue_directory, filebase + '.pck')
-            with open(src, 'rb+') as fp:
-                try:
+            if self._leases is None:
+                self._recover(filebase, src, dst)
+                continue
+            # Leave the files of live processes alone.
+            try:
+                lease = self._lock(src)
+            except FileNotFoundError:
+                continue
+            if lease is None:
+                continue
+            try:
+                self._recover(filebase, src, dst)
+            finally:
+                os.close(lease)
+
+    def _recover(self, filebase, src, dst):
+        # Move one backup file back, or to the bad queue.
+        with open(src, 'rb+') as fp:
+            try:
+                data = _read_raw_metadata(fp)
+                if data is None:
                     # Throw away the message object.
                     pickle.load(fp)
                     data_pos = fp.tell()
                     data = pickle.load(fp)
-                except Exception as error:
-                    # If unpickling throws any exception, just log and
-                    # preserve this entry
-                    elog.error('Unpickling .bak exception: %s\n'
-                               'Preserving file: %s', error, filebase)
-                    self.finish(filebase, preserve=True)
                 else:
-                    data['_bak_count'] = data.get('_bak_count', 0) + 1
+                    rawmsg = fp.read()
+                    data_pos = None
+            except Exception as error:
+                # If unpickling throws any exception, just log and
+                # preserve this entry
+                elog.error('Unpickling .bak exception: %s\n'
+                           'Preserving file: %s', error, filebase)
+                self.finish(filebase, preserve=True)
+            else:
+                data['_bak_count'] = data.get('_bak_count', 0) + 1
+                if data_pos is None:
+                    # The metadata comes before the message in the raw
+                    # format, so the whole file gets rewritten.
+                    fp.seek(0)
+                    _write_raw(fp, rawmsg, data)
+                else:
                     fp.seek(data_pos)
                     if data.get('_parsemsg'):
                         protocol = 0
                     else:
                         protocol = 1
                     pickle.dump(data, fp, protocol)
-                    fp.truncate()
-                    fp.flush()
-                    os.fsync(fp.fileno())
-                    if data['_bak_count'] >= MAX_BAK_COUNT:
-                        elog.error('.bak file max count, preserving file: %s',
-                                   filebase)
-                        self.finish(filebase, preserve=True)
-                    else:
-                        os.rename(src, dst)
+                fp.truncate()
+                fp.flush()
+                os.fsync(fp.fileno())
+                if data['_bak_count'] >= MAX_BAK_COUNT:
+                    elog.error('.bak file max count, preserving file: %s',
+                               filebase)
+                    self.finish(filebase, preserve=True)
+                else:
+                    os.rename(src, dst)
+
+
+# The name of the index database kept in each indexed queue directory.  It
+# doesn't end in .pck or .bak so normal directory scans ignore it.
+INDEX_FILE = '.index.db'
+# The slice key is the top 32 bits of the file's SHA1 digest.  Slices are
+# always a power of 2 so this is enough to decide which slice a file is in.
+SLICE_BITS = 32
+
+
+@public
+@implementer(ISwitchboard)
+class IndexedSwitchboard(Switchboard):
+    """A switchboard which keeps an index of its queue files.
+
+    The queue files themselves are exactly the same as for the base
+    `Switchboard`, and so are the .pck/.bak/.psv crash recovery semantics.
+    In addition, every file base is recorded in a small SQLite database in
+    the queue directory along with its received time and slice key.  Finding
+    the next files to process is then an indexed query instead of a listing,
+    parsing and sorting of the entire queue directory.
+
+    The file system remains the authority.  The index is reconciled against
+    the queue directory when backup files are recovered (i.e. at runner
+    start up) and whenever it claims that there is nothing to do, so files
+    dropped into the queue by other means are still found.
+    """
+
+    def __init__(self, name, queue_directory,
+                 slice=None, numslices=1, recover=False, lease=False):
+        self._index_path = os.path.join(queue_directory, INDEX_FILE)
+        # SQLite connections can't be shared between threads, so every thread
+        # enqueuing to this switchboard gets its own.
+        self._local = threading.local()
+        if numslices == 1:
+            self._slice_range = (0, (1 << SLICE_BITS) - 1)
+        else:
+            self._slice_range = (
+                ((1 << SLICE_BITS) * slice) // numslices,
+                ((1 << SLICE_BITS) * (slice + 1)) // numslices - 1)
+        super().__init__(
+            name, queue_directory, slice, numslices, recover, lease)
+
+    def _index(self):
+        # Return this thread's connection to the index database, (re)opening
+        # it if this is a new process or the database file has been removed
+        # out from under us.  If the database has to be created, seed it from
+        # the queue directory.
+        try:
+            inode = os.stat(self._index_path).st_ino
+        except FileNotFoundError:
+            inode = None
+        key = (os.getpid(), inode)
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and key == self._local.key:
+            return connection
+        if connection is not None:
+            connection.close()
+        # The index can always be rebuilt from the queue directory, so
+        # there's no need to pay for synchronous writes.
+        connection = sqlite3.connect(
+            self._index_path, timeout=30, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=OFF')
+        self._create_tables(connection)
+        self._local.connection = connection
+        self._local.key = (os.getpid(), os.stat(self._index_path).st_ino)
+        if inode is None:
+            self._reconcile(prune=True)
+        return connection
+
+    def _create_tables(self, connection):
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS entry (
+                filebase TEXT PRIMARY KEY,
+                extension TEXT NOT NULL,
+                received REAL NOT NULL,
+                slice_key INTEGER NOT NULL)
+            """)
+        connection.execute("""
+            CREATE INDEX IF NOT EXISTS entry_fifo
+            ON entry (extension, slice_key, received)
+            """)
+
+    def _parse(self, filebase):
+        when, digest = filebase.split('+', 1)
+        return float(when), int(digest[:SLICE_BITS // 4], 16)
+
+    def _set(self, filebase, extension):
+        received, slice_key = self._parse(filebase)
+        self._index().execute(
+            'INSERT OR REPLACE INTO entry VALUES (?, ?, ?, ?)',
+            (filebase, extension, received, slice_key))
+
+    def _remove(self, filebase):
+        self._index().execute(
+            'DELETE FROM entry WHERE filebase = ?', (filebase,))
+
+    def _reconcile(self, prune=False):
+        # Scan the queue directory and add any .pck or .bak files in our
+        # slice which the index doesn't know about.  When pruning, also drop
+        # entries in our slice whose files no longer exist.
+        connection = self._index()
+        lower, upper = self._slice_range
+        on_disk = {}
+        for filename in os.listdir(self.queue_directory):
+            filebase, extension = os.path.splitext(filename)
+            if extension not in ('.pck', '.bak'):
+                continue
+            try:
+                received, slice_key = self._parse(filebase)
+            except ValueError:
+                continue
+            if lower <= slice_key <= upper:
+                on_disk[filebase] = (extension, received, slice_key)
+        indexed = dict(connection.execute("""
+            SELECT filebase, extension FROM entry
+            WHERE slice_key BETWEEN ? AND ?
+            """, (lower, upper)))
+        missing = [
+            (filebase, extension, received, slice_key)
+            for filebase, (extension, received, slice_key)
+            in on_disk.items()
+            if indexed.get(filebase) != extension
+            ]
+        stale = ([(filebase,) for filebase in indexed
+                  if filebase not in on_disk]
+                 if prune else [])
+        if not missing and not stale:
+            return
+        with connection:
+            connection.execute('BEGIN')
+            connection.executemany(
+                'INSERT OR REPLACE INTO entry VALUES (?, ?, ?, ?)', missing)
+            connection.executemany(
+                'DELETE FROM entry WHERE filebase = ?', stale)
+
+    def enqueue(self, _msg, _metadata=None, **_kws):
+        """See `ISwitchboard`."""
+        filebase = super().enqueue(_msg, _metadata, **_kws)
+        self._set(filebase, '.pck')
+        return filebase
+
+    def dequeue(self, filebase):
+        """See `ISwitchboard`."""
+        try:
+            msg_and_data = super().dequeue(filebase)
+        except FileNotFoundError:
+            # The index is out of date.  Forget about this entry.
+            self._remove(filebase)
+            raise
+        self._set(filebase, '.bak')
+        return msg_and_data
+
+    def finish(self, filebase, preserve=False):
+        """See `ISwitchboard`."""
+        super().finish(filebase, preserve)
+        self._remove(filebase)
+
+    def _query(self, extension, count):
+        lower, upper = self._slice_range
+        query = """
+            SELECT filebase FROM entry
+            WHERE extension = ? AND slice_key BETWEEN ? AND ?
+            ORDER BY received, filebase
+            """
+        parameters = [extension, lower, upper]
+        if count is not None:
+            query += ' LIMIT ?'
+            parameters.append(count)
+        return [row[0] for row in self._index().execute(query, parameters)]
+
+    def get_files(self, extension='.pck', count=None):
+        """See `ISwitchboard`."""
+        if extension not in ('.pck', '.bak'):
+            return super().get_files(extension, count)
+        files = self._query(extension, count)
+        if len(files) == 0:
+            # Pick up anything that was added to the queue directory behind
+            # our back, e.g. by a process that crashed between writing the
+            # queue file and recording it in the index.
+            self._reconcile()
+            files = self._query(extension, count)
+        return files
+
+    def recover_backup_files(self):
+        """See `ISwitchboard`."""
+        self._reconcile(prune=True)
+        super().recover_backup_files()
+        # Recovery renamed .bak files to .pck files, or preserved them in the
+        # bad queue.  Neither of these go through our index.
+        self._reconcile(prune=True)
+
+
+def _seconds(when):
+    # Mailman's datetimes are naive UTC.
+    return when.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _now():
+    # mailman.utilities.datetime imports the test layers, which import the
+    # runners, which import this module.
+    from mailman.utilities.datetime import now
+    return _seconds(now())
+
+
+@public
+@implementer(ISwitchboard)
+class ScheduledSwitchboard(IndexedSwitchboard):
+    """An indexed switchboard which hands out queue files when they are due.
+
+    Queue files enqueued with a `deliver_after` datetime in their metadata
+    are not in `files` until that time has come, so a queue of delayed
+    messages isn't dequeued and enqueued again on every pass.  `get_files()`
+    still returns all the queue files.
+    The due times are kept in the index next to the queue entries.  Queue
+    files without a due time, including those the index learns about from
+    the queue directory, are due immediately.
+    """
+
+    def _create_tables(self, connection):
+        super()._create_tables(connection)
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS schedule (
+                filebase TEXT PRIMARY KEY,
+                due REAL NOT NULL)
+            """)
+        connection.execute("""
+            CREATE INDEX IF NOT EXISTS schedule_due ON schedule (due)
+            """)
+
+    def enqueue(self, _msg, _metadata=None, **_kws):
+        """See `ISwitchboard`."""
+        deliver_after = _kws.get('deliver_after')
+        if deliver_after is None and _metadata is not None:
+            deliver_after = _metadata.get('deliver_after')
+        filebase = Switchboard.enqueue(self, _msg, _metadata, **_kws)
+        connection = self._index()
+        with connection:
+            connection.execute('BEGIN')
+            if deliver_after is not None:
+                connection.execute(
+                    'INSERT OR REPLACE INTO schedule VALUES (?, ?)',
+                    (filebase, _seconds(deliver_after)))
+            self._set(filebase, '.pck')
+        return filebase
+
+    def _remove(self, filebase):
+        super()._remove(filebase)
+        self._index().execute(
+            'DELETE FROM schedule WHERE filebase = ?', (filebase,))
+
+    def _reconcile(self, prune=False):
+        super()._reconcile(prune)
+        if prune:
+            self._index().execute("""
+                DELETE FROM schedule
+                WHERE filebase NOT IN (SELECT filebase FROM entry)
+                """)
+
+    def _query_due(self, count):
+        lower, upper = self._slice_range
+        query = """
+            SELECT entry.filebase FROM entry
+            LEFT JOIN schedule ON entry.filebase = schedule.filebase
+            WHERE extension = '.pck' AND slice_key BETWEEN ? AND ?
+              AND (due IS NULL OR due <= ?)
+            ORDER BY received, entry.filebase
+            """
+        parameters = [lower, upper, _now()]
+        if count is not None:
+            query += ' LIMIT ?'
+            parameters.append(count)
+        return [row[0] for row in self._index().execute(query, parameters)]
+
+    @property
+    def files(self):
+        """See `ISwitchboard`."""
+        return self.next_files(None)
+
+    def next_files(self, count):
+        """See `ISwitchboard`."""
+        files = self._query_due(count)
+        # Only look for queue files the index doesn't know about when nothing
+        # at all is scheduled, otherwise every pass over a queue full of
+        # delayed files would list the queue directory.
+        if len(files) == 0 and self.next_due() is None:
+            self._reconcile()
+            files = self._query_due(count)
+        return files
+
+    def next_due(self):
+        """Return when the next queue file in our slice is due.
+
+        :return: The earliest due time of the queue files which are not yet
+            due, or None if there are no such files.
+        :rtype: datetime
+        """
+        lower, upper = self._slice_range
+        due = self._index().execute("""
+            SELECT MIN(due) FROM schedule
+            JOIN entry ON entry.filebase = schedule.filebase
+            WHERE extension = '.pck' AND slice_key BETWEEN ? AND ?
+              AND due > ?
+            """, (lower, upper, _now())).fetchone()[0]
+        if due is None:
+            return None
+        return datetime.fromtimestamp(due, timezone.utc).replace(tzinfo=None)
 
 
 @public
@@ -271,4 +875,5 @@ def handle_ConfigurationUpdatedEvent(event):
             substitutions = config.paths
             substitutions['name'] = name
             path = expand(conf.path, None, substitutions)
-            config.switchboards[name] = Switchboard(name, path)
+            switchboard_class = find_name(conf.switchboard)
+            config.switchboards[name] = switchboard_class(name, path)
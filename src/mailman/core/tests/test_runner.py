@@ -17,11 +17,13 @@
 
 """Test some Runner base class behavior."""
 
+import time
 import unittest
 
 from mailman.app.lifecycle import create_list
 from mailman.config import config
 from mailman.core.runner import Runner
+from mailman.interfaces.bans import IBanManager
 from mailman.interfaces.member import DeliveryMode
 from mailman.interfaces.runner import RunnerCrashEvent
 from mailman.runners.virgin import VirginRunner
@@ -36,6 +38,7 @@ from mailman.testing.helpers import (
     subscribe,
 )
 from mailman.testing.layers import ConfigLayer
+from unittest.mock import patch
 
 
 class CrashingRunner(Runner):
@@ -47,6 +50,25 @@ class NonQueueRunner(Runner):
     is_queue_runner = False
 
 
+class BanningRunner(Runner):
+    def _dispose(self, mlist, msg, msgdata):
+        IBanManager(mlist).ban(msg.sender)
+        if msg.sender == 'bart@example.com':
+            raise RuntimeError('borked')
+        config.switchboards['out'].enqueue(msg, msgdata)
+        return False
+
+
+class CommittingRunner(BanningRunner):
+    def _dispose(self, mlist, msg, msgdata):
+        if msg.sender == 'bart@example.com':
+            IBanManager(mlist).ban(msg.sender)
+            config.db.commit()
+            IBanManager(mlist).ban('bart-again@example.com')
+            raise RuntimeError('borked')
+        return super()._dispose(mlist, msg, msgdata)
+
+
 class TestRunner(unittest.TestCase):
     """Test the Runner base class behavior."""
 
@@ -135,3 +157,159 @@ Message-ID: <ant>
         runner = make_testable_runner(NonQueueRunner)
         # This will throw AttributeError on failure.
         runner.run()
+
+    @configuration('runner.in', batch_size=10)
+    def test_batch(self):
+        # In batch mode, a failure rolls back and shunts only the failing
+        # entry.  The rest of the batch is committed.
+        runner = make_testable_runner(BanningRunner, 'in')
+        self.assertEqual(runner.batch_size, 10)
+        for sender in ('anne', 'bart', 'cris'):
+            msg = mfs("""\
+From: {}@example.com
+To: test@example.com
+Message-ID: <{}>
+
+""".format(sender, sender))
+            config.switchboards['in'].enqueue(msg, listid='test.example.com')
+        runner.run()
+        config.db.abort()
+        bans = IBanManager(self._mlist)
+        self.assertTrue(bans.is_banned('anne@example.com'))
+        self.assertFalse(bans.is_banned('bart@example.com'))
+        self.assertTrue(bans.is_banned('cris@example.com'))
+        items = get_queue_messages('shunt', expected_count=1)
+        self.assertEqual(items[0].msg['message-id'], '<bart>')
+        items = get_queue_messages('out', expected_count=2, sort_on='from')
+        self.assertEqual(items[0].msg['message-id'], '<anne>')
+        self.assertEqual(items[1].msg['message-id'], '<cris>')
+        self.assertEqual(config.switchboards['in'].get_files('.bak'), [])
+
+    def test_bounded_fetch(self):
+        # Each pass only fetches a bounded number of files from the queue,
+        # instead of the whole backlog.
+        runner = make_testable_runner(VirginRunner, 'in')
+        for n in range(3):
+            config.switchboards['in'].enqueue(mfs("""\
+From: anne@example.com
+To: test@example.com
+Message-ID: <{}>
+
+""".format(n)), listid='test.example.com')
+        with patch('mailman.core.runner.FETCH_COUNT', 2):
+            self.assertEqual(runner._one_iteration(), 2)
+            self.assertEqual(len(config.switchboards['in'].files), 1)
+            self.assertEqual(runner._one_iteration(), 1)
+        self.assertEqual(config.switchboards['in'].files, [])
+
+    @configuration('runner.in', batch_size=10)
+    def test_batch_commit_then_fail(self):
+        # An entry which commits the transaction and then fails only loses
+        # what it did after the commit.  The rest of the batch is committed.
+        runner = make_testable_runner(CommittingRunner, 'in')
+        for sender in ('anne', 'bart', 'cris'):
+            msg = mfs("""\
+From: {}@example.com
+To: test@example.com
+Message-ID: <{}>
+
+""".format(sender, sender))
+            config.switchboards['in'].enqueue(msg, listid='test.example.com')
+        runner.run()
+        config.db.abort()
+        bans = IBanManager(self._mlist)
+        self.assertTrue(bans.is_banned('anne@example.com'))
+        self.assertTrue(bans.is_banned('bart@example.com'))
+        self.assertFalse(bans.is_banned('bart-again@example.com'))
+        self.assertTrue(bans.is_banned('cris@example.com'))
+        items = get_queue_messages('shunt', expected_count=1)
+        self.assertEqual(items[0].msg['message-id'], '<bart>')
+        get_queue_messages('out', expected_count=2)
+
+    @configuration('runner.in', wakeup='inotify', sleep_time='10s')
+    def test_inotify_wakeup(self):
+        # A snoozing runner is woken up as soon as a message is enqueued.
+        runner = make_testable_runner(VirginRunner, 'in')
+        self.addCleanup(runner._clean_up)
+        self.assertTrue(runner._watching)
+        config.switchboards['in'].enqueue(mfs("""\
+From: anne@example.com
+To: test@example.com
+
+"""), listid='test.example.com')
+        start = time.monotonic()
+        runner._snooze(0)
+        self.assertLess(time.monotonic() - start, 5)
+
+    @configuration('runner.in', wakeup='bogus')
+    def test_bad_wakeup(self):
+        with self.assertRaises(ValueError):
+            make_testable_runner(VirginRunner, 'in')
+
+    def test_sender_language(self):
+        # The language of the sender is looked up by the first runner which
+        # processes the message, and recorded in the metadata for the
+        # runners after it.
+        self._mlist.preferred_language = 'en'
+        anne = subscribe(self._mlist, 'Anne', email='anne@example.com')
+        anne.preferences.preferred_language = 'fr'
+        runner = make_testable_runner(BanningRunner, 'in')
+        msg = mfs("""\
+From: anne@example.com
+To: test@example.com
+
+""")
+        config.switchboards['in'].enqueue(msg, listid='test.example.com')
+        runner.run()
+        items = get_queue_messages('out', expected_count=1)
+        msgdata = items[0].msgdata
+        self.assertEqual(msgdata['lang'], 'fr')
+        self.assertEqual(msgdata['sender_language'], (
+            'test.example.com', 'anne@example.com', 'fr'))
+        # The next runner doesn't look the member up again, so the message
+        # keeps the language it started with.
+        anne.preferences.preferred_language = 'de'
+        config.switchboards['in'].enqueue(items[0].msg, msgdata)
+        runner.run()
+        items = get_queue_messages('out', expected_count=1)
+        self.assertEqual(items[0].msgdata['lang'], 'fr')
+
+    def test_sender_language_changed_sender(self):
+        # The recorded language is only used for the same sender.
+        self._mlist.preferred_language = 'en'
+        anne = subscribe(self._mlist, 'Anne', email='anne@example.com')
+        anne.preferences.preferred_language = 'fr'
+        runner = make_testable_runner(BanningRunner, 'in')
+        msg = mfs("""\
+From: cate@example.com
+To: test@example.com
+
+""")
+        config.switchboards['in'].enqueue(
+            msg, listid='test.example.com', sender_language=(
+                'test.example.com', 'anne@example.com', 'fr'))
+        runner.run()
+        items = get_queue_messages('out', expected_count=1)
+        msgdata = items[0].msgdata
+        self.assertEqual(msgdata['lang'], 'en')
+        self.assertEqual(msgdata['sender_language'], (
+            'test.example.com', 'cate@example.com', 'en'))
+
+    @configuration('runner.in', instances=2, max_instances=4)
+    def test_autoscaled_runner(self):
+        # The runners of an autoscaled queue share the whole queue, and skip
+        # files which another runner claimed.
+        runner = make_testable_runner(VirginRunner, 'in')
+        self.assertTrue(runner.autoscaled)
+        self.assertIsNone(runner.switchboard._lower)
+        self.assertEqual(runner.switchboard._leases, {})
+        filebase = config.switchboards['in'].enqueue(mfs("""\
+From: anne@example.com
+To: test@example.com
+
+"""), listid='test.example.com')
+        with patch.object(runner.switchboard, 'dequeue',
+                          side_effect=FileNotFoundError):
+            self.assertEqual(runner._one_iteration(), 1)
+        self.assertEqual(config.switchboards['in'].files, [filebase])
+        get_queue_messages('bad', expected_count=0)
@@ -18,14 +18,24 @@
 """Switchboard tests."""
 
 import os
+import time
 import unittest
 
+from datetime import timedelta
 from mailman.config import config
+from mailman.core.switchboard import (
+    group_sync,
+    IndexedSwitchboard,
+    ScheduledSwitchboard,
+    Switchboard,
+)
 from mailman.testing.helpers import (
+    configuration,
     LogFileMark,
     specialized_message_from_string as mfs,
 )
 from mailman.testing.layers import ConfigLayer
+from mailman.utilities.datetime import factory, now
 from unittest.mock import patch
 
 
@@ -72,3 +82,360 @@ Message-ID: <ant>
         bad_dir = config.switchboards['bad'].queue_directory
         psvfile = os.path.join(bad_dir, filebase + '.psv')
         self.assertTrue(os.path.isfile(psvfile))
+
+    def test_group_sync(self):
+        # Inside group_sync(), queue files are synced when the group
+        # completes rather than as each one is written.
+        msg = mfs("""\
+From: anne@example.com
+To: test@example.com
+Message-ID: <ant>
+
+""")
+        switchboard = config.switchboards['shunt']
+        with patch('mailman.core.switchboard.os.fsync') as fsync:
+            with group_sync():
+                switchboard.enqueue(msg)
+                switchboard.enqueue(msg)
+                self.assertEqual(fsync.call_count, 0)
+            # Two files plus their queue directory.
+            self.assertEqual(fsync.call_count, 3)
+            switchboard.enqueue(msg)
+            self.assertEqual(fsync.call_count, 4)
+        self.assertEqual(len(switchboard.files), 3)
+
+
+class TestRawFormat(unittest.TestCase):
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._msg = mfs("""\
+From anne@example.com Fri Oct 16 12:00:00 2026
+From: anne@example.com
+To: test@example.com
+Message-ID: <ant>
+Subject: A test
+
+A message.
+""")
+        self._msg.original_size = 1234
+        self._switchboard = config.switchboards['shunt']
+
+    def _path(self, filebase, extension='.pck'):
+        return os.path.join(
+            self._switchboard.queue_directory, filebase + extension)
+
+    @configuration('mailman', queue_file_format='raw')
+    def test_round_trip(self):
+        filebase = self._switchboard.enqueue(self._msg, foo='yes')
+        with open(self._path(filebase), 'rb') as fp:
+            self.assertEqual(fp.read(3), b'MMQ')
+        msg, msgdata = self._switchboard.dequeue(filebase)
+        self.assertEqual(msgdata['foo'], 'yes')
+        self.assertEqual(msg['message-id'], '<ant>')
+        self.assertEqual(msg.sender, 'anne@example.com')
+        self.assertEqual(msg.get_unixfrom(),
+                         'From anne@example.com Fri Oct 16 12:00:00 2026')
+        self.assertEqual(msg.get_payload(), 'A message.\n')
+        self.assertEqual(msg.original_size, 1234)
+        self.assertNotIn('_original_size', msgdata)
+
+    @configuration('mailman', queue_file_format='raw')
+    def test_plaintext(self):
+        filebase = self._switchboard.enqueue(
+            self._msg.as_string(), _plaintext=True)
+        msg, msgdata = self._switchboard.dequeue(filebase)
+        self.assertEqual(msg['message-id'], '<ant>')
+        self.assertEqual(msg.original_size, len(self._msg.as_string()))
+        self.assertEqual(msgdata['original_size'], msg.original_size)
+
+    def test_read_pickle_format(self):
+        # Queue files written in the pickle format are still read after
+        # switching to the raw format.
+        filebase = self._switchboard.enqueue(self._msg)
+        with configuration('mailman', queue_file_format='raw'):
+            msg, msgdata = self._switchboard.dequeue(filebase)
+        self.assertEqual(msg['message-id'], '<ant>')
+
+    @configuration('mailman', queue_file_format='raw')
+    def test_recover_backup_files(self):
+        filebase = self._switchboard.enqueue(self._msg)
+        self._switchboard.dequeue(filebase)
+        self._switchboard.recover_backup_files()
+        self.assertEqual(self._switchboard.files, [filebase])
+        msg, msgdata = self._switchboard.dequeue(filebase)
+        self.assertEqual(msgdata['_bak_count'], 1)
+        self.assertEqual(msg.get_payload(), 'A message.\n')
+
+    @configuration('mailman', queue_file_format='raw')
+    def test_unknown_version(self):
+        filebase = self._switchboard.enqueue(self._msg)
+        with open(self._path(filebase), 'r+b') as fp:
+            fp.seek(3)
+            fp.write(bytes([99]))
+        with self.assertRaisesRegex(ValueError, 'version: 99'):
+            self._switchboard.dequeue(filebase)
+
+
+class TestIndexedSwitchboard(unittest.TestCase):
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._msg = mfs("""\
+From: anne@example.com
+To: test@example.com
+Message-ID: <ant>
+
+""")
+        self._queue_directory = os.path.join(config.QUEUE_DIR, 'indexed')
+        self._switchboard = IndexedSwitchboard(
+            'indexed', self._queue_directory)
+
+    def test_fifo_order(self):
+        # Files come out of the index in the order they were enqueued.
+        filebases = [self._switchboard.enqueue(self._msg, n=n)
+                     for n in range(5)]
+        self.assertEqual(self._switchboard.files, filebases)
+        self.assertEqual(self._switchboard.get_files(count=2), filebases[:2])
+        self.assertEqual(self._switchboard.next_files(3), filebases[:3])
+
+    def test_dequeue_and_finish(self):
+        # Dequeuing moves the entry to .bak and finishing removes it, both on
+        # disk and in the index.
+        filebase = self._switchboard.enqueue(self._msg, foo='yes')
+        msg, msgdata = self._switchboard.dequeue(filebase)
+        self.assertEqual(msgdata['foo'], 'yes')
+        self.assertEqual(self._switchboard.files, [])
+        self.assertEqual(self._switchboard.get_files('.bak'), [filebase])
+        self._switchboard.finish(filebase)
+        self.assertEqual(self._switchboard.get_files('.bak'), [])
+        self.assertEqual(
+            [filename for filename in os.listdir(self._queue_directory)
+             if not filename.startswith('.index.db')],
+            [])
+
+    def test_slices(self):
+        # Each file is in exactly one slice and the slices agree with the
+        # scanning switchboard.
+        filebases = [self._switchboard.enqueue(self._msg, n=n)
+                     for n in range(20)]
+        found = []
+        for this_slice in range(4):
+            indexed = IndexedSwitchboard(
+                'indexed', self._queue_directory, this_slice, 4)
+            scanning = Switchboard(
+                'indexed', self._queue_directory, this_slice, 4)
+            self.assertEqual(indexed.files, scanning.files)
+            found.extend(indexed.files)
+        self.assertEqual(sorted(found), sorted(filebases))
+
+    def test_unindexed_files_are_found(self):
+        # Files written to the queue directory without going through the
+        # index are found once the index runs dry.
+        first = self._switchboard.enqueue(self._msg)
+        second = Switchboard('indexed', self._queue_directory).enqueue(
+            self._msg)
+        self.assertEqual(self._switchboard.files, [first])
+        self._switchboard.dequeue(first)
+        self._switchboard.finish(first)
+        self.assertEqual(self._switchboard.files, [second])
+
+    def test_missing_file_is_dropped(self):
+        # An index entry whose file has vanished is forgotten when it is
+        # dequeued.
+        filebase = self._switchboard.enqueue(self._msg)
+        os.remove(os.path.join(self._queue_directory, filebase + '.pck'))
+        with self.assertRaises(FileNotFoundError):
+            self._switchboard.dequeue(filebase)
+        self.assertEqual(self._switchboard.files, [])
+
+    def test_removed_index_is_rebuilt(self):
+        # If the index database goes away, it is rebuilt from the queue
+        # directory.
+        filebases = [self._switchboard.enqueue(self._msg, n=n)
+                     for n in range(3)]
+        for filename in os.listdir(self._queue_directory):
+            if filename.startswith('.index.db'):
+                os.remove(os.path.join(self._queue_directory, filename))
+        self.assertEqual(self._switchboard.files, filebases)
+
+    def test_recover_backup_files(self):
+        # Recovering .bak files keeps the index in sync.
+        filebase = self._switchboard.enqueue(self._msg)
+        self._switchboard.dequeue(filebase)
+        recovered = IndexedSwitchboard(
+            'indexed', self._queue_directory, recover=True)
+        self.assertEqual(recovered.files, [filebase])
+        self.assertEqual(recovered.get_files('.bak'), [])
+        msg, msgdata = recovered.dequeue(filebase)
+        self.assertEqual(msgdata['_bak_count'], 1)
+
+
+class TestScheduledSwitchboard(unittest.TestCase):
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._msg = mfs("""\
+From: anne@example.com
+To: test@example.com
+Message-ID: <ant>
+
+""")
+        self._queue_directory = os.path.join(config.QUEUE_DIR, 'scheduled')
+        self._switchboard = ScheduledSwitchboard(
+            'scheduled', self._queue_directory)
+
+    def test_not_due(self):
+        # Files which aren't due yet are held back, but still listed.
+        later = now() + timedelta(hours=1)
+        held = self._switchboard.enqueue(self._msg, deliver_after=later)
+        due = self._switchboard.enqueue(self._msg)
+        self.assertEqual(self._switchboard.files, [due])
+        self.assertEqual(self._switchboard.get_files(), [held, due])
+        self.assertEqual(self._switchboard.next_files(1), [due])
+        self.assertEqual(self._switchboard.next_due(), later)
+
+    def test_becomes_due(self):
+        filebases = [
+            self._switchboard.enqueue(
+                self._msg, dict(deliver_after=now() + timedelta(days=n)))
+            for n in (2, 1)
+            ]
+        self.assertEqual(self._switchboard.files, [])
+        factory.fast_forward(1)
+        self.assertEqual(self._switchboard.files, filebases[1:])
+        factory.fast_forward(1)
+        self.assertEqual(self._switchboard.files, filebases)
+        self.assertEqual(self._switchboard.next_files(1), filebases[:1])
+        self.assertIsNone(self._switchboard.next_due())
+
+    def test_finish_forgets_schedule(self):
+        filebase = self._switchboard.enqueue(
+            self._msg, deliver_after=now() + timedelta(hours=1))
+        self._switchboard.dequeue(filebase)
+        self._switchboard.finish(filebase)
+        self.assertIsNone(self._switchboard.next_due())
+        self.assertEqual(self._switchboard.get_files(), [])
+
+    def test_unknown_files_are_due(self):
+        # Queue files which the index learns about from the queue directory
+        # are due immediately.
+        filebase = Switchboard('scheduled', self._queue_directory).enqueue(
+            self._msg, deliver_after=now() + timedelta(hours=1))
+        self.assertEqual(self._switchboard.files, [filebase])
+
+
+class TestLeases(unittest.TestCase):
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._msg = mfs("""\
+From: anne@example.com
+To: test@example.com
+Message-ID: <ant>
+
+""")
+        self._queue_directory = os.path.join(config.QUEUE_DIR, 'shared')
+        self._one = Switchboard('shared', self._queue_directory, lease=True)
+        self._two = Switchboard('shared', self._queue_directory, lease=True)
+
+    def test_claimed_once(self):
+        # A queue file is only dequeued by one of the switchboards sharing a
+        # queue, even if both found it.
+        filebase = self._one.enqueue(self._msg)
+        self.assertEqual(self._two.files, [filebase])
+        self._one.dequeue(filebase)
+        with self.assertRaises(FileNotFoundError):
+            self._two.dequeue(filebase)
+        self._one.finish(filebase)
+        self.assertEqual(self._one._leases, {})
+
+    def test_locked_file_not_claimed(self):
+        # A queue file locked by another process is left alone.
+        filebase = self._one.enqueue(self._msg)
+        path = os.path.join(self._queue_directory, filebase + '.pck')
+        lease = self._one._lock(path)
+        self.addCleanup(os.close, lease)
+        with self.assertRaises(FileNotFoundError):
+            self._two.dequeue(filebase)
+        self.assertEqual(self._two.files, [filebase])
+
+    def test_recover_only_unclaimed(self):
+        # Only backup files which aren't claimed by a live process are
+        # recovered.
+        claimed = self._one.enqueue(self._msg, n=1)
+        abandoned = self._one.enqueue(self._msg, n=2)
+        self._one.dequeue(claimed)
+        Switchboard('shared', self._queue_directory).dequeue(abandoned)
+        Switchboard(
+            'shared', self._queue_directory, recover=True, lease=True)
+        self.assertEqual(self._one.files, [abandoned])
+        self.assertEqual(self._one.get_files('.bak'), [claimed])
+
+
+class TestQueueWakeup(unittest.TestCase):
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._msg = mfs("""\
+From: anne@example.com
+To: test@example.com
+Message-ID: <ant>
+
+""")
+        self._queue_directory = os.path.join(config.QUEUE_DIR, 'watched')
+        # Only slice 0 of 2 is watched, but files are enqueued to the whole
+        # queue.
+        self._switchboard = Switchboard(
+            'watched', self._queue_directory, 0, 2)
+        self.addCleanup(self._switchboard.close)
+        self._scratch = Switchboard(
+            'scratch', os.path.join(config.QUEUE_DIR, 'scratch'))
+
+    def _enqueue(self, in_slice):
+        # Enqueue messages to a scratch queue until one lands in, or out of,
+        # the watched slice, then move it into the watched queue.
+        n = 0
+        while True:
+            filebase = self._scratch.enqueue(self._msg, n=n)
+            if self._switchboard._in_slice(filebase) == in_slice:
+                break
+            n += 1
+        os.rename(
+            os.path.join(self._scratch.queue_directory, filebase + '.pck'),
+            os.path.join(self._queue_directory, filebase + '.pck'))
+        return filebase
+
+    def test_wait_times_out(self):
+        self.assertTrue(self._switchboard.watch())
+        start = time.monotonic()
+        self.assertFalse(self._switchboard.wait(0.1))
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+
+    def test_wakeup_in_slice(self):
+        # A file enqueued in the watched slice wakes up the waiter without
+        # waiting for the timeout.
+        self.assertTrue(self._switchboard.watch())
+        self._enqueue(in_slice=True)
+        start = time.monotonic()
+        self.assertTrue(self._switchboard.wait(10))
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_no_wakeup_outside_slice(self):
+        # Files in other slices, and backup files, don't wake up the waiter.
+        self.assertTrue(self._switchboard.watch())
+        filebase = self._enqueue(in_slice=False)
+        self.assertFalse(self._switchboard.wait(0.1))
+        Switchboard('watched', self._queue_directory).dequeue(filebase)
+        self.assertFalse(self._switchboard.wait(0.1))
+
+    def test_polling_fallback(self):
+        # When the queue directory can't be watched, waiting just sleeps.
+        mark = LogFileMark('mailman.error')
+        with patch('mailman.core.switchboard.DirectoryWatcher',
+                   side_effect=OSError('nope')):
+            self.assertFalse(self._switchboard.watch())
+        self.assertIn('Cannot watch queue directory', mark.read())
+        start = time.monotonic()
+        self.assertTrue(self._switchboard.wait(0.1))
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
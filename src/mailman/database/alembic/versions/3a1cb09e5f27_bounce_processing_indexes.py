@@ -0,0 +1,45 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""bounce processing indexes
+
+Revision ID: 3a1cb09e5f27
+Revises: 6e604274a060
+Create Date: 2023-10-12 16:05:31.402518
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3a1cb09e5f27'
+down_revision = '6e604274a060'
+
+
+def upgrade():
+    op.create_index(
+        op.f('ix_bounceevent_processed'), 'bounceevent', ['processed'],
+        unique=False)
+    op.create_index(
+        op.f('ix_preferences_delivery_status'), 'preferences',
+        ['delivery_status'], unique=False)
+
+
+def downgrade():
+    op.drop_index(
+        op.f('ix_preferences_delivery_status'), table_name='preferences')
+    op.drop_index(op.f('ix_bounceevent_processed'), table_name='bounceevent')
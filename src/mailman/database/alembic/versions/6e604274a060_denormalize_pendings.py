@@ -0,0 +1,144 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""denormalize pendings
+
+Revision ID: 6e604274a060
+Revises: dfcb37e7e879
+Create Date: 2023-10-09 14:21:07.532109
+
+"""
+import json
+import sqlalchemy as sa
+
+from alembic import op
+from itertools import groupby
+from mailman.database.types import SAUnicode, SAUnicodeXL
+
+
+# revision identifiers, used by Alembic.
+revision = '6e604274a060'
+down_revision = 'dfcb37e7e879'
+
+
+# The pendable keys which get their own columns.
+COLUMNS = {
+    'list_id': 'list_id',
+    'token_owner': 'token_owner',
+    '_mod_message_id': 'message_id',
+    }
+
+# Don't import the table definitions from the models, it may break this
+# migration when the models are updated in the future (see the Alembic doc).
+pended_table = sa.sql.table(
+    'pended',
+    sa.sql.column('id', sa.Integer),
+    sa.sql.column('pend_type', SAUnicode),
+    sa.sql.column('list_id', SAUnicode),
+    sa.sql.column('token_owner', SAUnicode),
+    sa.sql.column('message_id', SAUnicode),
+    sa.sql.column('data', SAUnicodeXL),
+    )
+
+keyvalue_table = sa.sql.table(
+    'pendedkeyvalue',
+    sa.sql.column('id', sa.Integer),
+    sa.sql.column('key', SAUnicode),
+    sa.sql.column('value', SAUnicodeXL),
+    sa.sql.column('pended_id', sa.Integer),
+    )
+
+
+def upgrade():
+    with op.batch_alter_table('pended') as batch_op:
+        for name in ('pend_type', 'list_id', 'token_owner', 'message_id'):
+            batch_op.add_column(sa.Column(name, SAUnicode(), nullable=True))
+            batch_op.create_index(
+                op.f('ix_pended_{}'.format(name)), [name], unique=False)
+        batch_op.add_column(sa.Column('data', SAUnicodeXL(), nullable=True))
+    # Data migration.  Read all the key/value pairs at once, sorted by the
+    # pended item they belong to.
+    connection = op.get_bind()
+    keyvalues = connection.execute(
+        sa.select(keyvalue_table.c.pended_id,
+                  keyvalue_table.c.key,
+                  keyvalue_table.c.value).order_by(
+                      keyvalue_table.c.pended_id, keyvalue_table.c.id)
+        ).fetchall()
+    for pended_id, rows in groupby(keyvalues, key=lambda row: row[0]):
+        values = {}
+        data = {}
+        for pended_id, key, value in rows:
+            # The type is not JSON encoded.
+            if key == 'type':
+                values['pend_type'] = value
+                continue
+            value = json.loads(value)
+            column = COLUMNS.get(key)
+            if column is not None and isinstance(value, str):
+                values[column] = value
+            else:
+                data[key] = value
+        values['data'] = json.dumps(data)
+        connection.execute(pended_table.update().where(
+            pended_table.c.id == pended_id).values(**values))
+    connection.execute(pended_table.update().where(
+        pended_table.c.data.is_(None)).values(data='{}'))
+    op.drop_table('pendedkeyvalue')
+
+
+def downgrade():
+    op.create_table(
+        'pendedkeyvalue',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('key', SAUnicode(), nullable=True),
+        sa.Column('value', SAUnicodeXL(), nullable=True),
+        sa.Column('pended_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['pended_id'], ['pended.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    op.create_index(
+        op.f('ix_pendedkeyvalue_key'), 'pendedkeyvalue', ['key'],
+        unique=False)
+    op.create_index(
+        op.f('ix_pendedkeyvalue_pended_id'), 'pendedkeyvalue', ['pended_id'],
+        unique=False)
+    op.create_index(
+        op.f('ix_pendedkeyvalue_value'), 'pendedkeyvalue', ['value'],
+        unique=False, mysql_length=100)
+    # Data migration.
+    connection = op.get_bind()
+    for row in connection.execute(pended_table.select()).fetchall():
+        keyvalues = []
+        if row.pend_type is not None:
+            keyvalues.append(dict(key='type', value=row.pend_type))
+        for key, column in COLUMNS.items():
+            value = getattr(row, column)
+            if value is not None:
+                keyvalues.append(dict(key=key, value=json.dumps(value)))
+        for key, value in json.loads(row.data or '{}').items():
+            keyvalues.append(dict(key=key, value=json.dumps(value)))
+        if len(keyvalues) > 0:
+            connection.execute(keyvalue_table.insert().values([
+                dict(pended_id=row.id, **keyvalue)
+                for keyvalue in keyvalues
+                ]))
+    with op.batch_alter_table('pended') as batch_op:
+        for name in ('pend_type', 'list_id', 'token_owner', 'message_id'):
+            batch_op.drop_index(op.f('ix_pended_{}'.format(name)))
+            batch_op.drop_column(name)
+        batch_op.drop_column('data')
@@ -0,0 +1,46 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""add generation table
+
+Revision ID: dfcb37e7e879
+Revises: 2156fc3f6f7d
+Create Date: 2023-10-02 10:12:31.418305
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+from mailman.database.types import SAUnicode
+
+
+# revision identifiers, used by Alembic.
+revision = 'dfcb37e7e879'
+down_revision = '2156fc3f6f7d'
+
+
+def upgrade():
+    op.create_table(
+        'generation',
+        sa.Column('name', SAUnicode(), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+        )
+
+
+def downgrade():
+    op.drop_table('generation')
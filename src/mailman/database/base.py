@@ -93,6 +93,15 @@ class SABaseDatabase:
     def close_session(self):
         self.store.close()
 
+    def after_fork(self):
+        """See `IDatabase`."""
+        # The connections and session inherited from the parent process are
+        # still in use there, so just forget about them instead of closing
+        # them.  New connections are made on demand.  This needs SQLAlchemy
+        # 1.4.33 or newer.
+        self.sessionmaker.registry.clear()
+        self.engine.dispose(close=False)
+
     def initialize(self, debug=None):
         """See `IDatabase`."""
         # Calculate the engine url.
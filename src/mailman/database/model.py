@@ -45,7 +45,10 @@ class ModelMeta:
                 # https://docs.sqlalchemy.org/en/latest/core/metadata.html \
                 # #accessing-tables-and-columns
                 for table in reversed(Model.metadata.sorted_tables):
-                    connection.execute(table.delete())
+                    # Generations must keep increasing so that the caches of
+                    # other processes see the reset.  See reset_the_world().
+                    if table.name != 'generation':
+                        connection.execute(table.delete())
             except:                             # noqa: E722 pragma: nocover
                 connection.rollback()
                 raise
@@ -21,6 +21,7 @@ import os
 
 from mailman.database.base import SABaseDatabase
 from public import public
+from sqlalchemy import event
 from sqlalchemy.pool import NullPool
 from urllib.parse import urlparse
 
@@ -50,3 +51,19 @@ class SQLiteDatabase(SABaseDatabase):
         # so we can do multiple connections.
         # https://docs.sqlalchemy.org/en/20/dialects/sqlite.html#threading-pooling-behavior
         self.pool_class = NullPool
+
+    def initialize(self, debug=None):
+        """See `IDatabase`."""
+        super().initialize(debug)
+
+        # The pysqlite driver only starts a transaction before the first data
+        # modifying statement, so a savepoint opened before that starts the
+        # transaction itself, and releasing it commits everything.  Start the
+        # transaction explicitly in that case so that savepoints, which
+        # batching runners rely on, nest inside it.  Transactions which don't
+        # use savepoints are left to the driver, so that reads don't keep the
+        # database locked.
+        @event.listens_for(self.engine, 'savepoint')
+        def do_savepoint(connection, name):
+            if not connection.connection.dbapi_connection.in_transaction:
+                connection.exec_driver_sql('BEGIN')
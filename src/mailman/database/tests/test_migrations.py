@@ -18,6 +18,7 @@
 """Test database schema migrations with Alembic"""
 
 import os
+import json
 import unittest
 import sqlalchemy as sa
 import alembic.command
@@ -512,3 +513,66 @@ class TestMigrations(unittest.TestCase):
         # Test that if the database already has member_roster_visibility filed,
         # then make sure that we can ugprade.
         alembic.command.upgrade(alembic_cfg, '15401063d4e3')
+
+    def test_6e604274a060_denormalize_pendings(self):
+        pended_table = sa.sql.table(
+            'pended',
+            sa.sql.column('id', sa.Integer),
+            sa.sql.column('token', SAUnicode),
+            sa.sql.column('pend_type', SAUnicode),
+            sa.sql.column('list_id', SAUnicode),
+            sa.sql.column('token_owner', SAUnicode),
+            sa.sql.column('message_id', SAUnicode),
+            sa.sql.column('data', SAUnicode),
+            )
+        keyvalue_table = sa.sql.table(
+            'pendedkeyvalue',
+            sa.sql.column('key', SAUnicode),
+            sa.sql.column('value', SAUnicode),
+            sa.sql.column('pended_id', sa.Integer),
+            )
+        keyvalues = [
+            {'pended_id': 1, 'key': 'type', 'value': 'held message'},
+            {'pended_id': 1, 'key': 'list_id', 'value': '"ant.example.com"'},
+            {'pended_id': 1, 'key': '_mod_message_id', 'value': '"<ant>"'},
+            {'pended_id': 1, 'key': 'id', 'value': '7'},
+            {'pended_id': 2, 'key': 'type', 'value': 'subscription'},
+            {'pended_id': 2, 'key': 'token_owner', 'value': '"moderator"'},
+            {'pended_id': 2, 'key': 'list_id', 'value': 'null'},
+            ]
+        with transaction():
+            # Start at the previous revision.
+            alembic.command.downgrade(alembic_cfg, 'dfcb37e7e879')
+            for i in (1, 2, 3):
+                config.db.store.execute(
+                    sa.sql.table('pended', sa.sql.column('id', sa.Integer))
+                    .insert().values(id=i))
+            config.db.store.execute(
+                keyvalue_table.insert().values(keyvalues))
+        # Upgrading.
+        with transaction():
+            alembic.command.upgrade(alembic_cfg, '6e604274a060')
+            results = config.db.store.execute(
+                sa.select(pended_table.c.id, pended_table.c.pend_type,
+                          pended_table.c.list_id, pended_table.c.token_owner,
+                          pended_table.c.message_id, pended_table.c.data)
+                .order_by(pended_table.c.id)).fetchall()
+        self.assertFalse(exists_in_db(config.db.engine, 'pendedkeyvalue'))
+        self.assertEqual([tuple(row[:5]) for row in results], [
+            (1, 'held message', 'ant.example.com', None, '<ant>'),
+            (2, 'subscription', None, 'moderator', None),
+            (3, None, None, None, None),
+            ])
+        self.assertEqual(
+            [json.loads(row[5]) for row in results],
+            [{'id': 7}, {'list_id': None}, {}])
+        # Downgrading.
+        with transaction():
+            alembic.command.downgrade(alembic_cfg, 'dfcb37e7e879')
+            results = config.db.store.execute(
+                sa.select(keyvalue_table.c.pended_id, keyvalue_table.c.key,
+                          keyvalue_table.c.value)).fetchall()
+        self.assertEqual(
+            sorted(tuple(row) for row in results),
+            sorted((kv['pended_id'], kv['key'], kv['value'])
+                   for kv in keyvalues))
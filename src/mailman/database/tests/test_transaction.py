@@ -97,3 +97,26 @@ class APITransactionTest(unittest.TestCase):
         # This is because another_obj is in detached state as we closed
         # the session it was attached to.
         self.assertTrue(inspect(another_obj).detached)
+
+
+class SavepointTest(unittest.TestCase):
+    layer = ConfigLayer
+
+    def setUp(self):
+        Base.metadata.create_all(config.db.engine)
+        config.db.commit()
+
+    def tearDown(self):
+        config.db.abort()
+        Base.metadata.drop_all(config.db.engine)
+
+    def test_released_savepoint_rolls_back(self):
+        # A savepoint opened first thing in a transaction nests inside it, so
+        # aborting the transaction after releasing the savepoint still throws
+        # away its changes.
+        session = config.db.store
+        savepoint = session.begin_nested()
+        session.add(AModel(data='some data'))
+        savepoint.commit()
+        config.db.abort()
+        self.assertEqual(session.query(AModel).count(), 0)
@@ -38,15 +38,21 @@ log = logging.getLogger('mailman.error')
 alog = logging.getLogger('mailman.archiver')
 
 
-def process(mlist, msg, msgdata):
-    """Decorate the message with headers and footers."""
+@public
+def decorations(mlist, msg, msgdata):
+    """Return the header and footer to decorate the message with.
+
+    :return: The expanded header and footer texts.  Both are empty if the
+        message should not be decorated.
+    :rtype: 2-tuple of str
+    """
     # Digests and Mailman-craft messages should not get additional headers.
     if msgdata.get('isdigest') or msgdata.get('nodecorate'):
-        return
+        return '', ''
     # Kludge to not decorate mail for Mail-Archive.com.
     if ('recipients' in msgdata and len(msgdata['recipients']) == 1 and
             list(msgdata['recipients'])[0] == MailArchive().recipient):
-        return
+        return '', ''
     d = {}
     member = msgdata.get('member')
     if member is not None:
@@ -87,6 +93,12 @@ def process(mlist, msg, msgdata):
     d.update(msgdata.get('decoration-data', {}))
     header = decorate('list:member:regular:header', mlist, d)
     footer = decorate('list:member:regular:footer', mlist, d)
+    return header, footer
+
+
+def process(mlist, msg, msgdata):
+    """Decorate the message with headers and footers."""
+    header, footer = decorations(mlist, msg, msgdata)
     # Escape hatch if both the footer and header are empty or None.
     if len(header) == 0 and len(footer) == 0:
         return
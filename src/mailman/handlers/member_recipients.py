@@ -81,9 +81,7 @@ attached.
 """)
                 raise RejectMessage(wrap(text))
         # Calculate the regular recipients of the message
-        recipients = set(member.address.email
-                         for member in mlist.regular_members.members
-                         if member.delivery_status == DeliveryStatus.enabled)
+        recipients = mlist.regular_members.get_emails(DeliveryStatus.enabled)
         # Remove the sender if they don't want to receive their own posts
         if not include_sender and member.address.email in recipients:
             recipients.remove(member.address.email)
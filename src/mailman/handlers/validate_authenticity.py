@@ -27,6 +27,7 @@ from itertools import chain
 from mailman.config import config
 from mailman.core.i18n import _
 from mailman.interfaces.handler import IHandler
+from mailman.utilities.dnscache import cache_default_resolver
 from mailman.utilities.retry import retry
 from public import public
 from zope.interface import implementer
@@ -90,6 +91,8 @@ def authenticate(msg, msgdata):
     new one.
     """
     prev = trusted_auth_res(msg)
+    # The DKIM and ARC checks look up keys through the default resolver.
+    cache_default_resolver()
     auth_result = authenticate_message(
         msg.as_bytes(), config.arc.authserv_id,
         prev=prev,
@@ -105,6 +105,20 @@ class IBounceProcessor(Interface):
         :type event: IBounceEvent
         """
 
+    def process_events():
+        """Process all the unprocessed bounce events in batches.
+
+        Events are grouped by mailing list and email address, so that each
+        list and member is looked up only once per batch.  The transaction is
+        committed after each batch.  Events for lists or members which don't
+        exist anymore are marked as processed and logged.  When processing
+        the events of a member fails, the changes for that member are rolled
+        back and logged, and its events are left unprocessed.
+
+        :return: The number of events processed.
+        :rtype: int
+        """
+
     def send_warnings_and_remove():
         """Send warnings to disabled users and remove them if needed.
 
@@ -49,6 +49,14 @@ class IDatabase(Interface):
     def abort():
         """Abort the current transaction."""
 
+    def after_fork():
+        """Prepare the database layer for use in a forked child process.
+
+        The child must not use the database connections it inherited from its
+        parent.  This drops them without closing them, so the parent can keep
+        on using them.
+        """
+
     # maxking: This is commented out because it is not an attribute anymore
     # but implemented as a property and I haven't figured out a way to fix
     # this with zope.interface implementations.
@@ -91,8 +91,24 @@ class IMessageStore(Interface):
         :param message: The Message-ID of the message to delete from the store.
         """
 
+    def get_message_text(message_id):
+        """Return the text of the message with a matching Message-ID.
+
+        Messages stored as bytes are not parsed.
+
+        :param message_id: The Message-ID header contents to search for.
+        :returns: The message text, or None if no matching message was found.
+        """
+
     messages = Attribute(
-        """An iterator over all messages in this message store.""")
+        """An iterator over all messages in this message store.
+
+        Every message is loaded; use `metadata` to enumerate the messages
+        without loading them.""")
+
+    metadata = Attribute(
+        """An iterator over the `IMessage` metadata of all messages in this
+        message store.  The messages themselves are not loaded.""")
 
 
 @public
@@ -68,15 +68,6 @@ class IPended(Interface):
     expiration_date = Attribute("""The expiration date of the pended event.""")
 
 
-@public
-class IPendedKeyValue(Interface):
-    """A pended key/value pair."""
-
-    key = Attribute("""The pended key.""")
-
-    value = Attribute("""The pended value.""")
-
-
 @public
 class IPendings(Interface):
     """Interface to pending database."""
@@ -101,8 +92,15 @@ class IPendings(Interface):
         :return: The matching IPendable or None if no match was found.
         """
 
-    def evict():
-        """Remove all pended items whose lifetime has expired."""
+    def evict(limit=None):
+        """Remove all pended items whose lifetime has expired.
+
+        :param limit: The maximum number of pended items to remove, or None
+            to remove all the expired items.
+        :type limit: int
+        :return: The number of removed pended items.
+        :rtype: int
+        """
 
     def find(mlist=None, pend_type=None, confirm=True):
         """Search for the pendables matching the given criteria.
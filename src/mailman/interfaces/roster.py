@@ -75,3 +75,19 @@ class IRoster(Interface):
         :return: All the memberships associated with this email address.
         :rtype: sequence of length 0, 1, or 2 of ``IMember``
         """
+
+    def snapshot(emails=None):
+        """Get the members for many addresses at once.
+
+        The members, along with their addresses, users and preferences, are
+        loaded from the database in a single query, which is much cheaper
+        than calling ``get_member()`` for each address.
+
+        :param emails: The email addresses to search for, or None for all the
+            members of the roster.
+        :type emails: iterable of strings
+        :return: A mapping from email address to the member which
+            ``get_member()`` would return for it.  Addresses which are not
+            members are missing.
+        :rtype: dict
+        """
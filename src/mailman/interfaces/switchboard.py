@@ -66,17 +66,54 @@ class ISwitchboard(Interface):
     files = Attribute(
         """An iterator over all the .pck files in the queue directory.
 
-        The base names of the matching files are returned.
+        The base names of the matching files are returned.  Switchboards which
+        schedule their queue files only return the ones which are due.
         """)
 
-    def get_files(extension='.pck'):
+    def get_files(extension='.pck', count=None):
         """Like the 'files' attribute, but accepts an alternative extension.
 
         Only the files in the queue directory that have a matching extension
         are returned.  Like 'files', the base names of the matching files are
-        returned.
+        returned.  If count is given, at most that many of the oldest files
+        are returned.
         """
 
+    def next_files(count):
+        """Return the next .pck files to process, oldest first.
+
+        Like 'files', but at most count base names are returned, and
+        switchboards which keep an index of their queue files don't read
+        the whole queue to find them.
+
+        :param count: The maximum number of files to return.
+        :type count: int
+        """
+
+    def watch():
+        """Start watching the queue directory for new queue files.
+
+        This uses Linux inotify.  Once watching, `wait()` returns as soon as a
+        new queue file in this switchboard's slice appears.
+
+        :return: True if the queue directory is being watched, False if
+            watching isn't possible here and `wait()` will just sleep.
+        :rtype: bool
+        """
+
+    def wait(timeout):
+        """Wait for new queue files.
+
+        :param timeout: The maximum number of seconds to wait.
+        :type timeout: float
+        :return: True if there may be new queue files to process, False if
+            the timeout expired while watching without any showing up.
+        :rtype: bool
+        """
+
+    def close():
+        """Stop watching the queue directory."""
+
     def recover_backup_files():
         """Move all backup files to active message files.
 
@@ -23,12 +23,18 @@ from mailman.database.model import Model
 from mailman.database.transaction import dbconnection
 from mailman.database.types import SAUnicode
 from mailman.interfaces.bans import IBan, IBanManager
+from mailman.model.generation import GenerationCounter
 from mailman.utilities.queries import QuerySequence
 from public import public
 from sqlalchemy import Column, Integer, select
 from zope.interface import implementer
 
 
+# Bumped whenever bans are added or removed.
+bans_generation = GenerationCounter('bans')
+public(bans_generation=bans_generation)
+
+
 @public
 @implementer(IBan)
 class Ban(Model):
@@ -46,6 +52,82 @@ class Ban(Model):
         self.list_id = list_id
 
 
+@public
+class BanIndex:
+    """The bans of a mailing list, or the global bans, ready for matching.
+
+    Literal bans are kept in a set.  Pattern bans, i.e. those starting with
+    a ^, are compiled once; patterns without groups are combined into a
+    single alternation.
+    """
+
+    def __init__(self, emails):
+        """Create an index.
+
+        :param emails: The banned email addresses and patterns.
+        :type emails: iterable of str
+        """
+        self._emails = set()
+        combinable = []
+        self._patterns = []
+        for email in emails:
+            if not email.startswith('^'):
+                self._emails.add(email)
+                continue
+            pattern = re.compile(email, re.IGNORECASE)
+            # Combining patterns with groups would renumber them, breaking
+            # any backreferences.
+            if pattern.groups == 0:
+                combinable.append(email)
+            else:
+                self._patterns.append(pattern)
+        if len(combinable) > 0:
+            self._patterns.append(re.compile(
+                '|'.join('(?:{})'.format(email) for email in combinable),
+                re.IGNORECASE))
+
+    def matches(self, email):
+        """Return whether the email address is banned.
+
+        :param email: The email address.
+        :type email: str
+        :rtype: bool
+        """
+        if email in self._emails:
+            return True
+        return any(pattern.match(email) is not None
+                   for pattern in self._patterns)
+
+
+class BanCache:
+    """The ban indexes of this process."""
+
+    def __init__(self):
+        self._indexes = {}
+        self._current = None
+
+    @dbconnection
+    def get(self, store, list_id):
+        """Return the index of a mailing list's bans.
+
+        :param list_id: The list-id, or None for the global bans.
+        :rtype: `BanIndex`
+        """
+        generation = bans_generation.get()
+        if generation != self._current:
+            self._indexes = {}
+            self._current = generation
+        index = self._indexes.get(list_id)
+        if index is None:
+            index = BanIndex(store.execute(
+                select(Ban.email).filter_by(list_id=list_id)).scalars())
+            self._indexes[list_id] = index
+        return index
+
+
+_ban_cache = BanCache()
+
+
 @public
 @implementer(IBanManager)
 class BanManager:
@@ -62,6 +144,7 @@ class BanManager:
         if bans.count() == 0:
             ban = Ban(email, self._list_id)
             store.add(ban)
+            bans_generation.bump()
 
     @dbconnection
     def unban(self, store, email):
@@ -70,45 +153,15 @@ class BanManager:
             email=email, list_id=self._list_id).first()
         if ban is not None:
             store.delete(ban)
+            bans_generation.bump()
 
-    @dbconnection
-    def is_banned(self, store, email):
+    def is_banned(self, email):
         """See `IBanManager`."""
-        list_id = self._list_id
-        if list_id is None:
-            # The client is asking for global bans.  Look up bans on the
-            # specific email address first.
-            bans = store.query(Ban).filter_by(email=email, list_id=None)
-            if bans.count() > 0:
-                return True
-            # And now look for global pattern bans.
-            bans = store.query(Ban).filter_by(list_id=None)
-            for ban in bans:
-                if (ban.email.startswith('^') and
-                        re.match(ban.email, email, re.IGNORECASE) is not None):
-                    return True
-        else:
-            # This is a list-specific ban.
-            bans = store.query(Ban).filter_by(email=email, list_id=list_id)
-            if bans.count() > 0:
-                return True
-            # Try global bans next.
-            bans = store.query(Ban).filter_by(email=email, list_id=None)
-            if bans.count() > 0:
-                return True
-            # Now try specific mailing list bans, but with a pattern.
-            bans = store.query(Ban).filter_by(list_id=list_id)
-            for ban in bans:
-                if (ban.email.startswith('^') and
-                        re.match(ban.email, email, re.IGNORECASE) is not None):
-                    return True
-            # And now try global pattern bans.
-            bans = store.query(Ban).filter_by(list_id=None)
-            for ban in bans:
-                if (ban.email.startswith('^') and
-                        re.match(ban.email, email, re.IGNORECASE) is not None):
-                    return True
-        return False
+        # Check the list-specific bans first, then the global bans.
+        if (self._list_id is not None and
+                _ban_cache.get(self._list_id).matches(email)):
+            return True
+        return _ban_cache.get(None).matches(email)
 
     @property
     @dbconnection
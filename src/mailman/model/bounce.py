@@ -71,7 +71,7 @@ class BounceEvent(Model):
     timestamp = Column(DateTime)
     message_id = Column(SAUnicode)
     context = Column(Enum(BounceContext))
-    processed = Column(Boolean)
+    processed = Column(Boolean, index=True)
 
     def __init__(self, list_id, email, msg, context=None):
         self.list_id = list_id
@@ -146,28 +146,112 @@ class BounceProcessor:
             send_admin_disable_notice(
                 mlist, event, display_name=member.display_name)
 
-    @transactional
-    @dbconnection
-    def process_event(self, store, event):
-        """See `IBounceProcessor`."""
-        list_manager = getUtility(IListManager)
-        mlist = list_manager.get(event.list_id)
+    def _resolve(self, event, mlist):
+        """Return the member an event is about, or raise.
+
+        The event is marked as processed when it can't be resolved.
+
+        :param event: The bounce event.
+        :type event: IBounceEvent
+        :param mlist: The mailing list the event belongs to or None if it
+            doesn't exist anymore.
+        :type mlist: IMailingList
+        :return: The member the bouncing address belongs to.
+        :rtype: IMember
+        :raises InvalidBounceEvent: When the list or the member is gone.
+        """
         if mlist is None:
             # List was removed before the bounce is processed.
             event.processed = True
-            # This needs an explicit commit because of the raise.
-            config.db.commit()
             raise InvalidBounceEvent(
                 'Bounce for non-existent list {}'.format(event.list_id))
         member = mlist.members.get_member(event.email)
         if member is None:
             event.processed = True
-            # This needs an explicit commit because of the raise.
-            config.db.commit()
             raise InvalidBounceEvent(
                 'Email {} is not a subcriber of {}'.format(
                     event.email, mlist.list_id))
+        return member
 
+    @transactional
+    @dbconnection
+    def process_event(self, store, event):
+        """See `IBounceProcessor`."""
+        mlist = getUtility(IListManager).get(event.list_id)
+        try:
+            member = self._resolve(event, mlist)
+        except InvalidBounceEvent:
+            # This needs an explicit commit because of the raise.
+            config.db.commit()
+            raise
+        self._process(mlist, member, event)
+
+    @dbconnection
+    def process_events(self, store):
+        """See `IBounceProcessor`."""
+        batch_size = int(config.mailman.bounce_batch_size)
+        list_manager = getUtility(IListManager)
+        lists = {}
+        count = 0
+        last_id = 0
+        while True:
+            events = store.query(BounceEvent).filter(
+                BounceEvent.processed == False,     # noqa: E712
+                BounceEvent.id > last_id).order_by(
+                    BounceEvent.id).limit(batch_size).all()
+            if len(events) == 0:
+                break
+            last_id = events[-1].id
+            # Group the events by member, keeping them in the order they were
+            # registered in, so that each list and member is looked up only
+            # once per batch and all but the first bounce of the day are
+            # cheap no-ops.
+            by_member = {}
+            for event in events:
+                by_member.setdefault(
+                    (event.list_id, event.email), []).append(event)
+            for (list_id, email), member_events in by_member.items():
+                if list_id not in lists:
+                    lists[list_id] = list_manager.get(list_id)
+                mlist = lists[list_id]
+                try:
+                    member = self._resolve(member_events[0], mlist)
+                except InvalidBounceEvent as error:
+                    log.info('Bounce message for a non subscriber: %s', error)
+                    for event in member_events:
+                        event.processed = True
+                    continue
+                # Process each member's events in their own savepoint, so
+                # that a failure only loses the changes for that member.
+                # Their events stay unprocessed, to be retried later.
+                savepoint = store.begin_nested()
+                try:
+                    for event in member_events:
+                        self._process(mlist, member, event)
+                except Exception:
+                    log.exception(
+                        'Failed to process bounce events for %s on list %s',
+                        email, list_id)
+                    savepoint.rollback()
+                    count -= len(member_events)
+                else:
+                    savepoint.commit()
+            config.db.commit()
+            count += len(events)
+            if len(events) < batch_size:
+                break
+        return count
+
+    def _process(self, mlist, member, event):
+        """Apply a regular or probe bounce event to a member.
+
+        :param mlist: The mailing list which bounce event belongs to.
+        :type mlist: IMailingList
+        :param member: The member object the bouncing address belongs to.
+        :type member: IMember
+        :param event: The bounce event to process.
+        :type event: IBounceEvent
+        """
         # If this is a probe bounce, that we are sent before to check for this
         # Mailbox, we just disable the delivery for this member.
         if event.context == BounceContext.probe:
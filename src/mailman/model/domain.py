@@ -31,6 +31,7 @@ from mailman.interfaces.domain import (
 )
 from mailman.interfaces.user import IUser
 from mailman.interfaces.usermanager import IUserManager
+from mailman.model.generation import GenerationCounter
 from mailman.model.mailinglist import MailingList
 from public import public
 from sqlalchemy import Column, func, Integer, select
@@ -40,6 +41,13 @@ from zope.event import notify
 from zope.interface import implementer
 
 
+# Bumped whenever mailing lists or domains are created or deleted, or a
+# domain's alias domain changes, so that the LMTP servers forget the
+# recipient addresses they resolved.
+lists_generation = GenerationCounter('lists')
+public(lists_generation=lists_generation)
+
+
 @public
 @implementer(IDomain)
 class Domain(Model):
@@ -54,7 +62,7 @@ class Domain(Model):
     owners = relationship('User',
                           secondary='domain_owner',
                           backref='domains')
-    alias_domain = Column(SAUnicode)
+    _alias_domain = Column('alias_domain', SAUnicode)
 
     def __init__(self, mail_host,
                  description=None,
@@ -75,7 +83,20 @@ class Domain(Model):
         self.description = description
         if owners is not None:
             self.add_owners(owners)
-        self.alias_domain = alias_domain
+        self._alias_domain = alias_domain
+
+    @property
+    def alias_domain(self):
+        """See `IDomain`."""
+        return self._alias_domain
+
+    @alias_domain.setter
+    def alias_domain(self, alias_domain):
+        # The LMTP servers may have resolved addresses in the old alias
+        # domain.
+        if alias_domain != self._alias_domain:
+            lists_generation.bump()
+        self._alias_domain = alias_domain
 
     @property
     @dbconnection
@@ -0,0 +1,101 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Generation counters for invalidating in-process caches."""
+
+import random
+
+from mailman.database.model import Model
+from mailman.database.transaction import dbconnection
+from mailman.database.types import SAUnicode
+from public import public
+from sqlalchemy import Column, Integer
+
+
+# Generations fit in a signed 32 bit integer column.
+MAX_GENERATION = 1 << 31
+
+
+class Generation(Model):
+    """A named counter which is bumped whenever some data changes."""
+
+    __tablename__ = 'generation'
+
+    name = Column(SAUnicode, primary_key=True)
+    value = Column(Integer, nullable=False)
+
+    def __init__(self, name, value):
+        super().__init__()
+        self.name = name
+        self.value = value
+
+
+@public
+class GenerationCounter:
+    """A generation shared by all the processes using the database.
+
+    A process caching some data remembers the generation it read the data
+    in, and throws the data away when the generation has changed, i.e. when
+    another process has changed the data and called `bump()`.
+
+    Bumping picks a new random generation rather than incrementing it.  A
+    process may have cached data from a transaction which was later aborted,
+    and the bumps of other processes must not reuse that generation.
+    """
+
+    def __init__(self, name):
+        """Create a counter.
+
+        :param name: The name of the counter.
+        :type name: str
+        """
+        self.name = name
+
+    @dbconnection
+    def get(self, store):
+        """Return the current generation.
+
+        :return: The generation, or 0 if it was never bumped.
+        :rtype: int
+        """
+        value = store.query(Generation.value).filter(
+            Generation.name == self.name).scalar()
+        return 0 if value is None else value
+
+    @dbconnection
+    def bump(self, store):
+        """Change the generation.
+
+        The new generation becomes visible to other processes when the
+        current transaction is committed.
+        """
+        value = random.randrange(1, MAX_GENERATION)
+        count = store.query(Generation).filter(
+            Generation.name == self.name).update(
+                {Generation.value: value}, synchronize_session=False)
+        if count == 0:
+            store.add(Generation(self.name, value))
+            store.flush()
+
+
+@public
+@dbconnection
+def bump_generations(store):
+    """Bump all the generations, e.g. after the database was reset."""
+    store.query(Generation).update(
+        {Generation.value: Generation.value % (MAX_GENERATION - 1) + 1},
+        synchronize_session=False)
@@ -29,7 +29,7 @@ from mailman.interfaces.listmanager import (
 )
 from mailman.interfaces.requests import IListRequests
 from mailman.model.autorespond import AutoResponseRecord
-from mailman.model.bans import Ban
+from mailman.model.bans import Ban, bans_generation
 from mailman.model.mailinglist import (
     IAcceptableAliasSet,
     ListArchiver,
@@ -98,6 +98,7 @@ class ListManager:
         store.query(ContentFilter).filter_by(mailing_list=mlist).delete()
         store.query(ListArchiver).filter_by(mailing_list=mlist).delete()
         store.query(Ban).filter_by(list_id=mlist.list_id).delete()
+        bans_generation.bump()
         store.delete(mlist)
         notify(ListDeletedEvent(fqdn_listname))
 
@@ -22,8 +22,11 @@ import errno
 import pickle
 
 from contextlib import suppress
+from email import message_from_bytes
 from mailman.config import config
+from mailman.core.switchboard import as_raw
 from mailman.database.transaction import dbconnection
+from mailman.email.message import Message as EmailMessage
 from mailman.interfaces.messages import IMessageStore
 from mailman.model.message import Message
 from mailman.utilities.email import add_message_hash
@@ -36,6 +39,8 @@ from zope.interface import implementer
 # value.  We'd need a script to reshuffle and resplit.
 MAX_SPLITS = 2
 EMPTYSTRING = ''
+# Messages stored as RFC 5322 bytes instead of pickles have this extension.
+RAW_EXTENSION = '.eml'
 
 
 @public
@@ -67,6 +72,9 @@ class MessageStore:
             parts.append(split.pop(0) + split.pop(0))
         parts.append(hash32)
         relpath = os.path.join(*parts)
+        rawmsg = as_raw(message)
+        if config.mailman.message_store_format == 'raw' and rawmsg is not None:
+            relpath += RAW_EXTENSION
         # Store the message in the database.  This relies on the database
         # providing a unique serial number, but to get this information, we
         # have to use a straight insert instead of relying on Elixir to create
@@ -82,8 +90,11 @@ class MessageStore:
         while True:
             try:
                 with open(path, 'wb') as fp:
-                    # -1 says to use the highest protocol available.
-                    pickle.dump(message, fp, -1)
+                    if relpath.endswith(RAW_EXTENSION):
+                        fp.write(rawmsg)
+                    else:
+                        # -1 says to use the highest protocol available.
+                        pickle.dump(message, fp, -1)
                     break
             except IOError as error:
                 if error.errno != errno.ENOENT:
@@ -92,16 +103,25 @@ class MessageStore:
         return hash32
 
     @dbconnection
-    def _get_message(self, store, row):
+    def _read(self, store, row, raw):
+        # Return the message of the row, as bytes if raw is true and the
+        # message is stored that way.
         path = os.path.join(config.MESSAGES_DIR, row.path)
         # The message file may have been externally removed.
         with suppress(FileNotFoundError):
             with open(path, 'rb') as fp:
-                return pickle.load(fp)
+                if not row.path.endswith(RAW_EXTENSION):
+                    return pickle.load(fp)
+                if raw:
+                    return fp.read()
+                return message_from_bytes(fp.read(), EmailMessage)
         # The message is gone.  Delete the entry and return None.
         store.delete(row)
         return None
 
+    def _get_message(self, row):
+        return self._read(row, raw=False)
+
     @dbconnection
     def get_message_by_id(self, store, message_id):
         row = store.query(Message).filter_by(message_id=message_id).first()
@@ -117,12 +137,28 @@ class MessageStore:
             return None
         return self._get_message(row)
 
+    @dbconnection
+    def get_message_text(self, store, message_id):
+        row = store.query(Message).filter_by(message_id=message_id).first()
+        if row is None:
+            return None
+        msg = self._read(row, raw=True)
+        if isinstance(msg, bytes):
+            # The message doesn't have to be parsed.
+            return msg.decode('utf-8', 'surrogateescape')
+        return None if msg is None else msg.as_string()
+
     @property
     @dbconnection
     def messages(self, store):
         for row in store.query(Message).all():
             yield self._get_message(row)
 
+    @property
+    @dbconnection
+    def metadata(self, store):
+        yield from store.query(Message).order_by(Message.id).all()
+
     @dbconnection
     def delete_message(self, store, message_id):
         row = store.query(Message).filter_by(message_id=message_id).first()
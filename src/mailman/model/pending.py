@@ -24,18 +24,12 @@ from mailman.config import config
 from mailman.database.model import Model
 from mailman.database.transaction import dbconnection
 from mailman.database.types import SAUnicode, SAUnicodeXL
-from mailman.interfaces.pending import (
-    IPendable,
-    IPended,
-    IPendedKeyValue,
-    IPendings,
-)
+from mailman.interfaces.pending import IPendable, IPended, IPendings
 from mailman.interfaces.workflow import IWorkflowStateManager
 from mailman.utilities.datetime import now
 from mailman.utilities.uid import TokenFactory
 from public import public
-from sqlalchemy import and_, Column, DateTime, ForeignKey, Index, Integer
-from sqlalchemy.orm import aliased, relationship
+from sqlalchemy import Column, DateTime, Integer
 from zope.component import getUtility
 from zope.interface import implementer
 from zope.interface.verify import verifyObject
@@ -43,24 +37,14 @@ from zope.interface.verify import verifyObject
 
 token_factory = TokenFactory()
 
-
-@public
-@implementer(IPendedKeyValue)
-class PendedKeyValue(Model):
-    """A pended key/value pair, tied to a token."""
-
-    __tablename__ = 'pendedkeyvalue'
-    __table_args__ = (Index('ix_pendedkeyvalue_value', 'value',
-                            mysql_length=100), )
-
-    id = Column(Integer, primary_key=True)
-    key = Column(SAUnicode, index=True)
-    value = Column(SAUnicodeXL)
-    pended_id = Column(Integer, ForeignKey('pended.id'), index=True)
-
-    def __init__(self, key, value):
-        self.key = key
-        self.value = value
+# The keys of the pendables which are stored in their own indexed columns, so
+# that pendables can be found by their values, mapped to the column names.
+# The other keys are stored together in a JSON object.
+COLUMNS = {
+    'list_id': 'list_id',
+    'token_owner': 'token_owner',
+    '_mod_message_id': 'message_id',
+    }
 
 
 @public
@@ -73,7 +57,54 @@ class Pended(Model):
     id = Column(Integer, primary_key=True)
     token = Column(SAUnicode, index=True)
     expiration_date = Column(DateTime, index=True)
-    key_values = relationship('PendedKeyValue', cascade='all, delete-orphan')
+    pend_type = Column(SAUnicode, index=True)
+    list_id = Column(SAUnicode, index=True)
+    token_owner = Column(SAUnicode, index=True)
+    message_id = Column(SAUnicode, index=True)
+    data = Column(SAUnicodeXL)
+
+
+def _pended(token, expiration_date, pendable):
+    # Return the Pended record of a pendable.
+    pending = Pended(
+        token=token,
+        expiration_date=expiration_date,
+        pend_type=pendable.get('type', pendable.PEND_TYPE))
+    data = {}
+    for key, value in pendable.items():
+        # The type has been handled above.
+        if key == 'type':
+            continue
+        # Both keys and values must be strings.
+        if isinstance(key, bytes):
+            key = key.decode('utf-8')
+        column = COLUMNS.get(key)
+        if column is not None and isinstance(value, str):
+            setattr(pending, column, value)
+            continue
+        if isinstance(value, bytes):
+            # Make sure we can turn this back into a bytes.
+            value = dict(__encoding__='utf-8', value=value.decode('utf-8'))
+        data[key] = value
+    pending.data = json.dumps(data)
+    return pending
+
+
+def _pendable(pending):
+    # Return the pendable of a Pended record.
+    pendable = UnpendedPendable()
+    # The `type` key is special and reserved.  See the IPendable interface
+    # for details.
+    pendable['type'] = pending.pend_type
+    for key, column in COLUMNS.items():
+        value = getattr(pending, column)
+        if value is not None:
+            pendable[key] = value
+    for key, value in json.loads(pending.data).items():
+        if isinstance(value, dict) and '__encoding__' in value:
+            value = value['value'].encode(value['__encoding__'])
+        pendable[key] = value
+    return pendable
 
 
 @public
@@ -104,26 +135,7 @@ class Pendings:
                 break
         else:
             raise RuntimeError('Could not find a valid pendings token')
-        # Create the record, and then the individual key/value pairs.
-        pending = Pended(
-            token=token,
-            expiration_date=now() + lifetime)
-        pendable_type = pendable.get('type', pendable.PEND_TYPE)
-        pending.key_values.append(
-            PendedKeyValue(key='type', value=pendable_type))
-        for key, value in pendable.items():
-            # The type has been handled above.
-            if key == 'type':
-                continue
-            # Both keys and values must be strings.
-            if isinstance(key, bytes):
-                key = key.decode('utf-8')
-            if isinstance(value, bytes):
-                # Make sure we can turn this back into a bytes.
-                value = dict(__encoding__='utf-8',
-                             value=value.decode('utf-8'))
-            keyval = PendedKeyValue(key=key, value=json.dumps(value))
-            pending.key_values.append(keyval)
+        pending = _pended(token, now() + lifetime, pendable)
         store.add(pending)
         return token
 
@@ -138,19 +150,7 @@ class Pendings:
         assert pendings_count == 1, (
             'Unexpected token count: {}'.format(pendings_count))
         pending = pendings[0]
-        pendable = UnpendedPendable()
-        # Iterate on PendedKeyValue entries that are associated with the
-        # pending object's ID.  Watch out for type conversions.
-        for keyvalue in pending.key_values:
-            # The `type` key is special and reserved.  It is not JSONified.
-            # See the IPendable interface for details.
-            if keyvalue.key == 'type':
-                value = keyvalue.value
-            else:
-                value = json.loads(keyvalue.value)
-            if isinstance(value, dict) and '__encoding__' in value:
-                value = value['value'].encode(value['__encoding__'])
-            pendable[keyvalue.key] = value
+        pendable = _pendable(pending)
         if expunge:
             store.delete(pending)
             # Discard associated workflow if any.
@@ -158,11 +158,15 @@ class Pendings:
         return pendable
 
     @dbconnection
-    def evict(self, store):
-        right_now = now()
-        for pending in store.query(Pended).all():
-            if pending.expiration_date < right_now:
-                store.delete(pending)
+    def evict(self, store, limit=None):
+        query = store.query(Pended.id).filter(
+            Pended.expiration_date < now())
+        if limit is not None:
+            query = query.limit(limit)
+        ids = [id for (id,) in query]
+        if len(ids) > 0:
+            store.query(Pended).filter(Pended.id.in_(ids)).delete()
+        return len(ids)
 
     @dbconnection
     def _query(
@@ -170,29 +174,13 @@ class Pendings:
     ):
         query = store.query(Pended)
         if mlist is not None:
-            pkv_alias_mlist = aliased(PendedKeyValue)
-            query = query.join(pkv_alias_mlist).filter(and_(
-                pkv_alias_mlist.key == 'list_id',
-                pkv_alias_mlist.value == json.dumps(mlist.list_id)
-                ))
+            query = query.filter(Pended.list_id == mlist.list_id)
         if held_msgid is not None:
-            pkv_alias_held_msg = aliased(PendedKeyValue)
-            query = query.join(pkv_alias_held_msg).filter(and_(
-                pkv_alias_held_msg.key == '_mod_message_id',
-                pkv_alias_held_msg.value == json.dumps(held_msgid)
-                ))
+            query = query.filter(Pended.message_id == held_msgid)
         if pend_type is not None:
-            pkv_alias_type = aliased(PendedKeyValue)
-            query = query.join(pkv_alias_type).filter(and_(
-                pkv_alias_type.key == 'type',
-                pkv_alias_type.value == pend_type
-                ))
+            query = query.filter(Pended.pend_type == pend_type)
         if token_owner is not None:
-            pkv_alias_type = aliased(PendedKeyValue)
-            query = query.join(pkv_alias_type).filter(and_(
-                pkv_alias_type.key == 'token_owner',
-                pkv_alias_type.value == json.dumps(token_owner.name)
-                ))
+            query = query.filter(Pended.token_owner == token_owner.name)
         return query
 
     def find(
@@ -204,15 +192,14 @@ class Pendings:
         held_msgid=None,
     ):
         query = self._query(mlist, pend_type, token_owner, held_msgid)
-        for pending in query:
-            pendable = (self.confirm(pending.token, expunge=False)
-                        if confirm else None)
-            yield pending.token, pendable
+        # The pendables are read from the same rows, in a single query.
+        for pending in query.order_by(Pended.id):
+            yield pending.token, (_pendable(pending) if confirm else None)
 
     @dbconnection
     def __iter__(self, store):
-        for pending in store.query(Pended).all():
-            yield pending.token, self.confirm(pending.token, expunge=False)
+        for pending in store.query(Pended).order_by(Pended.id):
+            yield pending.token, _pendable(pending)
 
     def count(
         self, mlist=None, pend_type=None, token_owner=None, held_msgid=None
@@ -43,7 +43,7 @@ class Preferences(Model):
     receive_list_copy = Column(Boolean)
     receive_own_postings = Column(Boolean)
     delivery_mode = Column(Enum(DeliveryMode))
-    delivery_status = Column(Enum(DeliveryStatus))
+    delivery_status = Column(Enum(DeliveryStatus), index=True)
 
     def __repr__(self):
         return '<Preferences object at {:#x}>'.format(id(self))
@@ -24,7 +24,7 @@ from mailman.database.transaction import dbconnection
 from mailman.database.types import Enum, SAUnicode
 from mailman.interfaces.pending import IPendable, IPendings
 from mailman.interfaces.requests import IListRequests, RequestType
-from mailman.model.pending import Pended, PendedKeyValue
+from mailman.model.pending import Pended
 from mailman.utilities.queries import QuerySequence
 from pickle import dumps, loads
 from public import public
@@ -159,7 +159,6 @@ class ListRequests:
                 mlist=self.mailing_list,
                 confirm=False):
             pended = store.query(Pended).filter_by(token=token).first()
-            store.query(PendedKeyValue).filter_by(pended_id=pended.id).delete()
             store.delete(pended)
 
 
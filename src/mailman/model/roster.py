@@ -23,16 +23,23 @@ moderator, and administrator roster filters.
 """
 
 from enum import Enum
+from mailman.core.constants import system_preferences
 from mailman.database.transaction import dbconnection
 from mailman.interfaces.member import DeliveryMode, MemberRole
 from mailman.interfaces.roster import IRoster
 from mailman.model.address import Address
 from mailman.model.member import Member
 from public import public
-from sqlalchemy import or_
+from sqlalchemy import case, func, or_
+from sqlalchemy.orm import aliased, joinedload
 from zope.interface import implementer
 
 
+# Above this many addresses, a roster snapshot loads the whole roster rather
+# than passing all the addresses to the database.
+MAX_SNAPSHOT_EMAILS = 500
+
+
 @public
 class RosterVisibility(Enum):
     # The member roster is entirely public.
@@ -140,6 +147,61 @@ class AbstractRoster:
             count)
         return memberships
 
+    def _rank(self, member):
+        """Rank the memberships of the same email address for `snapshot()`.
+
+        :return: The membership with the highest rank is the one
+            `get_member()` returns.  None if `get_member()` never returns
+            this membership.
+        """
+        # The explicit address subscription wins over the subscription
+        # through the preferred address.
+        return member._address is not None
+
+    @dbconnection
+    def snapshot(self, store, emails=None):
+        """See ``IRoster``."""
+        # Avoid circular imports.
+        from mailman.model.user import User
+
+        # Load everything a delivery needs to look at, including all the
+        # preferences a member's preference lookups can fall back to.
+        query = self._query().options(
+            joinedload(Member.preferences),
+            joinedload(Member._address).joinedload(Address.preferences),
+            joinedload(Member._address).joinedload(
+                Address.user).joinedload(User.preferences),
+            joinedload(Member._user).joinedload(User.preferences),
+            joinedload(Member._user).joinedload(
+                User._preferred_address).joinedload(Address.preferences),
+            )
+        if emails is not None:
+            emails = set(emails)
+            if len(emails) <= MAX_SNAPSHOT_EMAILS:
+                addresses = store.query(Address.id).filter(
+                    Address.email.in_(emails))
+                users = store.query(User.id).filter(
+                    User._preferred_address_id.in_(addresses))
+                query = query.filter(or_(
+                    Member.address_id.in_(addresses),
+                    Member.user_id.in_(users)))
+        snapshot = {}
+        for member in query:
+            # Save a query per member when it needs the mailing list.
+            member._mailing_list = self._mlist
+            address = member.address
+            if address is None:
+                continue
+            if emails is not None and address.email not in emails:
+                continue
+            rank = self._rank(member)
+            if rank is None:
+                continue
+            current = snapshot.get(address.email)
+            if current is None or rank > self._rank(current):
+                snapshot[address.email] = member
+        return snapshot
+
 
 @public
 class MemberRoster(AbstractRoster):
@@ -186,6 +248,14 @@ class AdministratorRoster(AbstractRoster):
             or_(Member.role == MemberRole.owner,
                 Member.role == MemberRole.moderator))
 
+    def _rank(self, member):
+        """See `AbstractRoster`."""
+        # Only explicit address subscriptions are found, and owners win over
+        # moderators.
+        if member._address is None:
+            return None
+        return member.role == MemberRole.owner
+
     @dbconnection
     def get_member(self, store, email):
         """See `IRoster`."""
@@ -204,35 +274,109 @@ class AdministratorRoster(AbstractRoster):
         return members[0]
 
 
+def _matches(preference, values, name):
+    """Match an effective preference against some values.
+
+    :param preference: The effective preference, which is NULL when it
+        falls back to the system preference.
+    :param values: The values to match.
+    :param name: The name of the preference.
+    """
+    condition = preference.in_(values)
+    if getattr(system_preferences, name) in values:
+        condition = or_(condition, preference.is_(None))
+    return condition
+
+
 @public
 class DeliveryMemberRoster(AbstractRoster):
     """Return all the members having a particular kind of delivery."""
 
     role = MemberRole.member
+    # The delivery modes of the members in this roster.
+    delivery_modes = ()
 
-    @property
-    def member_count(self):
-        """See `IRoster`."""
-        # XXX 2012-03-15 BAW: It would be nice to make this more efficient.
-        # The problem is that you'd have to change the loop in _get_members()
-        # checking the delivery mode to a query parameter.
-        return len(tuple(self.members))
+    def _resolve(self, query):
+        """Join the preferences a member's preference lookups fall back to.
 
-    @dbconnection
-    def _get_members(self, store, *delivery_modes):
-        """The set of members for a mailing list, filter by delivery mode.
+        This resolves the member's preferences in the database the same way
+        `Member._lookup()` does, i.e. from the member's own preferences, then
+        those of its address and then of the address's user.
 
-        :param delivery_modes: The modes to filter on.
-        :type delivery_modes: sequence of `DeliveryMode`.
-        :return: A generator of members.
-        :rtype: generator
+        :param query: A query of members.
+        :return: The query with the preferences joined, the member's email
+            address column and a function which returns the column with the
+            effective value of a named preference.  That value is NULL when
+            the system preference applies.
         """
-        results = store.query(Member).filter_by(
-            list_id=self._mlist.list_id,
-            role=MemberRole.member)
-        for member in results:
-            if member.delivery_mode in delivery_modes:
-                yield member
+        # Avoid circular imports.
+        from mailman.model.preferences import Preferences
+        from mailman.model.user import User
+
+        address = aliased(Address)
+        user = aliased(User)
+        preferred = aliased(Address)
+        address_user = aliased(User)
+        member_preferences = aliased(Preferences)
+        address_preferences = aliased(Preferences)
+        user_preferences = aliased(Preferences)
+        # A member is subscribed either with an explicit address, or through
+        # the preferred address of a user.
+        explicit = Member.address_id.isnot(None)
+        query = query.outerjoin(
+            address, Member.address_id == address.id).outerjoin(
+            user, Member.user_id == user.id).outerjoin(
+            preferred, user._preferred_address_id == preferred.id).outerjoin(
+            member_preferences,
+            Member.preferences_id == member_preferences.id).outerjoin(
+            address_preferences, address_preferences.id == case(
+                (explicit, address.preferences_id),
+                else_=preferred.preferences_id)).outerjoin(
+            address_user, address_user.id == case(
+                (explicit, address.user_id),
+                else_=preferred.user_id)).outerjoin(
+            user_preferences,
+            address_user.preferences_id == user_preferences.id)
+        email = case((explicit, address.email), else_=preferred.email)
+
+        def effective(name):
+            return func.coalesce(
+                getattr(member_preferences, name),
+                getattr(address_preferences, name),
+                getattr(user_preferences, name))
+        return query, email, effective
+
+    def _delivery_query(self):
+        """Query the members with the delivery modes of this roster.
+
+        :return: The query, the email address column and the effective
+            preference function, as for `_resolve()`.
+        """
+        query, email, effective = self._resolve(super()._query())
+        query = query.filter(_matches(
+            effective('delivery_mode'), self.delivery_modes, 'delivery_mode'))
+        return query, email, effective
+
+    def _query(self):
+        return self._delivery_query()[0]
+
+    def get_emails(self, *delivery_statuses):
+        """Return the email addresses of the members.
+
+        :param delivery_statuses: Only return the addresses of the members
+            with one of these delivery statuses.  The default is to return
+            the addresses of all the members.
+        :type delivery_statuses: sequence of `DeliveryStatus`
+        :return: The email addresses.
+        :rtype: set of strings
+        """
+        query, email, effective = self._delivery_query()
+        if len(delivery_statuses) > 0:
+            query = query.filter(_matches(
+                effective('delivery_status'), delivery_statuses,
+                'delivery_status'))
+        return set(row[0] for row in query.with_entities(email)
+                   if row[0] is not None)
 
 
 @public
@@ -240,11 +384,7 @@ class RegularMemberRoster(DeliveryMemberRoster):
     """Return all the regular delivery members of a list."""
 
     name = 'regular_members'
-
-    @property
-    def members(self):
-        """See `IRoster`."""
-        yield from self._get_members(DeliveryMode.regular)
+    delivery_modes = (DeliveryMode.regular,)
 
 
 @public
@@ -252,14 +392,11 @@ class DigestMemberRoster(DeliveryMemberRoster):
     """Return all the regular delivery members of a list."""
 
     name = 'digest_members'
-
-    @property
-    def members(self):
-        """See `IRoster`."""
-        yield from self._get_members(
-            DeliveryMode.plaintext_digests,
-            DeliveryMode.mime_digests,
-            DeliveryMode.summary_digests)
+    delivery_modes = (
+        DeliveryMode.plaintext_digests,
+        DeliveryMode.mime_digests,
+        DeliveryMode.summary_digests,
+        )
 
 
 @public
@@ -322,3 +459,7 @@ class Memberships:
     def get_memberships(self, store, address):
         """See `IRoster`."""
         raise NotImplementedError
+
+    def snapshot(self, emails=None):
+        """See `IRoster`."""
+        raise NotImplementedError
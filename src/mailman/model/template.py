@@ -17,8 +17,12 @@
 
 """Template management."""
 
+import time
 import logging
+import threading
 
+from collections import OrderedDict
+from lazr.config import as_timedelta
 from mailman.config import config
 from mailman.database.model import Model
 from mailman.database.transaction import dbconnection
@@ -32,6 +36,7 @@ from mailman.interfaces.template import (
     ITemplateLoader,
     ITemplateManager,
 )
+from mailman.model.generation import GenerationCounter
 from mailman.utilities import protocols
 from mailman.utilities.i18n import find, TemplateNotFoundError
 from mailman.utilities.string import expand
@@ -46,6 +51,7 @@ from zope.interface import implementer
 
 COMMASPACE = ', '
 log = logging.getLogger('mailman.http')
+MISSING = object()
 
 
 class Template(Model):
@@ -70,6 +76,107 @@ class Template(Model):
         self.password = password
 
 
+@public
+class TemplateCache:
+    """An in-process cache of template records and contents.
+
+    Every process using templates keeps its own cache.  Whenever a template
+    is set or deleted, the cache is cleared and the `templates` generation
+    in the database is bumped.  Other processes check the generation at most
+    every `[mailman]template_check_interval` and clear their cache when it
+    has changed.  Entries older than `[mailman]template_cache_lifetime` are
+    reloaded so that changes to template files are noticed too.  The cache
+    is safe to use from multiple threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Map keys to (load time, value), least recently used first.
+        self._entries = OrderedDict()
+        self._generation = GenerationCounter('templates')
+        self._current = None
+        self._checked = None
+        self._size = 0
+        self._lifetime = 0
+        self._interval = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _check(self):
+        # Re-read the configuration and the generation when needed, clearing
+        # the cache if another process changed the templates.  Return the
+        # current time.
+        now = time.monotonic()
+        if (self._checked is not None and
+                now - self._checked < self._interval):
+            return now
+        self._size = int(config.mailman.template_cache_size)
+        self._lifetime = as_timedelta(
+            config.mailman.template_cache_lifetime).total_seconds()
+        self._interval = as_timedelta(
+            config.mailman.template_check_interval).total_seconds()
+        generation = self._generation.get()
+        with self._lock:
+            if generation != self._current:
+                self._entries.clear()
+                self._current = generation
+            self._checked = now
+        return now
+
+    def get(self, key):
+        """Return the cached value for the key.
+
+        :param key: The cache key.
+        :return: The cached value, or `MISSING` if there is none.
+        """
+        now = self._check()
+        with self._lock:
+            loaded, value = self._entries.get(key, (None, MISSING))
+            if value is MISSING:
+                return MISSING
+            if now - loaded > self._lifetime:
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def add(self, key, value):
+        """Cache a value.
+
+        :param key: The cache key.
+        :param value: The value to cache.
+        """
+        now = self._check()
+        with self._lock:
+            if self._size <= 0:
+                return
+            self._entries[key] = (now, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Clear the cache, and re-read the configuration on next use."""
+        with self._lock:
+            self._entries.clear()
+            self._current = None
+            self._checked = None
+
+    def invalidate(self):
+        """Clear the caches of all processes.
+
+        Other processes notice when the current transaction is committed.
+        """
+        self._generation.bump()
+        self.clear()
+
+
+# The template cache of this process.
+template_cache = TemplateCache()
+public(template_cache=template_cache)
+
+
 @public
 @implementer(ITemplateManager)
 class TemplateManager:
@@ -93,23 +200,37 @@ class TemplateManager:
             cache_mgr = getUtility(ICacheManager)
             actual_uri = expand(uri, None)
             cache_mgr.evict(actual_uri)
+        template_cache.invalidate()
 
     @dbconnection
     def get(self, store, name, context, **kws):
         """See `ITemplateManager`."""
-        template = store.query(Template).filter(
-            Template.name == name,
-            Template.context == context).one_or_none()
-        if template is None:
+        key = ('template', name, context)
+        record = template_cache.get(key)
+        if record is MISSING:
+            template = store.query(Template).filter(
+                Template.name == name,
+                Template.context == context).one_or_none()
+            if template is not None:
+                record = (template.uri, template.username, template.password)
+            else:
+                record = None
+            template_cache.add(key, record)
+        if record is None:
             return None
-        actual_uri = expand(template.uri, None, kws)
+        uri, username, password = record
+        actual_uri = expand(uri, None, kws)
+        key = ('uri', actual_uri, username)
+        contents = template_cache.get(key)
+        if contents is not MISSING:
+            return contents
         cache_mgr = getUtility(ICacheManager)
         contents = cache_mgr.get(actual_uri)
         if contents is None:
             # It's likely that the cached contents have expired.
             auth = {}
-            if template.username is not None:
-                auth['auth'] = (template.username, template.password)
+            if username is not None:
+                auth['auth'] = (username, password)
             try:
                 contents = protocols.get(actual_uri, **auth)
             except HTTPError as error:
@@ -125,6 +246,7 @@ class TemplateManager:
             # on the file system.
             if urlparse(actual_uri).scheme != 'mailman':
                 cache_mgr.add(actual_uri, contents)
+        template_cache.add(key, contents)
         return contents
 
     @dbconnection
@@ -142,7 +264,8 @@ class TemplateManager:
             Template.context == context).one_or_none()
         if template is not None:
             store.delete(template)
-        # We don't clear the cache entry, we just let it expire.
+            template_cache.invalidate()
+        # We don't clear the file cache entry, we just let it expire.
 
 
 @public
@@ -207,6 +330,10 @@ class TemplateLoader:
             return ''                                       # pragma: nocover
         elif default_uri is missing:
             raise URLError('No such file')
+        key = ('file', name, None if mlist is None else mlist.list_id, code)
+        contents = template_cache.get(key)
+        if contents is not MISSING:
+            return contents
         try:
             path, fp = find(default_uri, mlist, code)
         except TemplateNotFoundError:
@@ -216,6 +343,8 @@ class TemplateLoader:
                 raise                                       # pragma: nocover
             path, fp = find(default_uri, mlist, code)
         try:
-            return fp.read()
+            contents = fp.read()
         finally:
             fp.close()
+        template_cache.add(key, contents)
+        return contents
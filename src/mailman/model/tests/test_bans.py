@@ -20,9 +20,12 @@
 import unittest
 
 from mailman.app.lifecycle import create_list
+from mailman.config import config
 from mailman.interfaces.bans import IBanManager
 from mailman.interfaces.listmanager import IListManager
+from mailman.model.bans import Ban, bans_generation
 from mailman.testing.layers import ConfigLayer
+from unittest.mock import patch
 from zope.component import getUtility
 
 
@@ -63,3 +66,57 @@ class TestMailingListBans(unittest.TestCase):
         self.assertEqual(
             [self._manager.bans[i].email for i in range(count)],
             ['ant@example.com', 'bee@example.com', 'cat@example.com'])
+
+
+class TestBanCache(unittest.TestCase):
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._mlist = create_list('ant@example.com')
+        self._manager = IBanManager(self._mlist)
+        self._global_manager = IBanManager(None)
+
+    def test_patterns(self):
+        # Pattern bans are matched case insensitively from the start of the
+        # address.  Patterns with and without groups can be mixed.
+        self._manager.ban('^.*@example.org')
+        self._manager.ban(r'^(b)\1[a-z]*@example.com')
+        self._global_manager.ban('^spam[0-9]+@')
+        self.assertTrue(self._manager.is_banned('anne@EXAMPLE.org'))
+        self.assertTrue(self._manager.is_banned('bbart@example.com'))
+        self.assertFalse(self._manager.is_banned('bart@example.com'))
+        self.assertTrue(self._manager.is_banned('spam42@example.com'))
+        self.assertFalse(self._manager.is_banned('nospam42@example.com'))
+        self.assertFalse(self._global_manager.is_banned('anne@example.org'))
+
+    def test_index_is_cached(self):
+        # The bans are only read from the database once.
+        self._manager.ban('anne@example.com')
+        self._manager.is_banned('anne@example.com')
+        with patch('mailman.model.bans.BanIndex') as index:
+            self.assertTrue(self._manager.is_banned('anne@example.com'))
+        self.assertFalse(index.called)
+
+    def test_ban_and_unban(self):
+        self.assertFalse(self._manager.is_banned('anne@example.com'))
+        self._global_manager.ban('anne@example.com')
+        self.assertTrue(self._manager.is_banned('anne@example.com'))
+        self._global_manager.unban('anne@example.com')
+        self.assertFalse(self._manager.is_banned('anne@example.com'))
+
+    def test_other_process(self):
+        # Bans added by another process are noticed through the generation
+        # counter.
+        self.assertFalse(self._manager.is_banned('anne@example.com'))
+        config.db.store.add(Ban('anne@example.com', self._mlist.list_id))
+        self.assertFalse(self._manager.is_banned('anne@example.com'))
+        bans_generation.bump()
+        self.assertTrue(self._manager.is_banned('anne@example.com'))
+
+    def test_delete_list(self):
+        # A list with the same name as a deleted one doesn't inherit its bans.
+        self._manager.ban('anne@example.com')
+        self.assertTrue(self._manager.is_banned('anne@example.com'))
+        getUtility(IListManager).delete(self._mlist)
+        mlist = create_list('ant@example.com')
+        self.assertFalse(IBanManager(mlist).is_banned('anne@example.com'))
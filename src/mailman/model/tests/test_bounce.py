@@ -37,6 +37,7 @@ from mailman.testing.helpers import (
 )
 from mailman.testing.layers import ConfigLayer
 from mailman.utilities.datetime import now
+from unittest.mock import patch
 from zope.component import getUtility
 
 
@@ -346,3 +347,77 @@ Message-Id: <first>
             owner_notif.msg['subject'],
             'anne@example.com unsubscribed from Test mailing list due '
             'to bounces')
+
+    def test_process_events_once_per_member_per_day(self):
+        # Many bounces from the same member on the same day only score once.
+        member = self._subscribe_and_add_bounce_event('anne@example.com')
+        for i in range(3):
+            self._subscribe_and_add_bounce_event(
+                'anne@example.com', subscribe=False, create=False)
+        self._subscribe_and_add_bounce_event('bart@example.com')
+        self.assertEqual(self._processor.process_events(), 5)
+        self.assertEqual(member.bounce_score, 1)
+        bart = self._mlist.members.get_member('bart@example.com')
+        self.assertEqual(bart.bounce_score, 1)
+        self.assertEqual(list(self._processor.unprocessed), [])
+
+    def test_process_events_in_batches(self):
+        # Events are processed and committed in batches.
+        for i in range(5):
+            self._subscribe_and_add_bounce_event(
+                'anne{}@example.com'.format(i))
+        with configuration('mailman', bounce_batch_size=2):
+            self.assertEqual(self._processor.process_events(), 5)
+        self.assertEqual(list(self._processor.unprocessed), [])
+        for i in range(5):
+            member = self._mlist.members.get_member(
+                'anne{}@example.com'.format(i))
+            self.assertEqual(member.bounce_score, 1)
+
+    def test_process_events_invalid(self):
+        # Events for non-members and removed lists are marked as processed
+        # and logged, without stopping the processing of the other events.
+        self._subscribe_and_add_bounce_event(
+            'anne@example.com', subscribe=False)
+        with transaction():
+            ant = create_list('ant@example.com')
+            self._processor.register(ant, 'bart@example.com', self._msg)
+        member = self._subscribe_and_add_bounce_event('cris@example.com')
+        with transaction():
+            remove_list(ant)
+        mark = LogFileMark('mailman.bounce')
+        self.assertEqual(self._processor.process_events(), 3)
+        log = mark.read()
+        self.assertIn(
+            'Email anne@example.com is not a subcriber of test.example.com',
+            log)
+        self.assertIn('Bounce for non-existent list ant.example.com', log)
+        self.assertEqual(member.bounce_score, 1)
+        self.assertEqual(list(self._processor.unprocessed), [])
+
+    def test_process_events_failure(self):
+        # A failure while processing the events of one member only loses the
+        # changes for that member, whose events are left unprocessed.
+        anne = self._subscribe_and_add_bounce_event('anne@example.com')
+        self._subscribe_and_add_bounce_event('bart@example.com')
+        cris = self._subscribe_and_add_bounce_event('cris@example.com')
+        process = type(self._processor)._process
+
+        def failing_process(processor, mlist, member, event):
+            process(processor, mlist, member, event)
+            if event.email == 'bart@example.com':
+                raise RuntimeError('borked')
+
+        mark = LogFileMark('mailman.bounce')
+        with patch.object(type(self._processor), '_process', failing_process):
+            self.assertEqual(self._processor.process_events(), 2)
+        self.assertIn(
+            'Failed to process bounce events for bart@example.com on list '
+            'test.example.com', mark.read())
+        bart = self._mlist.members.get_member('bart@example.com')
+        self.assertIsNone(bart.last_bounce_received)
+        self.assertEqual(anne.bounce_score, 1)
+        self.assertEqual(cris.bounce_score, 1)
+        events = list(self._processor.unprocessed)
+        self.assertEqual([event.email for event in events],
+                         ['bart@example.com'])
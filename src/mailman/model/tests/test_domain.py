@@ -30,7 +30,7 @@ from mailman.interfaces.domain import (
 )
 from mailman.interfaces.listmanager import IListManager
 from mailman.interfaces.usermanager import IUserManager
-from mailman.model.domain import Domain
+from mailman.model.domain import Domain, lists_generation
 from mailman.testing.helpers import event_subscribers
 from mailman.testing.layers import ConfigLayer
 from sqlalchemy.exc import IntegrityError
@@ -197,6 +197,19 @@ class TestDomain(unittest.TestCase):
             with transaction():
                 store.add(Domain('abc'))
 
+    def test_alias_domain_changes(self):
+        # Changing the alias domain of a domain makes the LMTP servers forget
+        # the addresses they resolved, however it is changed.
+        domain = getUtility(IDomainManager).get('example.com')
+        generation = lists_generation.get()
+        domain.alias_domain = 'x.example.com'
+        self.assertNotEqual(lists_generation.get(), generation)
+        generation = lists_generation.get()
+        domain.alias_domain = 'x.example.com'
+        self.assertEqual(lists_generation.get(), generation)
+        domain.alias_domain = None
+        self.assertNotEqual(lists_generation.get(), generation)
+
 
 class TestDomainLifecycleEvents(unittest.TestCase):
     layer = ConfigLayer
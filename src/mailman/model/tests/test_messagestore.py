@@ -23,7 +23,10 @@ import unittest
 from mailman.config import config
 from mailman.interfaces.messages import IMessageStore
 from mailman.model.message import Message
-from mailman.testing.helpers import specialized_message_from_string as mfs
+from mailman.testing.helpers import (
+    configuration,
+    specialized_message_from_string as mfs,
+)
 from mailman.testing.layers import ConfigLayer
 from mailman.utilities.email import add_message_hash
 from zope.component import getUtility
@@ -168,3 +171,69 @@ Message-ID: <ant>
         stored_msg = self._store.get_message_by_id('<ant>')
         self.assertNotEqual(msg['subject'], stored_msg['subject'])
         self.assertIsNone(hash32)
+
+    def test_all_metadata(self):
+        # The metadata of all the messages is enumerated without loading the
+        # messages, so it's found even when their files are gone.
+        for message_id in ('<ant>', '<bee>'):
+            self._store.add(mfs("""\
+Subject: An important message
+Message-ID: {}
+
+This message is very important.
+""".format(message_id)))
+        for row in self._store.metadata:
+            os.remove(os.path.join(config.MESSAGES_DIR, row.path))
+        self.assertEqual([row.message_id for row in self._store.metadata],
+                         ['<ant>', '<bee>'])
+
+    def test_get_message_text(self):
+        msg = mfs("""\
+Subject: An important message
+Message-ID: <ant>
+
+This message is very important.
+""")
+        self._store.add(msg)
+        self.assertEqual(self._store.get_message_text('<ant>'),
+                         msg.as_string())
+        self.assertIsNone(self._store.get_message_text('<bee>'))
+
+    @configuration('mailman', message_store_format='raw')
+    def test_raw_format(self):
+        # Messages are stored as bytes, and parsed when they're read.
+        msg = mfs("""\
+From: anne@example.com
+Subject: An important message
+Message-ID: <ant>
+
+This message is very important.
+""")
+        self._store.add(msg)
+        row = list(self._store.metadata)[0]
+        self.assertTrue(row.path.endswith('.eml'))
+        with open(os.path.join(config.MESSAGES_DIR, row.path), 'rb') as fp:
+            self.assertEqual(fp.read(), msg.as_bytes())
+        self.assertEqual(self._store.get_message_text('<ant>'),
+                         msg.as_string())
+        found = self._store.get_message_by_id('<ant>')
+        self.assertEqual(found.as_bytes(), msg.as_bytes())
+        self.assertEqual(found['x-message-id-hash'], msg['x-message-id-hash'])
+        self.assertEqual([m['message-id'] for m in self._store.messages],
+                         ['<ant>'])
+
+    @configuration('mailman', message_store_format='raw')
+    def test_raw_format_fallback(self):
+        # Messages which can't be stored as bytes are pickled.
+        msg = mfs("""\
+Subject: An important message
+Message-ID: <ant>
+
+This message is very important.
+""")
+        msg.some_attribute = 7
+        self._store.add(msg)
+        row = list(self._store.metadata)[0]
+        self.assertFalse(row.path.endswith('.eml'))
+        self.assertEqual(self._store.get_message_by_id('<ant>').some_attribute,
+                         7)
@@ -24,7 +24,7 @@ from mailman.config import config
 from mailman.interfaces.pending import IPendable, IPendings
 from mailman.interfaces.subscriptions import TokenOwner
 from mailman.interfaces.workflow import IWorkflowStateManager
-from mailman.model.pending import PendedKeyValue
+from mailman.model.pending import Pended
 from mailman.testing.layers import ConfigLayer
 from zope.component import getUtility
 from zope.interface import implementer
@@ -40,8 +40,8 @@ class TestPendings(unittest.TestCase):
 
     layer = ConfigLayer
 
-    def test_delete_key_values(self):
-        # Deleting a pending should delete its key-values.
+    def test_delete_pended(self):
+        # Deleting a pending should delete its record.
         pendingdb = getUtility(IPendings)
         subscription = SimplePendable(
             type='subscription',
@@ -53,7 +53,7 @@ class TestPendings(unittest.TestCase):
         self.assertEqual(pendingdb.count(), 1)
         pendingdb.confirm(token)
         self.assertEqual(pendingdb.count(), 0)
-        self.assertEqual(config.db.store.query(PendedKeyValue).count(), 0)
+        self.assertEqual(config.db.store.query(Pended).count(), 0)
 
     def test_delete_workflow(self):
         # Deleting a pending should delete any associated workflow state.
@@ -135,3 +135,37 @@ class TestPendings(unittest.TestCase):
             pendingdb.count(token_owner=TokenOwner.subscriber), 1)
         self.assertEqual(
             pendingdb.count(mlist=mlist, token_owner=TokenOwner.subscriber), 1)
+
+    def test_round_trip(self):
+        # The keys which have their own columns, and the other keys, are
+        # returned with their original values.
+        pendingdb = getUtility(IPendings)
+        pendable = SimplePendable(
+            list_id='ant.example.com',
+            _mod_message_id='<ant>',
+            token_owner=None,
+            password=b'xyz',
+            count=3,
+            flags=['a', 'b'])
+        token = pendingdb.add(pendable)
+        pended = config.db.store.query(Pended).filter_by(token=token).one()
+        self.assertEqual(pended.pend_type, 'simple')
+        self.assertEqual(pended.list_id, 'ant.example.com')
+        self.assertEqual(pended.message_id, '<ant>')
+        self.assertIsNone(pended.token_owner)
+        self.assertEqual(dict(pendingdb.confirm(token)), dict(
+            type='simple',
+            list_id='ant.example.com',
+            _mod_message_id='<ant>',
+            token_owner=None,
+            password=b'xyz',
+            count=3,
+            flags=['a', 'b']))
+
+    def test_find_by_held_message_id(self):
+        pendingdb = getUtility(IPendings)
+        pendingdb.add(SimplePendable(_mod_message_id='<ant>'))
+        token = pendingdb.add(SimplePendable(_mod_message_id='<bee>', id=2))
+        pendings = list(pendingdb.find(held_msgid='<bee>'))
+        self.assertEqual(pendings, [(token, dict(
+            type='simple', _mod_message_id='<bee>', id=2))])
@@ -21,11 +21,12 @@ import unittest
 
 from mailman.app.lifecycle import create_list
 from mailman.interfaces.address import IAddress
-from mailman.interfaces.member import DeliveryMode, MemberRole
+from mailman.interfaces.member import DeliveryMode, DeliveryStatus, MemberRole
 from mailman.interfaces.user import IUser
 from mailman.interfaces.usermanager import IUserManager
 from mailman.testing.helpers import set_preferred
 from mailman.testing.layers import ConfigLayer
+from unittest.mock import patch
 from zope.component import getUtility
 
 
@@ -245,3 +246,154 @@ class TestUserRoster(unittest.TestCase):
         self._mlist.subscribe(self._dave)
         member = self._mlist.members.get_member('bart@example.com')
         self.assertEqual(member.user, self._bart)
+
+
+class TestRosterSnapshot(unittest.TestCase):
+    """Test loading many members of a roster at once."""
+
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._mlist = create_list('ant@example.com')
+        user_manager = getUtility(IUserManager)
+        self._anne = user_manager.make_user(
+            'anne@example.com', 'Anne Person')
+        set_preferred(self._anne)
+        self._bart = user_manager.create_address('bart@example.com')
+        self._cris = user_manager.create_address('cris@example.com')
+
+    def test_all_members(self):
+        # Without email addresses, the snapshot has the whole roster.
+        self._mlist.subscribe(self._anne)
+        self._mlist.subscribe(self._bart)
+        self._mlist.subscribe(self._cris, role=MemberRole.owner)
+        snapshot = self._mlist.members.snapshot()
+        self.assertEqual(sorted(snapshot),
+                         ['anne@example.com', 'bart@example.com'])
+        self.assertEqual(snapshot['anne@example.com'].user, self._anne)
+
+    def test_some_members(self):
+        # Only the given email addresses are in the snapshot.
+        self._mlist.subscribe(self._anne)
+        self._mlist.subscribe(self._bart)
+        self._mlist.subscribe(self._cris)
+        snapshot = self._mlist.members.snapshot(
+            ['anne@example.com', 'cris@example.com', 'dave@example.com'])
+        self.assertEqual(sorted(snapshot),
+                         ['anne@example.com', 'cris@example.com'])
+
+    def test_many_members(self):
+        # A long list of email addresses is filtered after loading the
+        # whole roster.
+        self._mlist.subscribe(self._anne)
+        self._mlist.subscribe(self._bart)
+        with patch('mailman.model.roster.MAX_SNAPSHOT_EMAILS', 1):
+            snapshot = self._mlist.members.snapshot(
+                ['bart@example.com', 'cris@example.com'])
+        self.assertEqual(list(snapshot), ['bart@example.com'])
+
+    def test_same_as_get_member(self):
+        # Like get_member(), the snapshot has the explicit address
+        # subscription when there is also a user subscription.
+        self._mlist.subscribe(self._anne)
+        self._mlist.subscribe(self._anne.preferred_address)
+        snapshot = self._mlist.members.snapshot(['anne@example.com'])
+        self.assertEqual(
+            snapshot['anne@example.com'],
+            self._mlist.members.get_member('anne@example.com'))
+        self.assertTrue(
+            IAddress.providedBy(snapshot['anne@example.com'].subscriber))
+
+    def test_administrators(self):
+        # Owners win over moderators.
+        self._mlist.subscribe(self._bart, role=MemberRole.moderator)
+        self._mlist.subscribe(self._bart, role=MemberRole.owner)
+        self._mlist.subscribe(self._cris, role=MemberRole.moderator)
+        snapshot = self._mlist.administrators.snapshot()
+        self.assertEqual(snapshot['bart@example.com'].role, MemberRole.owner)
+        self.assertEqual(snapshot['cris@example.com'].role,
+                         MemberRole.moderator)
+
+    def test_preferences_are_loaded(self):
+        # The members' preferences come with the snapshot.
+        self._mlist.subscribe(self._bart)
+        self._bart.preferences.delivery_mode = DeliveryMode.mime_digests
+        snapshot = self._mlist.members.snapshot()
+        member = snapshot['bart@example.com']
+        with patch('mailman.model.member.getUtility') as get_utility:
+            self.assertEqual(member.delivery_mode, DeliveryMode.mime_digests)
+            self.assertEqual(member.preferred_language.code, 'en')
+        self.assertFalse(get_utility.called)
+
+
+class TestDeliveryRosters(unittest.TestCase):
+    """Test the rosters of members by delivery mode."""
+
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._mlist = create_list('ant@example.com')
+        user_manager = getUtility(IUserManager)
+        # Anne has no preferences of her own.
+        anne = user_manager.create_address('anne@example.com')
+        self._mlist.subscribe(anne)
+        # Bart's address gets digests.
+        bart = user_manager.create_address('bart@example.com')
+        bart.preferences.delivery_mode = DeliveryMode.plaintext_digests
+        self._mlist.subscribe(bart)
+        # Cris's user gets digests.
+        cris = user_manager.make_user('cris@example.com')
+        cris.preferences.delivery_mode = DeliveryMode.mime_digests
+        self._mlist.subscribe(list(cris.addresses)[0])
+        # Dave's membership overrides his address's preference.
+        dave = user_manager.create_address('dave@example.com')
+        dave.preferences.delivery_mode = DeliveryMode.mime_digests
+        member = self._mlist.subscribe(dave)
+        member.preferences.delivery_mode = DeliveryMode.regular
+        # Elle is subscribed as a user whose preferred address gets digests.
+        elle = user_manager.make_user('elle@example.com')
+        set_preferred(elle)
+        elle.preferred_address.preferences.delivery_mode = (
+            DeliveryMode.summary_digests)
+        self._mlist.subscribe(elle)
+        # Fred's user has disabled delivery.
+        fred = user_manager.make_user('fred@example.com')
+        fred.preferences.delivery_status = DeliveryStatus.by_user
+        self._mlist.subscribe(list(fred.addresses)[0])
+
+    def _emails(self, roster):
+        return sorted(member.address.email for member in roster.members)
+
+    def test_regular_members(self):
+        regular = self._mlist.regular_members
+        self.assertEqual(self._emails(regular), [
+            'anne@example.com', 'dave@example.com', 'fred@example.com'])
+        self.assertEqual(regular.member_count, 3)
+
+    def test_digest_members(self):
+        digest = self._mlist.digest_members
+        self.assertEqual(self._emails(digest), [
+            'bart@example.com', 'cris@example.com', 'elle@example.com'])
+        self.assertEqual(digest.member_count, 3)
+
+    def test_same_as_member_preferences(self):
+        # The database agrees with the members' own preference lookups.
+        for roster in (self._mlist.regular_members,
+                       self._mlist.digest_members):
+            self.assertEqual(self._emails(roster), sorted(
+                member.address.email
+                for member in self._mlist.members.members
+                if member.delivery_mode in roster.delivery_modes))
+
+    def test_get_emails(self):
+        self.assertEqual(self._mlist.regular_members.get_emails(), {
+            'anne@example.com', 'dave@example.com', 'fred@example.com'})
+        self.assertEqual(
+            self._mlist.regular_members.get_emails(DeliveryStatus.enabled),
+            {'anne@example.com', 'dave@example.com'})
+        self.assertEqual(
+            self._mlist.regular_members.get_emails(DeliveryStatus.by_user),
+            {'fred@example.com'})
+        self.assertEqual(
+            self._mlist.digest_members.get_emails(DeliveryStatus.enabled),
+            {'bart@example.com', 'cris@example.com', 'elle@example.com'})
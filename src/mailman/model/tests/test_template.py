@@ -17,6 +17,7 @@
 
 """Test the template manager."""
 
+import os
 import unittest
 import threading
 
@@ -26,7 +27,9 @@ from mailman.app.lifecycle import create_list
 from mailman.config import config
 from mailman.interfaces.domain import IDomainManager
 from mailman.interfaces.template import ITemplateLoader, ITemplateManager
-from mailman.testing.helpers import wait_for_webservice
+from mailman.model.generation import GenerationCounter
+from mailman.model.template import template_cache
+from mailman.testing.helpers import configuration, wait_for_webservice
 from mailman.testing.layers import ConfigLayer
 from mailman.utilities.i18n import find
 from requests import HTTPError
@@ -308,6 +311,105 @@ class TestTemplateLoader(unittest.TestCase):
         self.assertRaises(URLError, self._loader.get, 'forbidden', self._mlist)
 
 
+class TestInProcessTemplateCache(unittest.TestCase):
+    """Test the in-process template cache."""
+
+    layer = ConfigLayer
+
+    def setUp(self):
+        resources = ExitStack()
+        self.addCleanup(resources.close)
+        var_dir = resources.enter_context(TemporaryDirectory())
+        config.push('template config', """\
+        [paths.testing]
+        var_dir: {}
+        """.format(var_dir))
+        resources.callback(config.pop, 'template config')
+        self._mlist = create_list('test@example.com')
+        self._loader = getUtility(ITemplateLoader)
+        self._manager = getUtility(ITemplateManager)
+        template_dir = os.path.join(config.TEMPLATE_DIR, 'site', 'en')
+        os.makedirs(template_dir)
+        self._path = os.path.join(template_dir, 'list:user:notice:welcome.txt')
+        self._write(self._path, 'Site welcome')
+        template_cache.clear()
+
+    def _write(self, path, text):
+        with open(path, 'w', encoding='utf-8') as fp:
+            fp.write(text)
+
+    def test_file_cached(self):
+        # Files are only read the first time the template is loaded.
+        with mock.patch('mailman.model.template.find', wraps=find) as finder:
+            for i in range(3):
+                content = self._loader.get(
+                    'list:user:notice:welcome', self._mlist)
+                self.assertEqual(content, 'Site welcome')
+        self.assertEqual(finder.call_count, 1)
+
+    def test_records_cached(self):
+        # The template manager is only queried once per name and context.
+        self._loader.get('list:user:notice:welcome', self._mlist)
+        with mock.patch('mailman.model.template.Template') as template:
+            content = self._loader.get(
+                'list:user:notice:welcome', self._mlist)
+        self.assertEqual(content, 'Site welcome')
+        self.assertFalse(template.called)
+
+    def test_set_invalidates(self):
+        # Setting a template clears the cache.
+        other = os.path.join(config.VAR_DIR, 'welcome.txt')
+        self._write(other, 'List welcome')
+        self._loader.get('list:user:notice:welcome', self._mlist)
+        self._manager.set(
+            'list:user:notice:welcome', self._mlist.list_id,
+            'file://' + other)
+        self.assertEqual(
+            self._loader.get('list:user:notice:welcome', self._mlist),
+            'List welcome')
+        self._manager.delete(
+            'list:user:notice:welcome', self._mlist.list_id)
+        self.assertEqual(
+            self._loader.get('list:user:notice:welcome', self._mlist),
+            'Site welcome')
+
+    def test_other_process_changes(self):
+        # Another process bumps the generation when it changes a template.
+        # This process notices on its next check.
+        with configuration('mailman', template_check_interval='0s'):
+            template_cache.clear()
+            self._loader.get('list:user:notice:welcome', self._mlist)
+            self._write(self._path, 'New site welcome')
+            self.assertEqual(
+                self._loader.get('list:user:notice:welcome', self._mlist),
+                'Site welcome')
+            GenerationCounter('templates').bump()
+            self.assertEqual(
+                self._loader.get('list:user:notice:welcome', self._mlist),
+                'New site welcome')
+
+    def test_lifetime(self):
+        # Entries are reloaded once they are too old.
+        with configuration('mailman', template_cache_lifetime='0s'):
+            template_cache.clear()
+            self._loader.get('list:user:notice:welcome', self._mlist)
+            self._write(self._path, 'New site welcome')
+            self.assertEqual(
+                self._loader.get('list:user:notice:welcome', self._mlist),
+                'New site welcome')
+
+    def test_cache_size(self):
+        # The cache keeps the most recently used entries.
+        with configuration('mailman', template_cache_size='1'):
+            template_cache.clear()
+            self._loader.get('list:user:notice:welcome')
+            self.assertEqual(len(template_cache), 1)
+        with configuration('mailman', template_cache_size='0'):
+            template_cache.clear()
+            self._loader.get('list:user:notice:welcome')
+            self.assertEqual(len(template_cache), 0)
+
+
 # Response texts.
 WELCOME_1 = """\
 Welcome to the {fqdn_listname} mailing list!
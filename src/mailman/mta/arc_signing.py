@@ -31,3 +31,10 @@ class ARCSigningMixin:
             config.handlers['arc-sign'].process(mlist, msg, msgdata)
             # Only sign once.
             msgdata['arc_signed'] = True
+
+    def arc_sign_key(self, mlist, msg, msgdata):
+        """See `IndividualDelivery`."""
+        # The signature covers the recipient specific parts of the message.
+        if config.arc_enabled and not msgdata.get('arc_signed'):
+            return None
+        return False
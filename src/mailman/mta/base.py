@@ -18,20 +18,27 @@
 """Base delivery class."""
 
 import copy
+import uuid
 import socket
 import logging
 import smtplib
 
-from lazr.config import as_boolean
+from collections import namedtuple, OrderedDict
+from email.generator import BytesGenerator
+from io import BytesIO
 from mailman.config import config
 from mailman.interfaces.mta import IMailTransportAgentDelivery
-from mailman.mta.connection import as_SecureMode, Connection
+from mailman.mta.connection import get_connection
 from public import public
 from zope.interface import implementer
 
 
 log = logging.getLogger('mailman.smtp')
 
+# The number of distinct renderings of a message which individual delivery
+# keeps around for reuse.
+MAX_TEMPLATES = 16
+
 
 @public
 @implementer(IMailTransportAgentDelivery)
@@ -40,15 +47,7 @@ class BaseDelivery:
 
     def __init__(self):
         """Create a basic deliverer."""
-        self._connection = Connection(
-            config.mta.smtp_host, int(config.mta.smtp_port),
-            int(config.mta.max_sessions_per_connection),
-            config.mta.smtp_user if config.mta.smtp_user else None,
-            config.mta.smtp_pass if config.mta.smtp_pass else None,
-            as_SecureMode(config.mta.smtp_secure_mode),
-            as_boolean(config.mta.smtp_verify_cert),
-            as_boolean(config.mta.smtp_verify_hostname),
-            )
+        self._connection = get_connection()
 
     def _deliver_to_recipients(self, mlist, msg, msgdata, recipients):
         """Low-level delivery to a set of recipients.
@@ -66,12 +65,31 @@ class BaseDelivery:
         """
         # Do the actual sending.
         sender = self._get_sender(mlist, msg, msgdata)
-        message_id = msg['message-id']
+        return self._send(self._connection, sender, msg, recipients)
+
+    def _send(self, connection, sender, msg, recipients, message_id=None):
+        """Send a message to a set of recipients over a connection.
+
+        :param connection: The connection to the SMTP server.
+        :type connection: `Connection`
+        :param sender: The envelope sender.
+        :type sender: string
+        :param msg: The message being delivered, or its rendered bytes.
+        :type msg: `Message` or bytes
+        :param recipients: The recipients of this message.
+        :type recipients: sequence
+        :param message_id: The Message-ID to log errors with when `msg` is
+            bytes.
+        :type message_id: string
+        :return: delivery failures as defined by `smtplib.SMTP.sendmail`
+        :rtype: dictionary
+        """
+        if not isinstance(msg, bytes):
+            message_id = msg['message-id']
         # Since the recipients can be a set or a list, sort the recipients by
         # email address for predictability and testability.
         try:
-            refused = self._connection.sendmail(
-                sender, sorted(recipients), msg)
+            refused = connection.sendmail(sender, sorted(recipients), msg)
         except smtplib.SMTPRecipientsRefused as error:
             log.error('%s recipients refused: %s', message_id, error)
             refused = error.recipients
@@ -119,6 +137,75 @@ class BaseDelivery:
         return sender
 
 
+@public
+class HeaderSlot(namedtuple('HeaderSlot', 'name value')):
+    """A recipient specific header value.
+
+    The header is spliced into a message rendered for another recipient.
+    """
+
+    __slots__ = ()
+
+
+class MessageTemplate:
+    """A message rendered once, with slots for recipient specific headers."""
+
+    def __init__(self, msg, names):
+        """Render the message.
+
+        :param msg: The message, as it would be delivered to some recipient.
+            It is modified.
+        :type msg: `Message`
+        :param names: The names of the headers to leave slots for.  The
+            message must contain exactly one of each.
+        :type names: sequence of str
+        :raises ValueError: When a header does not occur exactly once.
+        """
+        # Render the message the way smtplib.SMTP.send_message() would.
+        self._policy = msg.policy.clone(linesep='\r\n')
+        self._names = []
+        markers = []
+        for name in names:
+            stored = [key for key in msg.keys()
+                      if key.lower() == name.lower()]
+            if len(stored) != 1:
+                raise ValueError(name)
+            # Keep the original spelling of the header name.
+            self._names.append(stored[0])
+            marker = 'x-mailman-slot-{}'.format(uuid.uuid4().hex)
+            msg.replace_header(stored[0], marker)
+            markers.append(self._policy.fold_binary(stored[0], marker))
+        with BytesIO() as fp:
+            BytesGenerator(fp).flatten(msg, linesep='\r\n')
+            data = fp.getvalue()
+        # Split the rendered message into the fixed byte strings and the
+        # indexes of the slots in between them.
+        self._parts = []
+        start = 0
+        for position, index in sorted(
+                (data.find(marker), index)
+                for index, marker in enumerate(markers)):
+            if data.count(markers[index]) != 1:
+                raise ValueError(names[index])
+            self._parts.append(data[start:position])
+            self._parts.append(index)
+            start = position + len(markers[index])
+        self._parts.append(data[start:])
+
+    def render(self, values):
+        """Return the message rendered with the given header values.
+
+        :param values: The header values, in the order of the names the
+            template was created with.
+        :type values: sequence of str
+        :rtype: bytes
+        """
+        return b''.join(
+            self._policy.fold_binary(self._names[part], values[part])
+            if isinstance(part, int) else part
+            for part in self._parts)
+
+
 @public
 class IndividualDelivery(BaseDelivery):
     """Deliver a unique individual message to each recipient.
@@ -131,6 +218,15 @@ class IndividualDelivery(BaseDelivery):
     The core concept here is that for each recipient, the deliver() method
     iterates over the list of registered callbacks, each of which have a
     chance to modify the message before final delivery.
+
+    Copying and rendering the whole message for every recipient is
+    expensive for large lists, so when every callback has a companion
+    `<callback name>_key()` method, the message is rendered only once for
+    all the recipients for which the callbacks do the same thing.  The key
+    method takes the same arguments as the callback and returns a hashable
+    value describing what the callback would do for the recipient, a
+    `HeaderSlot` if the callback just sets a header to a recipient specific
+    value, or None if the message must be rendered just for this recipient.
     """
 
     def __init__(self):
@@ -147,25 +243,104 @@ class IndividualDelivery(BaseDelivery):
         """
         refused = {}
         recipients = msgdata.get('recipients', set())
+        # Look up the memberships of all the recipients at once.  Other
+        # modules, such as the header/footer decorator, use this information.
+        members = mlist.members.snapshot(recipients)
+        templates = OrderedDict() if self._renders_once(msg) else None
         for recipient in recipients:
             log.debug('IndividualDelivery to: %s', recipient)
-            # Make a copy of the original messages and operator on it, since
-            # we're going to munge it repeatedly for each recipient.
-            message_copy = copy.deepcopy(msg)
             msgdata_copy = msgdata.copy()
             # Squirrel the current recipient away in the message metadata.
             # That way the subclass's _get_sender() override can encode the
             # recipient address in the sender, e.g. for VERP.
             msgdata_copy['recipient'] = recipient
-            # See if the recipient is a member of the mailing list, and if so,
-            # squirrel this information away for use by other modules, such as
-            # the header/footer decorator.  XXX 2012-03-05 this is probably
-            # highly inefficient on the database.
-            member = mlist.members.get_member(recipient)
-            msgdata_copy['member'] = member
+            msgdata_copy['member'] = members.get(recipient)
+            if templates is not None:
+                sender = self._get_sender(mlist, msg, msgdata_copy)
+                rendered = self._render(
+                    mlist, msg, msgdata_copy, sender, templates)
+                if rendered is not None:
+                    refused.update(self._send(
+                        self._connection, sender, rendered, [recipient],
+                        message_id=msg['message-id']))
+                    continue
+            # Make a copy of the original messages and operator on it, since
+            # we're going to munge it repeatedly for each recipient.
+            message_copy = copy.deepcopy(msg)
             for callback in self.callbacks:
                 callback(mlist, message_copy, msgdata_copy)
             status = self._deliver_to_recipients(
                 mlist, message_copy, msgdata_copy, [recipient])
             refused.update(status)
         return refused
+
+    def _renders_once(self, msg):
+        """Can the message be rendered once for many recipients?"""
+        # Subclasses which override the low-level delivery get to see the
+        # message for each recipient.
+        if (type(self)._deliver_to_recipients
+                is not BaseDelivery._deliver_to_recipients):
+            return False
+        # smtplib strips these headers from the message it sends.
+        if 'bcc' in msg or 'resent-bcc' in msg:
+            return False
+        return all(
+            getattr(callback, '__self__', None) is self and
+            hasattr(self, callback.__name__ + '_key')
+            for callback in self.callbacks)
+
+    def _render(self, mlist, msg, msgdata, sender, templates):
+        """Render the message for one recipient from a shared template.
+
+        :param mlist: The mailing list being delivered to.
+        :type mlist: `IMailingList`
+        :param msg: The original message being delivered.
+        :type msg: `Message`
+        :param msgdata: Additional message metadata for this recipient.
+        :type msgdata: dictionary
+        :param sender: The envelope sender.
+        :type sender: string
+        :param templates: The templates rendered so far, by key.
+        :type templates: `OrderedDict`
+        :return: The rendered message, or None if it must be built from a
+            copy of the message just for this recipient.
+        :rtype: bytes
+        """
+        # Internationalized addresses make smtplib render the message
+        # differently.
+        try:
+            (sender + msgdata['recipient']).encode('ascii')
+        except UnicodeEncodeError:
+            return None
+        key = []
+        slots = []
+        for callback in self.callbacks:
+            part = getattr(self, callback.__name__ + '_key')(
+                mlist, msg, msgdata)
+            if part is None:
+                return None
+            if isinstance(part, HeaderSlot):
+                slots.append(part)
+                part = part.name
+            key.append(part)
+        key = tuple(key)
+        template = templates.get(key)
+        if template is None:
+            message_copy = copy.deepcopy(msg)
+            msgdata_copy = msgdata.copy()
+            for callback in self.callbacks:
+                callback(mlist, message_copy, msgdata_copy)
+            try:
+                template = MessageTemplate(
+                    message_copy, [slot.name for slot in slots])
+            except ValueError:
+                # The callbacks did not leave exactly one header to fill in.
+                template = False
+            templates[key] = template
+            if len(templates) > MAX_TEMPLATES:
+                templates.popitem(last=False)
+        else:
+            templates.move_to_end(key)
+        if template is False:
+            return None
+        return template.render([slot.value for slot in slots])
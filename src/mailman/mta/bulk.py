@@ -17,10 +17,14 @@
 
 """Bulk message delivery."""
 
+from concurrent.futures import ThreadPoolExecutor
+from mailman.config import config
 from mailman.mta.arc_signing import ARCSigningMixin
 from mailman.mta.base import BaseDelivery
+from mailman.mta.connection import get_connection, release_connection
 from mailman.mta.decorating import DecoratingMixin
 from public import public
+from queue import SimpleQueue
 
 
 # A mapping of top-level domains to bucket numbers.  The zeroth bucket is
@@ -100,9 +104,46 @@ class BulkDelivery(BaseDelivery, DecoratingMixin, ARCSigningMixin):
         # Message needs to be decorated and arc signed.
         self.decorate(mlist, msg, msgdata)
         self.arc_sign(mlist, msg, msgdata)
+        chunks = list(self.chunkify(msgdata.get('recipients', set())))
+        threads = min(int(config.mta.max_delivery_threads), len(chunks))
+        if threads > 1:
+            return self._deliver_concurrently(
+                mlist, msg, msgdata, chunks, threads)
         refused = {}
-        for recipients in self.chunkify(msgdata.get('recipients', set())):
+        for recipients in chunks:
             chunk_refused = self._deliver_to_recipients(
                 mlist, msg, msgdata, recipients)
             refused.update(chunk_refused)
         return refused
+
+    def _deliver_concurrently(self, mlist, msg, msgdata, chunks, threads):
+        """Deliver the chunks over several connections at once.
+
+        Each thread takes a connection for the duration of one chunk, so no
+        more than `threads` connections are used.  Everything touching the
+        database is done up front in the calling thread.
+        """
+        sender = self._get_sender(mlist, msg, msgdata)
+        connections = SimpleQueue()
+        connections.put(self._connection)
+        extra_connections = [get_connection() for i in range(threads - 1)]
+        for connection in extra_connections:
+            connections.put(connection)
+
+        def send(recipients):
+            connection = connections.get()
+            try:
+                return self._send(connection, sender, msg, recipients)
+            finally:
+                connections.put(connection)
+
+        refused = {}
+        try:
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                for chunk_refused in executor.map(send, chunks):
+                    refused.update(chunk_refused)
+        finally:
+            # Our own connection is released by the caller.
+            for connection in extra_connections:
+                release_connection(connection)
+        return refused
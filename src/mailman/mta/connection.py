@@ -19,11 +19,13 @@
 
 import ssl
 import enum
+import time
 import socket
 import logging
 import smtplib
+import threading
 
-from contextlib import suppress
+from contextlib import contextmanager, suppress
 from email.message import Message
 from lazr.config import as_boolean
 from mailman.config import config
@@ -33,6 +35,10 @@ from public import public
 
 log = logging.getLogger('mailman.smtp')
 
+# The connection pool in use by this process, if any.  See
+# pooled_connections().
+_pool = None
+
 
 @public
 class SecureMode(enum.Enum):
@@ -159,6 +165,31 @@ class Connection:
             self.quit()
         return results
 
+    @property
+    def is_open(self):
+        """Whether there is a connection to the SMTP server."""
+        return self._connection is not None
+
+    def noop(self):
+        """Check that the connection to the SMTP server is still usable.
+
+        The connection is closed if the server does not respond properly.
+
+        :return: True if the connection is open and the server responded.
+        :rtype: bool
+        """
+        if self._connection is None:
+            return False
+        try:
+            code, message = self._connection.noop()
+        except (socket.error, smtplib.SMTPException):
+            code = None
+        if code != 250:
+            log.debug('Dropping unresponsive SMTP connection: %s', code)
+            self.quit()
+            return False
+        return True
+
     def quit(self):
         """Mimic `smtplib.SMTP.quit`."""
         if self._connection is None:
@@ -216,3 +247,159 @@ class Connection:
         else:
             ssl_context.verify_mode = ssl.CERT_NONE
         return ssl_context
+
+
+@public
+def make_connection():
+    """Create a connection to the outgoing SMTP server.
+
+    The connection is configured from the `[mta]` section.  It is not opened
+    until the first message is sent.
+
+    :return: The new connection.
+    :rtype: `Connection`
+    """
+    return Connection(
+        config.mta.smtp_host, int(config.mta.smtp_port),
+        int(config.mta.max_sessions_per_connection),
+        config.mta.smtp_user if config.mta.smtp_user else None,
+        config.mta.smtp_pass if config.mta.smtp_pass else None,
+        as_SecureMode(config.mta.smtp_secure_mode),
+        as_boolean(config.mta.smtp_verify_cert),
+        as_boolean(config.mta.smtp_verify_hostname),
+        )
+
+
+@public
+class ConnectionPool:
+    """A pool of open connections to the outgoing SMTP server.
+
+    Connections are handed out by `acquire()` and handed back by `release()`
+    so that successive deliveries can reuse them instead of paying for a new
+    TCP connection, TLS negotiation and authentication every time.  Because
+    the same `Connection` objects are reused, the
+    `max_sessions_per_connection` limit is honored across messages.  Idle
+    connections are checked with an SMTP NOOP before being reused, and are
+    closed once they have been idle for longer than the idle timeout.  The
+    pool is safe to use from multiple threads.
+    """
+
+    def __init__(self, size, idle_timeout):
+        """Create a connection pool.
+
+        :param size: The maximum number of idle connections to keep open.
+        :type size: int
+        :param idle_timeout: The number of seconds an idle connection is kept
+            open.
+        :type idle_timeout: float
+        """
+        self._size = size
+        self._idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        # A stack of (release time, connection) pairs, most recently released
+        # last, so the warmest connections get reused first.
+        self._idle = []
+
+    def __len__(self):
+        return len(self._idle)
+
+    def acquire(self):
+        """Return a connection for the exclusive use of the caller.
+
+        :return: An open, responsive connection from the pool if there is
+            one, otherwise a new connection.
+        :rtype: `Connection`
+        """
+        while True:
+            with self._lock:
+                if len(self._idle) == 0:
+                    break
+                released, connection = self._idle.pop()
+            if time.monotonic() - released > self._idle_timeout:
+                connection.quit()
+            elif connection.noop():
+                return connection
+        return make_connection()
+
+    def release(self, connection):
+        """Return a connection to the pool.
+
+        Connections which have been closed, e.g. because of an error or
+        because they reached their session limit, are dropped, as are
+        connections in excess of the pool size.
+
+        :param connection: A connection returned by `acquire()`.
+        :type connection: `Connection`
+        """
+        if not connection.is_open:
+            return
+        with self._lock:
+            if len(self._idle) < self._size:
+                self._idle.append((time.monotonic(), connection))
+                return
+        connection.quit()
+
+    def reap(self):
+        """Close the connections which have been idle for too long."""
+        cutoff = time.monotonic() - self._idle_timeout
+        with self._lock:
+            expired = [connection for released, connection in self._idle
+                       if released < cutoff]
+            self._idle = [(released, connection)
+                          for released, connection in self._idle
+                          if released >= cutoff]
+        for connection in expired:
+            connection.quit()
+
+    def close(self):
+        """Close all the idle connections."""
+        with self._lock:
+            idle = self._idle
+            self._idle = []
+        for released, connection in idle:
+            connection.quit()
+
+
+@public
+@contextmanager
+def pooled_connections(pool):
+    """Make delivery agents take their connections from a pool.
+
+    :param pool: The pool to use, or None for a new connection per delivery.
+    :type pool: `ConnectionPool` or None
+    """
+    global _pool
+    saved = _pool
+    _pool = pool
+    try:
+        yield
+    finally:
+        _pool = saved
+
+
+@public
+def get_connection():
+    """Return a connection to the outgoing SMTP server.
+
+    The connection comes from the active pool, if there is one.  Pass it to
+    `release_connection()` when done with it.
+
+    :rtype: `Connection`
+    """
+    return make_connection() if _pool is None else _pool.acquire()
+
+
+@public
+def release_connection(connection):
+    """Release a connection returned by `get_connection()`.
+
+    The connection goes back to the active pool, or is closed if there isn't
+    one.
+
+    :param connection: The connection.
+    :type connection: `Connection`
+    """
+    if _pool is None:
+        connection.quit()
+    else:
+        _pool.release(connection)
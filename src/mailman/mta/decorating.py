@@ -18,6 +18,7 @@
 """Individualized delivery with header/footer decorations."""
 
 from mailman.config import config
+from mailman.handlers.decorate import decorations
 from mailman.mta.verp import VERPDelivery
 from public import public
 
@@ -33,6 +34,12 @@ class DecoratingMixin:
         # Do not decorate a message more than once.
         msgdata['nodecorate'] = True
 
+    def decorate_key(self, mlist, msg, msgdata):
+        """See `IndividualDelivery`."""
+        # Recipients get the same message when their headers and footers
+        # expand to the same text.
+        return decorations(mlist, msg, msgdata)
+
 
 @public
 class DecoratingDelivery(DecoratingMixin, VERPDelivery):
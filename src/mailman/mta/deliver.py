@@ -26,6 +26,7 @@ from mailman.interfaces.mta import SomeRecipientsFailed
 from mailman.mta.arc_signing import ARCSigningMixin
 from mailman.mta.base import IndividualDelivery
 from mailman.mta.bulk import BulkDelivery
+from mailman.mta.connection import release_connection
 from mailman.mta.decorating import DecoratingMixin
 from mailman.mta.personalized import PersonalizedMixin
 from mailman.mta.verp import VERPMixin
@@ -88,14 +89,12 @@ def deliver(mlist, msg, msgdata):
     t0 = time.time()
     refused = agent.deliver(mlist, msg, msgdata)
     # At this point we have completed the initial SMTP for this message.
-    # We should close the SMTP connection regardless of the
-    # sessions_per_connection setting because otherwise if there are no more
-    # messages in the queue, the connection is left open until it times out
-    # which can cause problems in the MTA.
-    # XXX It would arguably be better to close only if the queue is empty, but
-    # this means examining the queue here or closing from the outgoing runner,
-    # either of which requires more information than should be available.
-    agent._connection.quit()
+    # Unless the outgoing runner is pooling connections, we close the SMTP
+    # connection regardless of the sessions_per_connection setting because
+    # otherwise if there are no more messages in the queue, the connection is
+    # left open until it times out which can cause problems in the MTA.  A
+    # pooling runner closes its connections itself once its queue is empty.
+    release_connection(agent._connection)
     t1 = time.time()
     # Log this posting.
     size = getattr(msg, 'original_size', msgdata.get('original_size'))
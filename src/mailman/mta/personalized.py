@@ -21,6 +21,7 @@ from email.header import Header
 from email.utils import formataddr
 from mailman.interfaces.mailinglist import Personalization
 from mailman.interfaces.usermanager import IUserManager
+from mailman.mta.base import HeaderSlot
 from mailman.mta.verp import VERPDelivery
 from public import public
 from zope.component import getUtility
@@ -45,23 +46,34 @@ class PersonalizedMixin:
         # Personalize the To header if the list requests it.
         if mlist.personalize != Personalization.full:
             return
+        to = self._personalized_to(msgdata)
+        if msg.get('to'):
+            msg.replace_header('To', to)
+        else:
+            msg['To'] = to
+
+    def personalize_to_key(self, mlist, msg, msgdata):
+        """See `IndividualDelivery`."""
+        if mlist.personalize != Personalization.full:
+            return False
+        return HeaderSlot('To', self._personalized_to(msgdata))
+
+    def _personalized_to(self, msgdata):
+        """Return the To header value for the recipient."""
         recipient = msgdata['recipient']
-        user_manager = getUtility(IUserManager)
-        user = user_manager.get_user(recipient)
-        if user is None:
-            if msg.get('to'):
-                msg.replace_header('To', recipient)
-            else:
-                msg['To'] = recipient
+        # The recipient's membership, if any, has already been looked up.
+        member = msgdata.get('member')
+        if member is not None and member.address.email == recipient:
+            user = member.user
         else:
-            # Convert the unicode name to an email-safe representation.
-            # Create a Header instance for the name so that it's properly
-            # encoded for email transport.
-            name = Header(user.display_name).encode()
-            if msg.get('to'):
-                msg.replace_header('To', formataddr((name, recipient)))
-            else:
-                msg['To'] = formataddr((name, recipient))
+            user = getUtility(IUserManager).get_user(recipient)
+        if user is None:
+            return recipient
+        # Convert the unicode name to an email-safe representation.  Create a
+        # Header instance for the name so that it's properly encoded for
+        # email transport.
+        name = Header(user.display_name).encode()
+        return formataddr((name, recipient))
 
 
 @public
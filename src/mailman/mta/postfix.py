@@ -19,6 +19,7 @@
 
 import os
 import logging
+import subprocess
 
 from collections import defaultdict
 from contextlib import contextmanager
@@ -88,14 +89,23 @@ class LMTP:
             'postfix', 'transport_file_type')
         if self.transport_file_type == 'hash':
             self.postmap_command = mta_config.get('postfix', 'postmap_command')
+        self.incremental = mta_config.getboolean(
+            'postfix', 'incremental', fallback=False)
 
     def create(self, mlist):
         """See `IMailTransportAgentLifecycle`."""
-        # We can ignore the mlist argument because for LMTP delivery, we just
-        # generate the entire file every time.
-        self.regenerate()
+        if self.incremental:
+            self._update(mlist, deleted=False)
+        else:
+            # For LMTP delivery, we just generate the entire file every time.
+            self.regenerate()
 
-    delete = create
+    def delete(self, mlist):
+        """See `IMailTransportAgentLifecycle`."""
+        if self.incremental:
+            self._update(mlist, deleted=True)
+        else:
+            self.regenerate()
 
     def regenerate(self, directory=None):
         """See `IMailTransportAgentLifecycle`."""
@@ -135,6 +145,108 @@ class LMTP:
                 if errors:
                     raise RuntimeError(NL.join(errors))
 
+    def _update(self, mlist, deleted):
+        # Add or remove just the entries of one mailing list in the existing
+        # files, instead of regenerating them.  Without existing files, there
+        # is nothing to update.
+        directory = config.DATA_DIR
+        lmtp_path = os.path.join(directory, 'postfix_lmtp')
+        domains_path = os.path.join(directory, 'postfix_domains')
+        vmap_path = os.path.join(directory, 'postfix_vmap')
+        if not (os.path.exists(lmtp_path) and os.path.exists(domains_path)):
+            self.regenerate()
+            return
+        fake_list = _FakeList(mlist.list_name, mlist.mail_host)
+        changes = {lmtp_path: self._lmtp_lines(fake_list)}
+        if fake_list.mail_host != fake_list.true_mail_host:
+            changes[vmap_path] = self._vmap_lines(fake_list)
+        domain_line = self._domain_line(fake_list.true_mail_host)
+        lock_file = os.path.join(config.LOCK_DIR, 'mta')
+        with Lock(lock_file):
+            with open(domains_path, encoding='utf-8') as fp:
+                has_domain = any(line.split() == domain_line.split()
+                                 for line in fp)
+            if deleted:
+                # The mailing list is already gone from the database.
+                if has_domain and not any(
+                        mail_host == fake_list.true_mail_host
+                        for list_name, mail_host
+                        in getUtility(IListManager).name_components):
+                    changes[domains_path] = [domain_line]
+                for path, lines in changes.items():
+                    self._remove_lines(path, lines)
+            else:
+                if not has_domain:
+                    changes[domains_path] = [domain_line]
+                for path, lines in changes.items():
+                    with open(path, 'a', encoding='utf-8') as fp:
+                        for line in lines:
+                            print(line, file=fp)
+                        print(file=fp)
+            if self.transport_file_type == 'hash':
+                errors = []
+                for path, lines in changes.items():
+                    if deleted:
+                        option = '-d -'
+                        lines = [line.split()[0] for line in lines]
+                    else:
+                        option = '-i'
+                    command = '{} {} {}'.format(
+                        self.postmap_command, option, path)
+                    status = subprocess.run(
+                        command, shell=True, input=NL.join(lines) + NL,
+                        universal_newlines=True).returncode
+                    if status:
+                        msg = 'command failure: %s, %s, %s'
+                        errstr = os.strerror(status)
+                        log.error(msg, command, status, errstr)
+                        errors.append(msg % (command, status, errstr))
+                if errors:
+                    raise RuntimeError(NL.join(errors))
+
+    def _remove_lines(self, path, lines):
+        # Remove the entries with the keys of the given lines from the file.
+        if not os.path.exists(path):
+            return
+        keys = set(line.split()[0] for line in lines)
+        with open(path, encoding='utf-8') as fp:
+            old_lines = fp.readlines()
+        with atomic(path) as fp:
+            for line in old_lines:
+                parts = line.split()
+                if (len(parts) > 0 and parts[0] in keys and
+                        not parts[0].startswith('#')):
+                    continue
+                fp.write(line)
+
+    def _lmtp_lines(self, mlist):
+        # Return the transport map entries of a mailing list.
+        aliases = list(getUtility(IMailTransportAgentAliases).aliases(mlist))
+        width = max(len(alias) for alias in aliases) + \
+            aliases[0].count('.') + 10
+        return [ALIASTMPL.format(self._decorate(alias), config, width)
+                for alias in aliases]
+
+    def _domain_line(self, domain):
+        # Return the relay domains entry of a domain.
+        return '{} {}'.format(
+            self._decorate(_get_alias_domain(domain)), domain)
+
+    def _vmap_lines(self, mlist):
+        # Return the virtual alias map entries of a mailing list in a domain
+        # with an alias domain.
+        aliases = list(
+            getUtility(IMailTransportAgentAliases).destinations(mlist))
+        width = (max(len(alias) for alias in aliases) +
+                 len(mlist.true_mail_host) + 14)
+        lines = []
+        for alias in aliases:
+            addr = '{}@{}'.format(alias, mlist.mail_host)
+            true_addr = self._decorate(
+                '{}@{}'.format(alias, mlist.true_mail_host))
+            lines.append(VMAPTMPL.format(true_addr, width, addr))
+        return lines
+
     def _generate_lmtp_file(self, fp):
         # The format for Postfix's LMTP transport map is defined here:
         # http://www.postfix.org/transport.5.html
@@ -142,7 +254,6 @@ class LMTP:
         # Sort all existing mailing list names first by domain, then by
         # local part.  For Postfix we need a dummy entry for the domain.
         list_manager = getUtility(IListManager)
-        utility = getUtility(IMailTransportAgentAliases)
         by_domain = {}
         sort_key = attrgetter('list_name')
         for list_name, mail_host in list_manager.name_components:
@@ -161,14 +272,8 @@ class LMTP:
 # Aliases which are visible only in the @{} domain.""".format(domain),
                   file=fp)
             for mlist in sorted(by_domain[domain], key=sort_key):
-                aliases = list(utility.aliases(mlist))
-                width = max(len(alias) for alias in aliases) + \
-                    aliases[0].count('.') + 10
-                print(ALIASTMPL.format(self._decorate(aliases.pop(0)),
-                                       config, width), file=fp)
-                for alias in aliases:
-                    print(ALIASTMPL.format(self._decorate(alias),
-                                           config, width), file=fp)
+                for line in self._lmtp_lines(mlist):
+                    print(line, file=fp)
                 print(file=fp)
 
     def _decorate(self, name):
@@ -202,8 +307,7 @@ class LMTP:
 # you're on your own.
 """.format(now().replace(microsecond=0)), file=fp)
         for domain in sorted(domains):
-            print('{} {}'.format(
-                self._decorate(_get_alias_domain(domain)), domain), file=fp)
+            print(self._domain_line(domain), file=fp)
         print(file=fp)
 
     def _generate_vmap_file(self, fp):
@@ -213,7 +317,6 @@ class LMTP:
         # Sort all existing mailing list names first by domain, then by
         # local part.  For Postfix we need a dummy entry for the domain.
         list_manager = getUtility(IListManager)
-        utility = getUtility(IMailTransportAgentAliases)
         by_domain = defaultdict(list)
         sort_key = attrgetter('list_name')
         for list_name, mail_host in list_manager.name_components:
@@ -235,14 +338,7 @@ class LMTP:
             print("""\
 # Virtual mappings for the @{} domain.""".format(domain), file=fp)
             for mlist in sorted(by_domain[domain], key=sort_key):
-                aliases = list(utility.destinations(mlist))
-                width = (max(len(alias) for alias in aliases) +
-                         len(mlist.true_mail_host) + 14)
-                for alias in aliases:
-                    addr = '{}@{}'.format(alias, mlist.mail_host)
-                    true_addr = self._decorate(
-                        '{}@{}'.format(alias, mlist.true_mail_host))
-                    line = VMAPTMPL.format(true_addr, width, addr)
+                for line in self._vmap_lines(mlist):
                     print(line, file=fp)
                 print(file=fp)
         return True
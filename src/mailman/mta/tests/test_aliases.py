@@ -22,7 +22,8 @@ import shutil
 import tempfile
 import unittest
 
-from mailman.app.lifecycle import create_list
+from mailman.app.lifecycle import create_list, remove_list
+from mailman.config import config
 from mailman.interfaces.domain import IDomainManager
 from mailman.interfaces.mta import IMailTransportAgentAliases
 from mailman.mta.postfix import LMTP
@@ -501,3 +502,77 @@ llista1-request@grups.mailsandbox.xxxxxx.org                 llista1-request@mai
 llista1-subscribe@grups.mailsandbox.xxxxxx.org               llista1-subscribe@mail-ng.xxxxxx.org
 llista1-unsubscribe@grups.mailsandbox.xxxxxx.org             llista1-unsubscribe@mail-ng.xxxxxx.org
 """)   # noqa: E501
+
+
+class TestPostfixIncremental(unittest.TestCase):
+    """Test adding and removing the entries of one list in the Postfix maps."""
+
+    layer = ConfigLayer
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tempdir)
+        for name in ('postfix_domains', 'postfix_lmtp', 'postfix_vmap'):
+            self.addCleanup(self._remove, name)
+        getUtility(IDomainManager).add('example.net')
+        getUtility(IDomainManager).add('example.org', alias_domain='x.org')
+        self.mlist = create_list('test@example.com')
+        self.postfix = LMTP()
+        self.postfix.incremental = True
+        self.postfix.transport_file_type = 'regex'
+
+    def _remove(self, name):
+        path = os.path.join(config.DATA_DIR, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _entries(self, directory):
+        # Return the entries of the files in the directory, ignoring the
+        # comments and the order.
+        entries = {}
+        for name in os.listdir(directory):
+            if not name.startswith('postfix_'):
+                continue
+            with open(os.path.join(directory, name)) as fp:
+                lines = set(line.strip() for line in fp
+                            if line.strip() and not line.startswith('#'))
+            if len(lines) > 0:
+                entries[name] = lines
+        return entries
+
+    def _assert_regenerated(self):
+        # The incrementally updated files have the entries of regenerated
+        # files.
+        self.postfix.regenerate(self.tempdir)
+        self.assertEqual(self._entries(config.DATA_DIR),
+                         self._entries(self.tempdir))
+
+    def test_create_without_files(self):
+        self.postfix.create(self.mlist)
+        self._assert_regenerated()
+
+    def test_create_and_delete(self):
+        self.postfix.create(self.mlist)
+        ant = create_list('ant@example.com')
+        self.postfix.create(ant)
+        self._assert_regenerated()
+        bee = create_list('bee@example.net')
+        self.postfix.create(bee)
+        self._assert_regenerated()
+        cat = create_list('cat@example.org')
+        self.postfix.create(cat)
+        self._assert_regenerated()
+        for mlist in (ant, bee, cat):
+            remove_list(mlist)
+            self.postfix.delete(mlist)
+            self._assert_regenerated()
+
+    def test_postmap(self):
+        self.postfix.transport_file_type = 'hash'
+        self.postfix.postmap_command = 'true'
+        self.postfix.create(self.mlist)
+        self.postfix.create(create_list('ant@example.com'))
+        self.postfix.postmap_command = 'false'
+        with self.assertRaises(RuntimeError) as cm:
+            self.postfix.create(create_list('bee@example.com'))
+        self.assertIn('-i', str(cm.exception))
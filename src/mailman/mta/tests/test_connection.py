@@ -20,8 +20,16 @@
 import unittest
 
 from mailman.config import config
-from mailman.mta.connection import Connection, SecureMode
+from mailman.mta.connection import (
+    Connection,
+    ConnectionPool,
+    get_connection,
+    pooled_connections,
+    release_connection,
+    SecureMode,
+)
 from mailman.testing.helpers import (
+    configuration,
     LogFileMark,
     specialized_message_from_string as mfs,
 )
@@ -214,3 +222,91 @@ Subject: aardvarks
         with self.assertRaises(SMTPNotSupportedError):
             connection.sendmail(
                 'anne@example.com', ['bart@example.com'], msg_text)
+
+
+class TestConnectionPool(unittest.TestCase):
+    layer = SMTPLayer
+
+    def setUp(self):
+        self._pool = ConnectionPool(2, 60)
+        self.addCleanup(self._pool.close)
+        self._msg_text = """\
+From: anne@example.com
+To: bart@example.com
+Subject: aardvarks
+
+"""
+
+    def _send(self, connection):
+        connection.sendmail(
+            'anne@example.com', ['bart@example.com'], self._msg_text)
+
+    def test_reuse(self):
+        # A released connection is reused by the next acquire.
+        connection = self._pool.acquire()
+        self._send(connection)
+        self._pool.release(connection)
+        self.assertIs(self._pool.acquire(), connection)
+        self._send(connection)
+        self.assertEqual(self.layer.smtpd.get_connection_count(), 1)
+
+    def test_closed_connection_is_dropped(self):
+        # Connections which are not open aren't kept in the pool.
+        connection = self._pool.acquire()
+        self._send(connection)
+        connection.quit()
+        self._pool.release(connection)
+        self.assertEqual(len(self._pool), 0)
+
+    def test_pool_size(self):
+        # The pool keeps at most its size of idle connections.
+        connections = [self._pool.acquire() for i in range(3)]
+        for connection in connections:
+            self._send(connection)
+            self._pool.release(connection)
+        self.assertEqual(len(self._pool), 2)
+        self.assertFalse(connections[2].is_open)
+
+    def test_unresponsive_connection(self):
+        # A connection which fails its health check is replaced.
+        connection = self._pool.acquire()
+        self._send(connection)
+        self._pool.release(connection)
+        with patch.object(connection._connection, 'noop',
+                          return_value=(421, b'Go away')):
+            fresh = self._pool.acquire()
+        self.assertIsNot(fresh, connection)
+        self.assertFalse(connection.is_open)
+
+    def test_idle_timeout(self):
+        # Connections idle for longer than the timeout are closed.
+        pool = ConnectionPool(2, 0)
+        connection = pool.acquire()
+        self._send(connection)
+        pool.release(connection)
+        pool.reap()
+        self.assertEqual(len(pool), 0)
+        self.assertFalse(connection.is_open)
+
+    def test_sessions_per_connection(self):
+        # The session limit is honored across uses of a pooled connection.
+        with configuration('mta', max_sessions_per_connection=2):
+            for i in range(3):
+                connection = self._pool.acquire()
+                self._send(connection)
+                self._pool.release(connection)
+        self.assertEqual(self.layer.smtpd.get_connection_count(), 2)
+
+    def test_pooled_connections(self):
+        # Within pooled_connections(), get_connection() and
+        # release_connection() go through the pool.
+        with pooled_connections(self._pool):
+            connection = get_connection()
+            self._send(connection)
+            release_connection(connection)
+            self.assertIs(get_connection(), connection)
+        # Outside of it, connections are closed when released.
+        connection = get_connection()
+        self._send(connection)
+        release_connection(connection)
+        self.assertFalse(connection.is_open)
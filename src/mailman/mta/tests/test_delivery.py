@@ -27,6 +27,7 @@ from mailman.app.lifecycle import create_list
 from mailman.config import config
 from mailman.interfaces.mailinglist import Personalization
 from mailman.interfaces.template import ITemplateManager
+from mailman.mta.base import MessageTemplate
 from mailman.mta.bulk import BulkDelivery
 from mailman.mta.deliver import Deliver
 from mailman.testing.helpers import (
@@ -434,6 +435,172 @@ Subject: test
         self.assertEqual(SMTPLayer.smtpd.get_connection_count(), 2)
 
 
+class TestConcurrentBulkDelivery(unittest.TestCase):
+    """Test sending bulk delivery chunks in parallel."""
+
+    layer = SMTPLayer
+
+    def setUp(self):
+        self._mlist = create_list('test@example.com')
+        self._msg = mfs("""\
+From: anne@example.org
+To: test@example.com
+Subject: test
+Message-ID: <ant>
+
+""")
+        self._recipients = ['person{}@example.com'.format(i)
+                            for i in range(8)]
+        config.push('threads', """
+        [mta]
+        max_delivery_threads: 3
+        """)
+        self.addCleanup(config.pop, 'threads')
+
+    def test_all_chunks_delivered(self):
+        agent = BulkDelivery(2)
+        refused = agent.deliver(
+            self._mlist, self._msg, dict(recipients=self._recipients))
+        agent._connection.quit()
+        self.assertEqual(refused, {})
+        messages = list(SMTPLayer.smtpd.messages)
+        self.assertEqual(len(messages), 4)
+        delivered = sorted(
+            recipient
+            for message in messages
+            for recipient in message['x-rcptto'].split(', '))
+        self.assertEqual(delivered, sorted(self._recipients))
+        # No more connections than threads were used.
+        self.assertLessEqual(SMTPLayer.smtpd.get_connection_count(), 3)
+
+    def test_refused_are_merged(self):
+        # The refusals from each chunk all end up in the result.
+        def send(connection, sender, msg, recipients):
+            return {recipient: (550, b'Nope') for recipient in recipients
+                    if recipient.startswith('person1')
+                    or recipient.startswith('person6')}
+        agent = BulkDelivery(2)
+        with patch.object(agent, '_send', side_effect=send):
+            refused = agent.deliver(
+                self._mlist, self._msg, dict(recipients=self._recipients))
+        self.assertEqual(refused, {
+            'person1@example.com': (550, b'Nope'),
+            'person6@example.com': (550, b'Nope'),
+            })
+
+    def test_one_chunk_is_not_threaded(self):
+        agent = BulkDelivery(0)
+        with patch('mailman.mta.bulk.ThreadPoolExecutor') as executor:
+            agent.deliver(
+                self._mlist, self._msg, dict(recipients=self._recipients))
+        agent._connection.quit()
+        self.assertFalse(executor.called)
+        self.assertEqual(len(list(SMTPLayer.smtpd.messages)), 1)
+
+
+class TestRenderOnce(unittest.TestCase):
+    """Test rendering personalized messages once for many recipients."""
+
+    layer = SMTPLayer
+
+    def setUp(self):
+        self._mlist = create_list('test@example.com')
+        self._mlist.personalize = Personalization.full
+        subscribe(self._mlist, 'Anne', email='anne@example.org')
+        subscribe(self._mlist, 'Bart', email='bart@example.org')
+        subscribe(self._mlist, 'Cate', email='cate@example.org')
+        self._recipients = [
+            'anne@example.org', 'bart@example.org', 'cate@example.org']
+        self._msg = mfs("""\
+From: dave@example.org
+To: test@example.com
+Subject: test
+Message-ID: <ant>
+
+A message.
+""")
+        self._template_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self._template_dir)
+        config.push('templates', """
+        [paths.testing]
+        template_dir: {}
+        """.format(self._template_dir))
+        self.addCleanup(config.pop, 'templates')
+
+    def _set_footer(self, text):
+        path = os.path.join(self._template_dir,
+                            'site', 'en', 'member-footer.txt')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as fp:
+            print(text, file=fp)
+        getUtility(ITemplateManager).set(
+            'list:member:regular:footer', self._mlist.list_id,
+            'mailman:///member-footer.txt')
+
+    def _deliver(self, msgdata):
+        agent = Deliver()
+        with patch('mailman.mta.base.MessageTemplate',
+                   wraps=MessageTemplate) as template:
+            refused = agent.deliver(self._mlist, self._msg, msgdata)
+        agent._connection.quit()
+        self.assertEqual(refused, {})
+        messages = sorted(SMTPLayer.smtpd.messages,
+                          key=lambda message: message['x-rcptto'])
+        for message in messages:
+            del message['x-peer']
+        return template.call_count, messages
+
+    def test_shared_rendering(self):
+        # Recipients with the same footer share one rendering of the
+        # message, with their own To header.
+        self._set_footer('The footer')
+        count, messages = self._deliver(dict(recipients=self._recipients))
+        self.assertEqual(count, 1)
+        self.assertEqual(
+            [(message['to'], message['x-rcptto']) for message in messages], [
+                ('Anne Person <anne@example.org>', 'anne@example.org'),
+                ('Bart Person <bart@example.org>', 'bart@example.org'),
+                ('Cate Person <cate@example.org>', 'cate@example.org'),
+                ])
+        for message in messages:
+            self.assertEqual(message.get_payload().splitlines(),
+                             ['A message.', 'The footer'])
+
+    def test_same_as_individual_rendering(self):
+        # A shared rendering is exactly the message each recipient would
+        # otherwise have been sent.
+        self._set_footer('The footer')
+        msgdata = dict(recipients=self._recipients,
+                       **{'add-dup-header': {'bart@example.org': True}})
+        count, shared = self._deliver(msgdata)
+        self.assertEqual(count, 2)
+        with patch.object(Deliver, '_renders_once', return_value=False):
+            count, individual = self._deliver(msgdata)
+        self.assertEqual(count, 0)
+        self.assertEqual([message.as_bytes() for message in shared],
+                         [message.as_bytes() for message in individual])
+        self.assertEqual(shared[1]['x-mailman-copy'], 'yes')
+
+    def test_member_specific_footer(self):
+        # Footers which differ per member need a rendering per member.
+        self._set_footer('Sent to $user_name')
+        count, messages = self._deliver(dict(recipients=self._recipients))
+        self.assertEqual(count, 3)
+        self.assertEqual(
+            [message.get_payload().splitlines()[-1] for message in messages],
+            ['Sent to Anne Person', 'Sent to Bart Person',
+             'Sent to Cate Person'])
+
+    def test_bcc_is_not_shared(self):
+        # smtplib strips Bcc headers from the messages it sends, so those
+        # messages are not rendered by the shared path.
+        self._msg['Bcc'] = 'elle@example.org'
+        count, messages = self._deliver(dict(recipients=self._recipients))
+        self.assertEqual(count, 0)
+        self.assertEqual(len(messages), 3)
+        self.assertIsNone(messages[0]['bcc'])
+
+
 class TestDeliveryLogging(unittest.TestCase):
     """Test that logging doesn't split on folded Message-IDs."""
 
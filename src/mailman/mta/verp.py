@@ -84,6 +84,10 @@ class VERPMixin:
         if recipient in msgdata.get('add-dup-header', {}):
             msg['X-Mailman-Copy'] = 'yes'
 
+    def avoid_duplicates_key(self, mlist, msg, msgdata):
+        """See `IndividualDelivery`."""
+        return msgdata['recipient'] in msgdata.get('add-dup-header', {})
+
 
 @public
 class VERPDelivery(VERPMixin, IndividualDelivery):
@@ -33,11 +33,29 @@ from mailman.rest.helpers import (
     not_found,
     okay,
 )
-from mailman.rest.validator import enum_validator, Validator
+from mailman.rest.validator import (
+    enum_validator,
+    list_of_strings_validator,
+    Validator,
+)
 from public import public
 from zope.component import getUtility
 
 
+# The fields of the held message resources which can be chosen.
+HELD_MESSAGE_FIELDS = (
+    'hold_date',
+    'message_id',
+    'msg',
+    'original_subject',
+    'reason',
+    'request_id',
+    'self_link',
+    'sender',
+    'subject',
+    )
+
+
 class _ModerationBase:
     """Common base class."""
 
@@ -73,23 +91,26 @@ class _ModerationBase:
 class _HeldMessageBase(_ModerationBase):
     """Held messages are a little different."""
 
-    def _make_resource(self, request_id):
+    def _make_resource(self, request_id, fields=None):
         resource = super()._make_resource(request_id)
         if resource is None:
             return None
         # Grab the message and insert its text representation into the
-        # resource.  XXX See LP: #967954
+        # resource, unless only other fields were asked for.  Reading the
+        # message from the message store is what makes listing many held
+        # messages slow.  XXX See LP: #967954
         key = resource.pop('key')
-        msg = getUtility(IMessageStore).get_message_by_id(key)
-        if msg is None:
-            resource['msg'] = """\
+        if fields is None or 'msg' in fields:
+            text = getUtility(IMessageStore).get_message_text(key)
+            if text is None:
+                resource['msg'] = """\
 Subject: Message content lost
 Message-ID: {}
 
 This held message has been lost.
 """.format(key)
-        else:
-            resource['msg'] = msg.as_string()
+            else:
+                resource['msg'] = text
         # Some of the _mod_* keys we want to rename and place into the JSON
         # resource.  Others we can drop.  Since we're mutating the dictionary,
         # we need to make a copy of the keys.  When you port this to Python 3,
@@ -109,6 +130,9 @@ This held message has been lost.
         # Also, held message resources will always be this type, so ignore
         # this key value.
         del resource['type']
+        if fields is not None:
+            resource = {field: resource[field]
+                        for field in fields if field in resource}
         return resource
 
 
@@ -174,9 +198,16 @@ class HeldMessages(_HeldMessageBase, CollectionMixin):
     def __init__(self, mlist):
         self._mlist = mlist
 
-    def _resource_as_dict(self, request):
+    def _resource_as_dict(self, request, fields=None):
         """See `CollectionMixin`."""
-        resource = self._make_resource(request.id)
+        if fields is not None:
+            for field in fields:
+                if field not in HELD_MESSAGE_FIELDS:
+                    raise ValueError(
+                        'Unknown field "{}" for held message resource.'
+                        ' Allowed fields are: {}'.format(
+                            field, ', '.join(HELD_MESSAGE_FIELDS)))
+        resource = self._make_resource(request.id, fields)
         assert resource is not None, resource
         return resource
 
@@ -186,7 +217,18 @@ class HeldMessages(_HeldMessageBase, CollectionMixin):
 
     def on_get(self, request, response):
         """/lists/listname/held"""
-        resource = self._make_collection(request)
+        validator = Validator(
+            fields=list_of_strings_validator,
+            count=int,
+            page=int,
+            _optional=['fields', 'count', 'page'],
+            )
+        try:
+            data = validator(request)
+            resource = self._make_collection(request, data.get('fields'))
+        except ValueError as error:
+            bad_request(response, str(error))
+            return
         okay(response, etag(resource))
 
     @child()
@@ -40,7 +40,7 @@ class _QueuesBase(CollectionMixin):
     def _resource_as_dict(self, name):
         """See `CollectionMixin`."""
         switchboard = config.switchboards[name]
-        files = switchboard.files
+        files = switchboard.get_files()
         return dict(
             name=switchboard.name,
             directory=switchboard.queue_directory,
@@ -24,6 +24,7 @@ from mailman.database.transaction import transaction
 from mailman.interfaces.domain import IDomainManager
 from mailman.interfaces.listmanager import IListManager
 from mailman.interfaces.template import ITemplateManager
+from mailman.model.domain import lists_generation
 from mailman.testing.helpers import call_api
 from mailman.testing.layers import RESTLayer
 from urllib.error import HTTPError
@@ -155,6 +156,17 @@ class TestDomains(unittest.TestCase):
         domain = getUtility(IDomainManager).get('example.net')
         self.assertEqual(domain.alias_domain, 'x.example.net')
 
+    def test_patch_alias_domain(self):
+        # Changing the alias domain makes the LMTP servers forget the
+        # addresses they resolved.
+        generation = lists_generation.get()
+        content, response = call_api(
+            'http://localhost:9001/3.0/domains/example.com',
+            dict(alias_domain='x.example.com'),
+            method='PATCH')
+        self.assertEqual(response.status_code, 204)
+        self.assertNotEqual(lists_generation.get(), generation)
+
     def test_bogus_endpoint_extension(self):
         # /domains/<domain>/lists/<anything> is not a valid endpoint.
         with self.assertRaises(HTTPError) as cm:
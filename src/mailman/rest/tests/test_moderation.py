@@ -17,6 +17,7 @@
 
 """REST moderation tests."""
 
+import os
 import unittest
 
 from mailman.app.lifecycle import create_list
@@ -193,6 +194,38 @@ This held message has been lost.
         self.assertEqual(json['total_size'], 1)
         self.assertEqual(json['entries'][0]['request_id'], held_id)
 
+    def test_list_held_messages_fields(self):
+        # The held messages can be listed without reading them from the
+        # message store.
+        with transaction():
+            held_id = hold_message(self._mlist, self._msg)
+        message_store = getUtility(IMessageStore)
+        row = list(message_store.metadata)[0]
+        os.remove(os.path.join(config.MESSAGES_DIR, row.path))
+        json, response = call_api(
+            'http://localhost:9001/3.0/lists/ant@example.com/held'
+            '?fields=request_id&fields=subject')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json['entries'], [
+            dict(http_etag=json['entries'][0]['http_etag'],
+                 request_id=held_id,
+                 subject='Something'),
+            ])
+        # Reading the missing message would have deleted it from the store.
+        config.db.abort()
+        self.assertEqual(
+            [row.message_id for row in message_store.metadata], ['<alpha>'])
+
+    def test_list_held_messages_bad_field(self):
+        with transaction():
+            hold_message(self._mlist, self._msg)
+        with self.assertRaises(HTTPError) as cm:
+            call_api('http://localhost:9001/3.0/lists/ant@example.com/held'
+                     '?fields=bogus')
+        self.assertEqual(cm.exception.code, 400)
+        self.assertTrue(cm.exception.reason.startswith(
+            'Unknown field "bogus" for held message resource.'))
+
     def test_cant_get_other_lists_holds(self):
         # Issue #161: It was possible to moderate a held message for another
         # list via the REST API.
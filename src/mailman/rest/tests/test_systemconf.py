@@ -40,26 +40,34 @@ class TestSystemConfiguration(unittest.TestCase):
             anonymous_list_keep_headers='^x-mailman- ^x-content-filtered-by: '
                                         '^x-topics:\n^x-ack: ^x-beenthere: '
                                         '^x-list-administrivia: ^x-spam-',
+            bounce_batch_size='1000',
             cache_life='7d',
             check_max_size_on_filtered_message='no',
             default_language='en',
             email_commands_max_lines='10',
             filter_report='no',
             filtered_messages_are_preservable='no',
+            fork_runners='no',
             hold_digest='no',
             html_to_plain_text_command='/usr/bin/lynx -dump $filename',
             layout='testing',
             listname_chars='[-_.0-9a-z]',
             masthead_threshold='4',
+            message_store_format='pickle',
             moderator_request_life='180d',
             noreply_address='noreply',
             pending_request_life='3d',
             post_hook='',
             pre_hook='',
+            queue_file_format='pickle',
             run_tasks_every='1h',
             self_link='http://localhost:9001/3.0/system/configuration/mailman',
             sender_headers='from from_ reply-to sender',
             site_owner='noreply@example.com',
+            task_batch_size='1000',
+            template_cache_lifetime='5m',
+            template_cache_size='1000',
+            template_check_interval='0s',
             ))
 
     def test_dmarc_system_configuration(self):
@@ -129,6 +137,7 @@ class TestSystemConfiguration(unittest.TestCase):
             'devmode',
             'digests',
             'dmarc',
+            'dns',
             'language.ar',
             'language.ast',
             'language.bg',
@@ -24,6 +24,7 @@ import dns.resolver
 
 from dns.exception import DNSException
 from email.utils import parseaddr
+from functools import lru_cache
 from importlib.resources import read_binary
 from lazr.config import as_timedelta
 from mailman.config import config
@@ -31,6 +32,7 @@ from mailman.core.i18n import _
 from mailman.interfaces.mailinglist import DMARCMitigateAction
 from mailman.interfaces.rules import IRule
 from mailman.utilities.datetime import now
+from mailman.utilities.dnscache import make_resolver
 from mailman.utilities.protocols import get
 from mailman.utilities.string import wrap
 from public import public
@@ -48,8 +50,14 @@ KEEP_LOOKING = object()
 LOCAL_FILE_NAME = 'public_suffix_list.dat'
 
 # Map organizational domain suffix rules to a boolean indicating whether the
-# rule is an exception or not.
+# rule is an exception or not.  The rules are keyed by their labels in
+# reverse order, e.g. 'jp.kobe.*', so a domain is looked up by probing the
+# keys for each of its suffixes.
 suffix_cache = dict()
+# The number of organizational domains to remember, and the rules they were
+# found with.
+ORG_DOMAIN_CACHE_SIZE = 1024
+_cached_rules = None
 
 
 def ensure_current_suffix_list():
@@ -125,6 +133,8 @@ def parse_suffix_list(filename=None):
             parts.reverse()
             key = DOT.join(parts)
             suffix_cache[key] = exception
+    # Forget the organizational domains found with the old rules.
+    _organizational_domain.cache_clear()
 
 
 def get_domain(parts, label):
@@ -138,31 +148,32 @@ def get_domain(parts, label):
 def get_organizational_domain(domain):
     # Given a domain name, this returns the corresponding Organizational
     # Domain which may be the same as the input.
+    global _cached_rules
     if len(suffix_cache) == 0:
         parse_suffix_list()
-    hits = []
-    parts = domain.lower().split('.')
+    if _cached_rules is not suffix_cache:
+        _organizational_domain.cache_clear()
+        _cached_rules = suffix_cache
+    return _organizational_domain(domain.lower())
+
+
+@lru_cache(maxsize=ORG_DOMAIN_CACHE_SIZE)
+def _organizational_domain(domain):
+    parts = domain.split('.')
     parts.reverse()
-    for key in suffix_cache:
-        key_parts = key.split('.')
-        if len(parts) >= len(key_parts):
-            for i in range(len(key_parts) - 1):
-                if parts[i] != key_parts[i] and key_parts[i] != '*':
-                    break
-            else:
-                if (parts[len(key_parts) - 1] == key_parts[-1] or
-                        key_parts[-1] == '*'):
-                    hits.append(key)
-    if not hits:
-        return get_domain(parts, 1)
-    label = 0
-    for key in hits:
-        key_parts = key.split('.')
-        if suffix_cache[key]:
-            # It's an exception.
-            return get_domain(parts, len(key_parts) - 1)
-        if len(key_parts) > label:
-            label = len(key_parts)
+    # Find the longest rule matching a suffix of the domain, looking up the
+    # exact suffix and the wild card rule covering it.  An exception rule
+    # wins over everything else.
+    label = 1
+    for count in range(1, len(parts) + 1):
+        for key in (DOT.join(parts[:count]),
+                    DOT.join(parts[:count - 1] + ['*'])):
+            exception = suffix_cache.get(key)
+            if exception is None:
+                continue
+            if exception:
+                return get_domain(parts, count - 1)
+            label = count
     return get_domain(parts, label)
 
 
@@ -174,7 +185,7 @@ def is_reject_or_quarantine(mlist, email, dmarc_domain, org=False):
     # * True if the DMARC policy is reject or quarantine;
     # * False if is not;
     # * A special sentinel if we should continue looking
-    resolver = dns.resolver.Resolver()
+    resolver = make_resolver()
     resolver.timeout = as_timedelta(
         config.dmarc.resolver_timeout).total_seconds()
     resolver.lifetime = as_timedelta(
@@ -77,6 +77,49 @@ bad regexp in bounce_matching_header line: %s
     return all
 
 
+class _MatchingHeaders:
+    """The compiled bounce_matching_headers of a mailing list.
+
+    The patterns for the same header are combined into a single alternation
+    where possible.
+    """
+
+    def __init__(self, mlist):
+        self.text = mlist.bounce_matching_headers
+        by_header = {}
+        for header, cre, line in _parse_matching_header_opt(mlist):
+            by_header.setdefault(header.lower(), (header, []))[1].append(cre)
+        self.headers = []
+        for header, cres in by_header.values():
+            # Patterns with groups may contain back references, which would
+            # refer to the wrong group in the alternation.
+            combine = [cre for cre in cres if cre.groups == 0]
+            if len(combine) > 1:
+                try:
+                    cre = re.compile('|'.join(
+                        '(?:{})'.format(cre.pattern) for cre in combine),
+                        re.IGNORECASE)
+                except re.error:
+                    # Some inline flags are only allowed at the start of a
+                    # pattern.
+                    pass
+                else:
+                    cres = [cre] + [cre for cre in cres if cre.groups > 0]
+            self.headers.append((header, cres))
+
+
+# The compiled bounce_matching_headers by list id.  They are recompiled when
+# the list's bounce_matching_headers change.
+_matching_headers = {}
+
+
+def _get_matching_headers(mlist):
+    matching = _matching_headers.get(mlist.list_id)
+    if matching is None or matching.text != mlist.bounce_matching_headers:
+        matching = _matching_headers[mlist.list_id] = _MatchingHeaders(mlist)
+    return matching.headers
+
+
 def has_matching_bounce_header(mlist, msg, msgdata):
     """Does the message have a matching bounce header?
 
@@ -85,11 +128,11 @@ def has_matching_bounce_header(mlist, msg, msgdata):
     :return: True if a header field matches a regexp in the
         bounce_matching_header mailing list variable.
     """
-    for header, cre, line in _parse_matching_header_opt(mlist):
+    for header, cres in _get_matching_headers(mlist):
         for value in msg.get_all(header, []):
             # Convert the header value to a str because it may be an
             # email.header.Header instance.
-            if cre.search(str(value)):
+            if any(cre.search(str(value)) for cre in cres):
                 msgdata['moderation_sender'] = msg.sender
                 with _.defer_translation():
                     # This will be translated at the point of use.
@@ -240,6 +240,37 @@ class TestDMARCRules(TestCase):
             dmarc.get_organizational_domain('ssub.sub.city.kobe.jp'),
             'city.kobe.jp')
 
+    def test_longest_rule_wins(self):
+        # foo.kobe.jp matches both the jp and the *.kobe.jp rules.
+        self.assertEqual(
+            dmarc.get_organizational_domain('a.b.foo.kobe.jp'),
+            'b.foo.kobe.jp')
+        self.assertEqual(
+            dmarc.get_organizational_domain('a.b.example.jp'),
+            'example.jp')
+
+    def test_lookups_are_cached(self):
+        dmarc.get_organizational_domain('ssub.sub.foo.kobe.jp')
+        hits = dmarc._organizational_domain.cache_info().hits
+        self.assertEqual(
+            dmarc.get_organizational_domain('SSUB.sub.foo.kobe.jp'),
+            'sub.foo.kobe.jp')
+        self.assertEqual(
+            dmarc._organizational_domain.cache_info().hits, hits + 1)
+
+    def test_new_rules_clear_the_cache(self):
+        # Cached organizational domains are forgotten when the rules change.
+        self.assertEqual(
+            dmarc.get_organizational_domain('ssub.sub.foo.kobe.jp'),
+            'sub.foo.kobe.jp')
+        with patch('mailman.rules.dmarc.suffix_cache', {'jp': False}):
+            self.assertEqual(
+                dmarc.get_organizational_domain('ssub.sub.foo.kobe.jp'),
+                'kobe.jp')
+        self.assertEqual(
+            dmarc.get_organizational_domain('ssub.sub.foo.kobe.jp'),
+            'sub.foo.kobe.jp')
+
     def test_straightforward_cname(self):
         # Test that we can recognize an answer with case mismatch in the
         # domain.
@@ -55,3 +55,30 @@ class TestSuspicious(unittest.TestCase):
             [('Header "{}" matched a bounce_matching_header line',
               'spam@example.com')]
             )
+
+    def test_recompiled_after_change(self):
+        msg = Message()
+        msg['From'] = 'spam@example.com'
+        self._mlist.bounce_matching_headers = 'from: eggs@example.com'
+        self.assertFalse(self._rule.check(self._mlist, msg, {}))
+        self._mlist.bounce_matching_headers = 'from: spam@example.com'
+        self.assertTrue(self._rule.check(self._mlist, msg, {}))
+
+    def test_combined_patterns(self):
+        msg = Message()
+        msg['From'] = 'spam@example.com'
+        msg['To'] = 'zzz@example.com'
+        self._mlist.bounce_matching_headers = """\
+from: eggs@example.com
+# A comment.
+From: ^spam@
+to: (\\w)\\1\\1
+"""
+        msgdata = {}
+        self.assertTrue(self._rule.check(self._mlist, msg, msgdata))
+        self.assertEqual(msgdata['moderation_reasons'][0][1],
+                         'spam@example.com')
+        del msg['From']
+        self.assertTrue(self._rule.check(self._mlist, msg, {}))
+        msg.replace_header('To', 'zz@example.com')
+        self.assertFalse(self._rule.check(self._mlist, msg, {}))
@@ -22,11 +22,7 @@ import logging
 from flufl.bounce import all_failures
 from mailman.app.bounces import maybe_forward, ProbeVERP, StandardVERP
 from mailman.core.runner import Runner
-from mailman.interfaces.bounce import (
-    BounceContext,
-    IBounceProcessor,
-    InvalidBounceEvent,
-)
+from mailman.interfaces.bounce import BounceContext, IBounceProcessor
 from public import public
 from zope.component import getUtility
 
@@ -110,13 +106,7 @@ class BounceRunner(Runner):
     def _process_events(self):
         """Process all the pending bounce events."""
         log.debug('Processing bounce events.')
-        for bounce_event in self._processor.unprocessed:
-            try:
-                self._processor.process_event(bounce_event)
-            except InvalidBounceEvent as e:
-                # This member is either unsubscribed or this is a very stale
-                # event.
-                log.info('Bounce message for a non subscriber: {}'.format(e))
+        self._processor.process_events()
 
     def _send_warnings(self):
         """Send warnings to disabled users and remove them if needed."""
@@ -35,13 +35,17 @@ so that the peer mail server can provide better diagnostics.
 """
 
 import re
+import time
 import email
+import asyncio
 import logging
 
 from aiosmtpd.controller import Controller
 from aiosmtpd.lmtp import LMTP
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
 from email.utils import parseaddr
+from lazr.config import as_timedelta
 from mailman.config import config
 from mailman.core.runner import Runner
 from mailman.database.transaction import transactional
@@ -49,6 +53,7 @@ from mailman.email.message import Message
 from mailman.interfaces.domain import IDomainManager
 from mailman.interfaces.listmanager import IListManager
 from mailman.interfaces.runner import RunnerInterrupt
+from mailman.model.domain import lists_generation
 from mailman.utilities.datetime import now
 from mailman.utilities.email import add_message_hash
 from public import public
@@ -88,6 +93,7 @@ SUBADDRESS_QUEUES = dict(
 DASH = '-'
 CRLF = '\r\n'
 ERR_451 = '451 Requested action aborted: error in processing'
+ERR_451_BUSY = '451 Requested action aborted: server busy, try again later'
 ERR_501 = '501 Message has defects'
 ERR_502 = '502 Error: command HELO not implemented'
 ERR_550 = '550 Requested action not taken: mailbox unavailable'
@@ -125,28 +131,145 @@ def split_recipient(address):
     return listname, subaddress, domain
 
 
+@public
+class RecipientResolver:
+    """Resolve recipient addresses to mailing lists.
+
+    The addresses which resolve to a mailing list are cached, so that
+    validating the recipients of a message doesn't normally need the
+    database.  Addresses which don't resolve are looked up every time.
+    The cache is cleared when the lists generation changes, which is checked
+    at most every `[mta]lmtp_recipient_check_interval`.
+    """
+
+    def __init__(self):
+        # Map addresses, without any VERP suffix, to (list-id, subaddress).
+        self._resolved = {}
+        self._current = None
+        self._checked = None
+
+    def _check(self):
+        now = time.monotonic()
+        interval = as_timedelta(
+            config.mta.lmtp_recipient_check_interval).total_seconds()
+        if self._checked is not None and now - self._checked < interval:
+            return
+        generation = lists_generation.get()
+        if generation != self._current:
+            self._resolved.clear()
+            self._current = generation
+        self._checked = now
+
+    def resolve(self, address):
+        """Resolve an address.
+
+        :param address: The lower cased recipient address.
+        :type address: str
+        :return: A 2-tuple of the form (list-id, subaddress), or None if the
+            address isn't one of a mailing list's addresses.  subaddress is
+            None for the list's posting address.
+        """
+        self._check()
+        localpart, at, domain = address.partition('@')
+        key = '{}@{}'.format(
+            localpart.split(config.mta.verp_delimiter, 1)[0], domain)
+        resolved = self._resolved.get(key)
+        if resolved is None:
+            resolved = self._lookup(address)
+            if resolved is not None:
+                self._resolved[key] = resolved
+        return resolved
+
+    def _lookup(self, address):
+        list_manager = getUtility(IListManager)
+        local, subaddress, domain = split_recipient(address)
+        if subaddress is not None:
+            # Check that local-subaddress is not an actual list name.
+            mlist = list_manager.get_by_fqdn(
+                '{}-{}@{}'.format(local, subaddress, domain))
+            if mlist is not None:
+                return mlist.list_id, None
+        mlist = list_manager.get_by_fqdn('{}@{}'.format(local, domain))
+        if mlist is None:
+            return None
+        return mlist.list_id, subaddress
+
+
+class StageTimer:
+    """Measure how long each stage of handling a message takes."""
+
+    def __init__(self, start=None):
+        self._last = time.monotonic() if start is None else start
+        self.stages = []
+
+    def mark(self, stage):
+        """Record the end of a stage which started at the previous mark."""
+        now = time.monotonic()
+        self.stages.append((stage, now - self._last))
+        self._last = now
+
+    def __str__(self):
+        return ' '.join('{}={:.3f}s'.format(stage, seconds)
+                        for stage, seconds in self.stages)
+
+
 class LMTPHandler:
 
+    def __init__(self, workers=0, max_pending=0):
+        """Create an LMTP handler.
+
+        :param workers: The number of worker threads recipients and messages
+            are handled in.  When 0, they are handled in the event loop.
+        :type workers: int
+        :param max_pending: The number of commands which may be waiting for
+            or being handled by the workers.  Further commands get a 451
+            temporary error.
+        :type max_pending: int
+        """
+        self._resolver = RecipientResolver()
+        self._executor = (
+            ThreadPoolExecutor(workers, thread_name_prefix='lmtp')
+            if workers > 0 else None)
+        self._max_pending = max_pending
+        # Only touched by the event loop, so there's no need for a lock.
+        self._pending = 0
+
+    def close(self):
+        """Wait for the workers to finish."""
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    async def _call(self, busy, function, *args):
+        # Run the function in a worker thread, or directly when there are no
+        # workers.  Return `busy` if too many commands are pending.
+        if self._executor is None:
+            return function(*args)
+        if self._pending >= self._max_pending:
+            slog.warning('LMTP workers saturated, %s commands pending',
+                         self._pending)
+            return busy
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, function, *args)
+        finally:
+            self._pending -= 1
+
     async def handle_RCPT(self, server, session, envelope, to, rcpt_options):
         # Use a helper function to use the transactional wrapper on since it
         # doesn't yet work on awaitables (async def funcs.)
-        return self._handle_RCPT(server, session, envelope, to, rcpt_options)
+        return await self._call(
+            ERR_451_BUSY, self._handle_RCPT,
+            server, session, envelope, to, rcpt_options)
 
     @transactional
     def _handle_RCPT(self, server, session, envelope, to, rcpt_options):
-        listnames = set(getUtility(IListManager).names)
         try:
             to = parseaddr(to)[1].lower()
-            local, subaddress, domain = split_recipient(to)
-            if subaddress is not None:
-                # Check that local-subaddress is not an actual list name.
-                listname = '{}-{}@{}'.format(local, subaddress, domain)
-                if listname in listnames:
-                    local = '{}-{}'.format(local, subaddress)
-                    subaddress = None
-            listname = '{}@{}'.format(local, domain)
-            if listname not in listnames:
+            resolved = self._resolver.resolve(to)
+            if resolved is None:
                 return ERR_550
+            list_id, subaddress = resolved
             canonical_subaddress = SUBADDRESS_NAMES.get(subaddress)
             if subaddress is None:
                 # The message is destined for the mailing list.
@@ -172,18 +295,20 @@ class LMTPHandler:
     async def handle_DATA(self, server, session, envelope):
         # Use a helper function to use the transactional wrapper on since it
         # doesn't yet work on awaitables (async def funcs.)
-        return self._handle_DATA(server, session, envelope)
+        return await self._call(
+            CRLF.join(ERR_451_BUSY for to in envelope.rcpt_tos),
+            self._handle_DATA, server, session, envelope, time.monotonic())
 
     @transactional
-    def _handle_DATA(self, server, session, envelope):
+    def _handle_DATA(self, server, session, envelope, submitted=None):
+        timer = StageTimer(submitted)
+        timer.mark('wait')
         try:
-            # Refresh the list of list names every time we process a message
-            # since the set of mailing lists could have changed.
-            listnames = set(getUtility(IListManager).names)
             # Parse the message data.  If there are any defects in the
             # message, reject it right away; it's probably spam.
             msg = email.message_from_bytes(envelope.content, Message)
             msg.set_unixfrom(envelope.mail_from)
+            timer.mark('parse')
         except Exception:
             elog.exception('LMTP message parsing')
             config.db.abort()
@@ -208,6 +333,7 @@ class LMTPHandler:
         msg.original_size = len(envelope.content)
         add_message_hash(msg)
         msg['X-MailFrom'] = envelope.mail_from
+        timer.mark('prepare')
         # RFC 2033 requires us to return a status code for every recipient.
         status = []
         # Now for each address in the recipients, parse the address to first
@@ -218,25 +344,18 @@ class LMTPHandler:
         for to in envelope.rcpt_tos:
             try:
                 to = parseaddr(to)[1].lower()
-                local, subaddress, domain = split_recipient(to)
-                if subaddress is not None:
-                    # Check that local-subaddress is not an actual list name.
-                    listname = '{}-{}@{}'.format(local, subaddress, domain)
-                    if listname in listnames:
-                        local = '{}-{}'.format(local, subaddress)
-                        subaddress = None
-                slog.debug('%s to: %s, list: %s, sub: %s, dom: %s',
-                           message_id, to, local, subaddress, domain)
-                listname = '{}@{}'.format(local, domain)
-                if listname not in listnames:
+                resolved = self._resolver.resolve(to)
+                if resolved is None:
                     status.append(ERR_550)
                     continue
-                mlist = getUtility(IListManager).get_by_fqdn(listname)
+                list_id, subaddress = resolved
+                slog.debug('%s to: %s, list: %s, sub: %s',
+                           message_id, to, list_id, subaddress)
                 # The recipient is a valid mailing list.  Find the subaddress
                 # if there is one, and set things up to enqueue to the proper
                 # queue.
                 queue = None
-                msgdata = dict(listid=mlist.list_id,
+                msgdata = dict(listid=list_id,
                                original_size=msg.original_size,
                                received_time=received_time)
                 canonical_subaddress = SUBADDRESS_NAMES.get(subaddress)
@@ -273,6 +392,8 @@ class LMTPHandler:
                 slog.exception('Queue detection: %s', msg['message-id'])
                 config.db.abort()
                 status.append(ERR_550)
+        timer.mark('enqueue')
+        slog.debug('%s LMTP stages: %s', message_id, timer)
         # All done; returning this big status string should give the expected
         # response to the LMTP client.
         return CRLF.join(status)
@@ -297,7 +418,9 @@ class LMTPRunner(Runner):
         super().__init__(name, slice)
         hostname = config.mta.lmtp_host
         port = int(config.mta.lmtp_port)
-        self.lmtp = LMTPController(LMTPHandler(), hostname=hostname, port=port)
+        self.handler = LMTPHandler(int(config.mta.lmtp_workers),
+                                   int(config.mta.lmtp_max_pending))
+        self.lmtp = LMTPController(self.handler, hostname=hostname, port=port)
         qlog.debug('LMTP server listening on %s:%s', hostname, port)
 
     def run(self):
@@ -307,3 +430,4 @@ class LMTPRunner(Runner):
             while not self._stop:
                 self._snooze(0)
             self.lmtp.stop()
+            self.handler.close()
@@ -20,7 +20,7 @@
 import socket
 import logging
 
-from datetime import datetime
+from datetime import datetime, timedelta
 from email.utils import formatdate, make_msgid
 from lazr.config import as_boolean, as_timedelta
 from mailman.config import config
@@ -31,6 +31,7 @@ from mailman.interfaces.mailinglist import Personalization
 from mailman.interfaces.mta import SomeRecipientsFailed
 from mailman.interfaces.pending import IPendings
 from mailman.interfaces.subscriptions import ISubscriptionService
+from mailman.mta.connection import ConnectionPool, pooled_connections
 from mailman.utilities.datetime import now
 from mailman.utilities.modules import find_name
 from public import public
@@ -60,6 +61,14 @@ class OutgoingRunner(Runner):
         # set if there was a socket.error.
         self._logged = False
         self._retryq = config.switchboards['retry']
+        # Optionally keep SMTP connections open between deliveries.
+        pool_size = int(config.mta.smtp_pool_size)
+        if pool_size > 0:
+            idle_timeout = as_timedelta(config.mta.smtp_idle_timeout)
+            self._pool = ConnectionPool(
+                pool_size, idle_timeout.total_seconds())
+        else:
+            self._pool = None
 
     def _fake_dsn(self, mlist, recipient, code, smtp_message):
         # Craft a fake DSN for SMTP permanent failures.
@@ -81,7 +90,9 @@ Error message: {}
         # See if we should retry delivery of this message again.
         deliver_after = msgdata.get('deliver_after', datetime.fromtimestamp(0))
         if now() < deliver_after:
-            return True
+            # Not due yet.  The retry queue holds on to it until it is.
+            self._retryq.enqueue(msg, msgdata)
+            return False
         # Calculate whether we should VERP this message or not.  The results of
         # this set the 'verp' key in the message metadata.
         interval = int(config.mta.verp_delivery_interval)
@@ -108,7 +119,8 @@ Error message: {}
         try:
             debug_log.debug('[outgoing] {}: {}'.format(
                 self._func, msg.get('message-id', 'n/a')))
-            self._func(mlist, msg, msgdata)
+            with pooled_connections(self._pool):
+                self._func(mlist, msg, msgdata)
             self._logged = False
         except socket.error:
             # There was a problem connecting to the SMTP server.  Log this
@@ -178,9 +190,42 @@ Error message: {}
                         # this message for a while longer.
                         deliver_until = current_time + as_timedelta(
                             config.mta.delivery_retry_period)
+                    # Back off exponentially between the attempts.  Double
+                    # the delay step by step, since multiplying it by a
+                    # large power of 2 overflows.
+                    retry_count = msgdata.get('retry_count', 0)
+                    delay = as_timedelta(config.mta.delivery_retry_delay)
+                    max_delay = as_timedelta(
+                        config.mta.delivery_retry_max_delay)
+                    for attempt in range(retry_count):
+                        if not timedelta(0) < delay < max_delay:
+                            break
+                        delay *= 2
+                    delay = min(delay, max_delay)
                     msgdata['last_recip_count'] = len(recipients)
                     msgdata['deliver_until'] = deliver_until
                     msgdata['recipients'] = recipients
+                    msgdata['retry_count'] = retry_count + 1
+                    msgdata['deliver_after'] = current_time + delay
                     self._retryq.enqueue(msg, msgdata)
         # We've successfully completed handling of this message.
         return False
+
+    def _do_periodic(self):
+        """See `IRunner`."""
+        if self._pool is not None:
+            self._pool.reap()
+
+    def _snooze(self, filecnt):
+        """See `IRunner`."""
+        # The queue has drained, so don't hold connections open to the MTA
+        # while we wait for more work.
+        if not filecnt and self._pool is not None:
+            self._pool.close()
+        super()._snooze(filecnt)
+
+    def _clean_up(self):
+        """See `IRunner`."""
+        if self._pool is not None:
+            self._pool.close()
+        super()._clean_up()
@@ -21,6 +21,7 @@ import time
 
 from mailman.config import config
 from mailman.core.runner import Runner
+from mailman.utilities.datetime import now
 from public import public
 
 
@@ -29,10 +30,26 @@ class RetryRunner(Runner):
     """Retry delivery."""
 
     def _dispose(self, mlist, msg, msgdata):
+        deliver_after = msgdata.get('deliver_after')
+        if deliver_after is not None and now() < deliver_after:
+            # This switchboard doesn't keep messages back until they are due,
+            # so keep it here until it is.
+            return True
         # Move the message to the out queue for another try.
         config.switchboards['out'].enqueue(msg, msgdata)
         return False
 
     def _snooze(self, filecnt):
-        # We always want to snooze.
-        time.sleep(self.sleep_float)
+        # We always want to snooze, but not past the time the next message is
+        # due, if the switchboard knows that.
+        timeout = self.sleep_float
+        next_due = getattr(self.switchboard, 'next_due', None)
+        if next_due is not None:
+            due = next_due()
+            if due is not None:
+                timeout = min(
+                    timeout, max(0, (due - now()).total_seconds()))
+        if self._watching:
+            self.switchboard.wait(timeout)
+        else:
+            time.sleep(timeout)
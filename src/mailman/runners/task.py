@@ -17,22 +17,28 @@
 
 """Task runner."""
 
+import time
 import logging
 
 from datetime import datetime
 from lazr.config import as_timedelta
 from mailman.app.bounces import PENDABLE_LIFETIME
+from mailman.app.lifecycle import mta_generation
 from mailman.config import config
 from mailman.core.runner import Runner
 from mailman.database.transaction import dbconnection, transactional
 from mailman.interfaces.cache import ICacheManager
 from mailman.interfaces.messages import IMessageStore
 from mailman.interfaces.pending import IPendings
-from mailman.interfaces.workflow import IWorkflowStateManager
 from mailman.model.bounce import BounceEvent
+from mailman.model.message import Message
+from mailman.model.pending import Pended
 from mailman.model.requests import _Request
+from mailman.model.workflow import WorkflowState
 from mailman.utilities.datetime import now
+from mailman.utilities.modules import call_name
 from public import public
+from sqlalchemy import exists, func
 from zope.component import getUtility
 
 
@@ -50,10 +56,19 @@ class TaskRunner(Runner):
         super().__init__(name, slice)
         self.lastrun = datetime.min
         self.delay = as_timedelta(config.mailman.run_tasks_every)
+        self.batch_size = int(config.mailman.task_batch_size)
+        self.mta_delay = as_timedelta(
+            config.mta.regenerate_delay).total_seconds()
+        # The MTA generation the MTA support files were regenerated for, and
+        # the last changed generation seen, with when it was first seen.
+        self._mta_regenerated = None
+        self._mta_changed = (None, None)
 
     @transactional
     def _do_periodic(self):
         """Invoked periodically by the run() method in the super class."""
+        if self.mta_delay > 0:
+            self._regenerate_mta()
         if self.lastrun + self.delay > datetime.now():
             return                                    # pragma: nocover
         self.lastrun = datetime.now()
@@ -62,68 +77,119 @@ class TaskRunner(Runner):
         self._evict_expired_bounce_events()
         self._evict_cache()
 
+    def _regenerate_mta(self):
+        # Regenerate the MTA support files once the mailing lists stopped
+        # changing for the delay.  The first check after starting always
+        # regenerates them, since changes may have been made while this
+        # runner wasn't running.
+        generation = mta_generation.get()
+        if generation == self._mta_regenerated:
+            return
+        seen, since = self._mta_changed
+        if generation != seen:
+            self._mta_changed = (generation, time.monotonic())
+            return
+        if time.monotonic() - since < self.mta_delay:
+            return
+        tlog.info('Task runner regenerating the MTA support files')
+        call_name(config.mta.incoming).regenerate()
+        self._mta_regenerated = generation
+
+    def _in_batches(self, function, what):
+        # Call function with the batch size until it returns a smaller count
+        # than that, committing after each batch to keep the transactions
+        # short.  Return the total count.
+        total = 0
+        while True:
+            count = function(self.batch_size)
+            config.db.commit()
+            total += count
+            if count < self.batch_size:
+                return total
+            tlog.info('Task runner %s: %d so far', what, total)
+
     @dbconnection
-    def _get_requests(self, store):
-        # Get (id, token) for all requests.
-        results = store.query(_Request).all()
-        yield from [(result.id, result.data_hash) for result in results]
+    def _delete_orphaned_workflows(self, store, limit):
+        # Delete the workflow states without a pending token.
+        query = store.query(WorkflowState.token).filter(
+            ~exists().where(Pended.token == WorkflowState.token)).limit(limit)
+        tokens = [token for (token,) in query]
+        if len(tokens) > 0:
+            store.query(WorkflowState).filter(
+                WorkflowState.token.in_(tokens)).delete()
+        return len(tokens)
 
     @dbconnection
-    def _delete_request(self, store, id):
-        # Delete the request with id = id.
-        request = (store.query(_Request).get(id))
-        if request is not None:
-            store.delete(request)
+    def _delete_orphaned_requests(self, store, limit):
+        # Delete the requests without a pending token.
+        query = store.query(_Request.id).filter(
+            ~exists().where(Pended.token == _Request.data_hash)).limit(limit)
+        ids = [id for (id,) in query]
+        if len(ids) > 0:
+            store.query(_Request).filter(_Request.id.in_(ids)).delete()
+        return len(ids)
 
     def _evict_pendings(self):
         pendings = getUtility(IPendings)
-        wfmanager = getUtility(IWorkflowStateManager)
-        opendings = pendings.count()
-        owflows = wfmanager.count
-        pendings.evict()
-        count = opendings - pendings.count()
+        count = self._in_batches(pendings.evict, 'evicting expired pendings')
         tlog.info('Task runner evicted %d expired pendings', count)
         # Now delete any orphaned workflow states.
-        for token in wfmanager.get_all_tokens():
-            if pendings.confirm(token, expunge=False) is None:
-                wfmanager.discard(token)
-        count = owflows - wfmanager.count
+        count = self._in_batches(
+            self._delete_orphaned_workflows, 'deleting orphaned workflows')
         tlog.info('Task runner deleted %d orphaned workflows', count)
-        count = 0
-        for id, token in self._get_requests():
-            if pendings.confirm(token, expunge=False) is None:
-                self._delete_request(id)
-                count += 1
+        count = self._in_batches(
+            self._delete_orphaned_requests, 'deleting orphaned requests')
         tlog.info('Task runner deleted %d orphaned requests', count)
         # Also, delete any orphaned messages from the message store.
-        mids = dict()
-        for token, pendable in pendings:
-            if not pendable:
-                continue                                # pragma: nocover
-            mid = pendable.get('_mod_message_id')
-            if mid:
-                mids[mid] = True
-        count = 0
-        messages = getUtility(IMessageStore)
-        for msg in messages.messages:
-            # msg can be None if file is already removed.
-            if msg is not None:
-                mid = msg.get('message-id')
-                if mid not in mids:
-                    messages.delete_message(mid)
-                    count += 1
+        count = self._delete_orphaned_messages()
         tlog.info('Task runner deleted %d orphaned messages', count)
 
     @dbconnection
-    def _evict_expired_bounce_events(self, store):
+    def _delete_orphaned_messages(self, store):
+        # Delete the messages in the message store which are not held for
+        # moderation, going by the message ids in the message table.  Messages
+        # stored while this runs are left alone.
+        last_id = store.query(func.max(Message.id)).scalar()
+        if last_id is None:
+            return 0
+        held = set(
+            message_id for (message_id,) in store.query(
+                Pended.message_id).filter(Pended.message_id.isnot(None)))
+        messages = getUtility(IMessageStore)
         count = 0
-        for entry in store.query(BounceEvent).all():
-            if not entry.processed:
-                continue
-            if entry.timestamp > now() - as_timedelta(PENDABLE_LIFETIME):
-                continue
-            store.delete(entry)
-            count += 1
+        first_id = 0
+        while first_id < last_id:
+            rows = store.query(Message.id, Message.message_id).filter(
+                Message.id > first_id, Message.id <= last_id).order_by(
+                    Message.id).limit(self.batch_size).all()
+            if len(rows) == 0:
+                break
+            for id, message_id in rows:
+                if message_id not in held:
+                    messages.delete_message(message_id)
+                    count += 1
+            config.db.commit()
+            first_id = rows[-1][0]
+            if len(rows) == self.batch_size:
+                tlog.info('Task runner deleting orphaned messages: %d so far',
+                          count)
+        return count
+
+    @dbconnection
+    def _evict_bounce_events(self, store, limit):
+        # Delete the processed bounce events older than the pendable lifetime.
+        query = store.query(BounceEvent.id).filter(
+            BounceEvent.processed == True,              # noqa: E712
+            BounceEvent.timestamp <= now() - as_timedelta(PENDABLE_LIFETIME),
+            ).limit(limit)
+        ids = [id for (id,) in query]
+        if len(ids) > 0:
+            store.query(BounceEvent).filter(BounceEvent.id.in_(ids)).delete()
+        return len(ids)
+
+    def _evict_expired_bounce_events(self):
+        count = self._in_batches(
+            self._evict_bounce_events, 'evicting expired bounce events')
         tlog.info('Task runner evicted %d expired bounce events', count)
 
     def _evict_cache(self):
@@ -18,16 +18,26 @@
 """Tests for the LMTP server."""
 
 import os
+import asyncio
 import smtplib
 import unittest
+import threading
 
+from aiosmtpd.smtp import Envelope
 from datetime import datetime
 from mailman.app.lifecycle import create_list
 from mailman.config import config
 from mailman.database.transaction import transaction
 from mailman.interfaces.domain import IDomainManager
-from mailman.testing.helpers import get_lmtp_client, get_queue_messages
-from mailman.testing.layers import LMTPLayer
+from mailman.interfaces.listmanager import IListManager
+from mailman.runners.lmtp import LMTPHandler, RecipientResolver
+from mailman.testing.helpers import (
+    configuration,
+    get_lmtp_client,
+    get_queue_messages,
+)
+from mailman.testing.layers import ConfigLayer, LMTPLayer
+from unittest.mock import patch
 from zope.component import getUtility
 
 
@@ -315,6 +325,120 @@ Subject: This should be accepted.
         self.assertEqual(items[0].msgdata['listid'], 'test.example.com')
 
 
+class TestRecipientResolver(unittest.TestCase):
+    """Test the resolution of recipient addresses."""
+
+    layer = ConfigLayer
+
+    def setUp(self):
+        self._mlist = create_list('test@example.com')
+        self._resolver = RecipientResolver()
+
+    def test_resolve(self):
+        self.assertEqual(self._resolver.resolve('test@example.com'),
+                         ('test.example.com', None))
+        self.assertEqual(self._resolver.resolve('test-request@example.com'),
+                         ('test.example.com', 'request'))
+        self.assertIsNone(self._resolver.resolve('other@example.com'))
+        self.assertIsNone(self._resolver.resolve('test@example.org'))
+
+    def test_resolved_addresses_are_cached(self):
+        # Addresses are looked up once, including all their VERP variants.
+        with configuration('mta', lmtp_recipient_check_interval='1h'):
+            self._resolver.resolve('test-bounces+anne=example.org@example.com')
+            with patch.object(self._resolver, '_lookup') as lookup:
+                self.assertEqual(
+                    self._resolver.resolve(
+                        'test-bounces+bart=example.org@example.com'),
+                    ('test.example.com', 'bounces'))
+        self.assertFalse(lookup.called)
+
+    def test_deleted_list(self):
+        # Deleting a mailing list invalidates the cache.
+        self._resolver.resolve('test@example.com')
+        getUtility(IListManager).delete(self._mlist)
+        self.assertIsNone(self._resolver.resolve('test@example.com'))
+
+    def test_deleted_domain(self):
+        # Deleting a domain invalidates the cache.
+        self._resolver.resolve('test@example.com')
+        getUtility(IDomainManager).remove('example.com')
+        self.assertIsNone(self._resolver.resolve('test@example.com'))
+
+
+class TestLMTPHandler(unittest.TestCase):
+    """Test the handling of LMTP commands in worker threads."""
+
+    layer = ConfigLayer
+
+    def setUp(self):
+        with transaction():
+            create_list('test@example.com')
+        self._envelope = Envelope()
+        self._envelope.mail_from = 'anne@example.com'
+        self._envelope.rcpt_tos = [
+            'test@example.com', 'test-owner@example.com']
+        self._envelope.content = b"""\
+From: anne@example.com
+To: test@example.com
+Subject: A test
+Message-ID: <ant>
+
+"""
+
+    def _handler(self, workers, max_pending):
+        handler = LMTPHandler(workers, max_pending)
+        self.addCleanup(handler.close)
+        return handler
+
+    def test_workers(self):
+        # Messages are handled in a worker thread, and the time each stage
+        # takes is logged.
+        handler = self._handler(1, 1)
+        threads = []
+        handle_DATA = handler._handle_DATA
+
+        def record_thread(*args):
+            threads.append(threading.current_thread())
+            return handle_DATA(*args)
+
+        with patch.object(handler, '_handle_DATA', record_thread), \
+                patch('mailman.runners.lmtp.slog') as slog:
+            status = asyncio.run(
+                handler.handle_DATA(None, None, self._envelope))
+        self.assertEqual(status, '250 Ok\r\n250 Ok')
+        self.assertNotEqual(threads, [threading.current_thread()])
+        get_queue_messages('in', expected_count=2)
+        message_id, stages = slog.debug.call_args.args[1:]
+        self.assertEqual(message_id, '<ant>')
+        self.assertEqual([stage for stage, seconds in stages.stages],
+                         ['wait', 'parse', 'prepare', 'enqueue'])
+
+    def test_no_workers(self):
+        # Without workers, messages are handled in the event loop.
+        handler = self._handler(0, 0)
+        status = asyncio.run(handler.handle_DATA(None, None, self._envelope))
+        self.assertEqual(status, '250 Ok\r\n250 Ok')
+        get_queue_messages('in', expected_count=2)
+
+    def test_busy(self):
+        # Recipients and messages get temporary failures when too many
+        # commands are pending.
+        handler = self._handler(1, 1)
+        handler._pending = 1
+        status = asyncio.run(handler.handle_RCPT(
+            None, None, Envelope(), 'test@example.com', []))
+        self.assertEqual(
+            status,
+            '451 Requested action aborted: server busy, try again later')
+        status = asyncio.run(handler.handle_DATA(None, None, self._envelope))
+        self.assertEqual(status.split('\r\n'), [
+            '451 Requested action aborted: server busy, try again later',
+            '451 Requested action aborted: server busy, try again later',
+            ])
+        get_queue_messages('in', expected_count=0)
+
+
 class TestBugs(unittest.TestCase):
     """Test some LMTP related bugs."""
 
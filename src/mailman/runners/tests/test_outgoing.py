@@ -74,17 +74,57 @@ Message-Id: <first>
 
     def test_deliver_after(self):
         # When the metadata has a deliver_after key in the future, the runner
-        # will re-enqueue the message rather than delivering it.
+        # will move the message to the retry queue rather than delivering it.
         deliver_after = now() + timedelta(days=10)
         self._msgdata['deliver_after'] = deliver_after
         self._outq.enqueue(self._msg, self._msgdata,
                            to_list=True, listid='test.example.com')
         self._runner.run()
-        items = get_queue_messages('out', expected_count=1)
+        get_queue_messages('out', expected_count=0)
+        items = get_queue_messages('retry', expected_count=1)
         self.assertEqual(items[0].msgdata['deliver_after'], deliver_after)
         self.assertEqual(items[0].msg['message-id'], '<first>')
 
 
+class TestConnectionPooling(unittest.TestCase):
+    """Test the outgoing runner's SMTP connection pool."""
+
+    layer = SMTPLayer
+
+    def setUp(self):
+        self._mlist = create_list('test@example.com')
+        self._outq = config.switchboards['out']
+        self._msg = message_from_string("""\
+From: anne@example.com
+To: test@example.com
+Message-Id: <first>
+
+""")
+
+    def test_connections_are_reused(self):
+        # With a pool, consecutive messages share one SMTP connection, which
+        # is closed once the queue is empty.
+        for i in range(3):
+            self._outq.enqueue(self._msg, {}, listid='test.example.com',
+                               recipients=['bart@example.com'])
+        with configuration('mta', smtp_pool_size=2):
+            runner = make_testable_runner(OutgoingRunner, 'out')
+        runner.run()
+        self.assertEqual(len(list(SMTPLayer.smtpd.messages)), 3)
+        self.assertEqual(SMTPLayer.smtpd.get_connection_count(), 1)
+        self.assertEqual(len(runner._pool), 0)
+
+    def test_no_pool(self):
+        # Without a pool, every message gets its own connection.
+        for i in range(3):
+            self._outq.enqueue(self._msg, {}, listid='test.example.com',
+                               recipients=['bart@example.com'])
+        runner = make_testable_runner(OutgoingRunner, 'out')
+        runner.run()
+        self.assertIsNone(runner._pool)
+        self.assertEqual(SMTPLayer.smtpd.get_connection_count(), 3)
+
+
 captured_mlist = None
 captured_msg = None
 captured_msgdata = None
@@ -434,6 +474,56 @@ Message-Id: <first>
                          as_timedelta(config.mta.delivery_retry_period))
         self.assertEqual(items[0].msgdata['deliver_until'], deliver_until)
         self.assertEqual(items[0].msgdata['recipients'], ['cris@example.com'])
+        # The next attempt is scheduled after the initial retry delay.
+        self.assertEqual(items[0].msgdata['retry_count'], 1)
+        self.assertEqual(
+            items[0].msgdata['deliver_after'],
+            datetime(2005, 8, 1, 7, 49, 23) +
+            as_timedelta(config.mta.delivery_retry_delay))
+
+    @configuration('mta', delivery_retry_delay='10m',
+                   delivery_retry_max_delay='1h')
+    def test_retry_backoff(self):
+        # The delay between attempts doubles, up to a maximum.
+        temporary_failures.append('cris@example.com')
+        start = datetime(2005, 8, 1, 7, 49, 23)
+        msgdata = {}
+        for delay in (10, 20, 40, 60, 60):
+            self._outq.enqueue(self._msg, msgdata, listid='test.example.com')
+            self._runner.run()
+            items = get_queue_messages('retry', expected_count=1)
+            msgdata = items[0].msgdata
+            self.assertEqual(msgdata['deliver_after'],
+                             start + timedelta(minutes=delay))
+            del msgdata['deliver_after']
+
+    @configuration('mta', delivery_retry_delay='1d',
+                   delivery_retry_max_delay='4h')
+    def test_retry_backoff_many_attempts(self):
+        # Many attempts don't overflow the delay, even when the initial
+        # delay is above the maximum.
+        temporary_failures.append('cris@example.com')
+        self._outq.enqueue(self._msg, dict(retry_count=1000),
+                           listid='test.example.com')
+        self._runner.run()
+        items = get_queue_messages('retry', expected_count=1)
+        self.assertEqual(items[0].msgdata['retry_count'], 1001)
+        self.assertEqual(items[0].msgdata['deliver_after'],
+                         datetime(2005, 8, 1, 11, 49, 23))
+
+    @configuration('mta', delivery_retry_delay='15m',
+                   delivery_retry_max_delay='100000d')
+    def test_retry_backoff_huge_maximum(self):
+        # The delay keeps doubling up to a maximum which doesn't cap it before
+        # multiplying it by 2**retry_count would overflow.
+        temporary_failures.append('cris@example.com')
+        self._outq.enqueue(self._msg, dict(retry_count=100),
+                           listid='test.example.com')
+        self._runner.run()
+        items = get_queue_messages('retry', expected_count=1)
+        self.assertEqual(items[0].msgdata['deliver_after'],
+                         datetime(2005, 8, 1, 7, 49, 23) +
+                         timedelta(days=100000))
 
     def test_two_temporary_failures(self):
         # The first time there are temporary failures, the message just gets
@@ -19,6 +19,7 @@
 
 import unittest
 
+from datetime import timedelta
 from mailman.app.lifecycle import create_list
 from mailman.config import config
 from mailman.runners.retry import RetryRunner
@@ -28,6 +29,8 @@ from mailman.testing.helpers import (
     specialized_message_from_string as message_from_string,
 )
 from mailman.testing.layers import ConfigLayer
+from mailman.utilities.datetime import factory, now
+from unittest.mock import patch
 
 
 class TestRetryRunner(unittest.TestCase):
@@ -52,3 +55,24 @@ Message-Id: <first>
         self._retryq.enqueue(self._msg, self._msgdata)
         self._runner.run()
         get_queue_messages('out', expected_count=1)
+
+    def test_message_held_until_due(self):
+        # A message with a deliver_after in the future is only moved to the
+        # outgoing queue once it is due.
+        self._msgdata['deliver_after'] = now() + timedelta(days=1)
+        self._retryq.enqueue(self._msg, self._msgdata)
+        self._runner.run()
+        get_queue_messages('out', expected_count=0)
+        self.assertEqual(len(self._retryq.get_files()), 1)
+        factory.fast_forward(1)
+        self._runner.run()
+        get_queue_messages('out', expected_count=1)
+        get_queue_messages('retry', expected_count=0)
+
+    def test_snooze_until_due(self):
+        # The runner doesn't sleep past the time the next message is due.
+        self._msgdata['deliver_after'] = now() + timedelta(seconds=2)
+        self._retryq.enqueue(self._msg, self._msgdata)
+        with patch('mailman.runners.retry.time.sleep') as sleep:
+            self._runner._snooze(0)
+        sleep.assert_called_once_with(2)
@@ -19,11 +19,13 @@
 
 import unittest
 
+from contextlib import ExitStack
 from datetime import timedelta
 from lazr.config import as_timedelta
 from mailman.app.bounces import PENDABLE_LIFETIME
 from mailman.app.lifecycle import create_list
 from mailman.app.moderator import hold_message
+from mailman.app.tests.test_lifecycle import RecordingMTA
 from mailman.config import config
 from mailman.database.transaction import dbconnection
 from mailman.interfaces.cache import ICacheManager
@@ -34,12 +36,14 @@ from mailman.interfaces.workflow import IWorkflowStateManager
 from mailman.model.bounce import BounceEvent
 from mailman.runners.task import TaskRunner
 from mailman.testing.helpers import (
+    configuration,
     LogFileMark,
     make_testable_runner,
     specialized_message_from_string as mfs,
 )
 from mailman.testing.layers import ConfigLayer
 from mailman.utilities.datetime import factory
+from unittest.mock import patch
 from zope.component import getUtility
 from zope.interface import implementer
 
@@ -193,3 +197,80 @@ second message
         self._runner.run()
         log = mark.read()
         self.assertIn('Task runner evicted 0 expired bounce events', log)
+
+    def test_task_runner_batches(self):
+        # The task runner deletes the records in batches.
+        self._runner.batch_size = 1
+        life = as_timedelta(config.mailman.moderator_request_life)
+        mark = LogFileMark('mailman.task')
+        factory.fast_forward(days=life.days+1)
+        self._runner.run()
+        self.assertEqual(self._pendings.count(), 0)
+        self.assertEqual(self._wfmanager.count, 0)
+        self.assertEqual(self._listrequests.count, 0)
+        self.assertEqual(len(list(self._messages.messages)), 0)
+        log = mark.read()
+        self.assertIn('Task runner evicted 4 expired pendings', log)
+        self.assertIn('Task runner evicting expired pendings: 3 so far', log)
+        self.assertIn('Task runner deleted 2 orphaned workflows', log)
+        self.assertIn('Task runner deleted 2 orphaned requests', log)
+        self.assertIn('Task runner deleted 2 orphaned messages', log)
+        self.assertIn('Task runner deleting orphaned messages: 1 so far', log)
+
+    def test_task_runner_messages_batches(self):
+        # Held messages are kept, whichever batch they are in.
+        self._runner.batch_size = 1
+        self._listrequests.delete_request(self._requestid2)
+        self._runner.run()
+        self.assertIsNotNone(self._messages.get_message_by_id('<msg1>'))
+        self.assertIsNone(self._messages.get_message_by_id('<msg2>'))
+
+
+class TestRegenerateMTA(unittest.TestCase):
+    """Test regenerating the MTA support files after a delay."""
+
+    layer = ConfigLayer
+
+    def setUp(self):
+        RecordingMTA.calls = []
+        resources = ExitStack()
+        self.addCleanup(resources.close)
+        resources.enter_context(configuration(
+            'mta', incoming='mailman.app.tests.test_lifecycle.RecordingMTA',
+            regenerate_delay='10s'))
+        self._time = 1000
+        resources.enter_context(patch(
+            'mailman.runners.task.time.monotonic',
+            side_effect=lambda: self._time))
+        self._runner = make_testable_runner(TaskRunner)
+
+    def _check(self, seconds=0):
+        self._time += seconds
+        self._runner._do_periodic()
+
+    def test_regenerate_on_start(self):
+        # The support files are regenerated once after the runner starts,
+        # after the delay.
+        self._check()
+        self.assertEqual(RecordingMTA.calls, [])
+        self._check(10)
+        self.assertEqual(RecordingMTA.calls, [('regenerate', None)])
+        self._check(10)
+        self.assertEqual(RecordingMTA.calls, [('regenerate', None)])
+
+    def test_regenerate_once_quiet(self):
+        # The support files are regenerated once no list was created or
+        # deleted for the delay.
+        self._check()
+        self._check(10)
+        RecordingMTA.calls = []
+        create_list('ant@example.com')
+        self._check()
+        self._check(5)
+        create_list('bee@example.com')
+        self._check(5)
+        self.assertEqual(RecordingMTA.calls, [])
+        self._check(9)
+        self.assertEqual(RecordingMTA.calls, [])
+        self._check(1)
+        self.assertEqual(RecordingMTA.calls, [('regenerate', None)])
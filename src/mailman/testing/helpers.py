@@ -41,6 +41,8 @@ from mailman.interfaces.member import DeliveryStatus, MemberRole
 from mailman.interfaces.messages import IMessageStore
 from mailman.interfaces.styles import IStyleManager
 from mailman.interfaces.usermanager import IUserManager
+from mailman.model.generation import bump_generations
+from mailman.model.template import template_cache
 from mailman.runners.digest import DigestRunner
 from mailman.utilities.mailbox import Mailbox
 from public import public
@@ -116,7 +118,7 @@ def get_queue_messages(queue_name, sort_on=None, expected_count=None):
     """
     queue = config.switchboards[queue_name]
     messages = []
-    for filebase in queue.files:
+    for filebase in queue.get_files():
         msg, msgdata = queue.dequeue(filebase)
         messages.append(_Bag(msg=msg, msgdata=msgdata))
         queue.finish(filebase)
@@ -476,6 +478,9 @@ def reset_the_world():
     """
     # Reset the database between tests.
     config.db._reset()
+    # Tell all processes to drop the data they cached from the database.
+    with transaction():
+        bump_generations()
     # Remove any digest files and members.txt file (for the file-recips
     # handler) in the lists' data directories.
     for dirpath, dirnames, filenames in os.walk(config.LIST_DATA_DIR):
@@ -489,8 +494,8 @@ def reset_the_world():
     # Clear out messages in the message store.
     message_store = getUtility(IMessageStore)
     with transaction():
-        for message in message_store.messages:
-            message_store.delete_message(message['message-id'])
+        for row in list(message_store.metadata):
+            message_store.delete_message(row.message_id)
     # Delete any other residual messages.
     for dirpath, dirnames, filenames in os.walk(config.MESSAGES_DIR):
         for filename in filenames:
@@ -503,6 +508,8 @@ def reset_the_world():
     getUtility(IStyleManager).populate()
     # Remove all dynamic header-match rules.
     config.chains['header-match'].flush()
+    # Forget the templates cached by this process.
+    template_cache.clear()
     # Remove cached organizational domain suffix file.
     from mailman.rules.dmarc import LOCAL_FILE_NAME
     suffix_file = os.path.join(config.VAR_DIR, LOCAL_FILE_NAME)
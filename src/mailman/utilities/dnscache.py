@@ -0,0 +1,108 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""A process wide cache of DNS answers."""
+
+import time
+import logging
+import dns.resolver
+
+from dns.exception import DNSException
+from lazr.config import as_timedelta
+from mailman.config import config
+from public import public
+
+
+log = logging.getLogger('mailman.error')
+
+# The cache shared by all the resolvers in this process, and the [dns]
+# settings it was created with.
+_cache = None
+_settings = None
+
+
+@public
+class DNSCache(dns.resolver.LRUCache):
+    """A bounded cache of DNS answers.
+
+    Answers are cached for the TTL of their records, but no longer than a
+    maximum.  The resolver caches negative answers too, i.e. NXDOMAIN and
+    NoAnswer, for the TTL given by the zone's SOA record.  The `hits()` and
+    `misses()` methods return the cache's counters.
+    """
+
+    def __init__(self, max_size, max_ttl):
+        """Create a cache.
+
+        :param max_size: The maximum number of answers to cache.
+        :type max_size: int
+        :param max_ttl: The maximum number of seconds to cache an answer.
+        :type max_ttl: float
+        """
+        super().__init__(max_size)
+        self.max_ttl = max_ttl
+
+    def put(self, key, value):
+        """See `dns.resolver.LRUCache`."""
+        value.expiration = min(value.expiration, time.time() + self.max_ttl)
+        super().put(key, value)
+
+
+@public
+def get_dns_cache():
+    """Return the process wide DNS cache.
+
+    :return: The cache, or None if caching is disabled by setting
+        `[dns]cache_size` to 0.
+    :rtype: `DNSCache`
+    """
+    global _cache, _settings
+    settings = (int(config.dns.cache_size),
+                as_timedelta(config.dns.max_ttl).total_seconds())
+    if settings != _settings:
+        size, max_ttl = settings
+        _cache = (DNSCache(size, max_ttl)
+                  if size > 0 and max_ttl > 0
+                  else None)
+        _settings = settings
+    return _cache
+
+
+@public
+def make_resolver():
+    """Return a new resolver using the process wide DNS cache.
+
+    :rtype: `dns.resolver.Resolver`
+    """
+    resolver = dns.resolver.Resolver()
+    resolver.cache = get_dns_cache()
+    return resolver
+
+
+@public
+def cache_default_resolver():
+    """Make the default resolver use the process wide DNS cache.
+
+    The default resolver is the one used by third party libraries calling
+    `dns.resolver.resolve()`, such as the ones doing DKIM and ARC checks.
+    """
+    try:
+        resolver = dns.resolver.get_default_resolver()
+    except DNSException as error:
+        log.error('Unable to configure the default DNS resolver: %s', error)
+        return
+    resolver.cache = get_dns_cache()
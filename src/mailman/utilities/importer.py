@@ -51,6 +51,7 @@ from mailman.interfaces.nntp import NewsgroupModeration
 from mailman.interfaces.template import ITemplateLoader
 from mailman.interfaces.usermanager import IUserManager
 from mailman.model.roster import RosterVisibility
+from mailman.model.template import template_cache
 from mailman.utilities.filesystem import makedirs
 from mailman.utilities.i18n import search
 from public import public
@@ -565,6 +566,8 @@ def import_config_pck(mlist, config_dict):
         makedirs(os.path.dirname(filepath))
         with open(filepath, 'w', encoding='utf-8') as fp:
             fp.write(text)
+        # Make sure all processes notice the new template.
+        template_cache.invalidate()
     # Import rosters.
     regulars_set = set(config_dict.get('members', {}))
     digesters_set = set(config_dict.get('digest_members', {}))
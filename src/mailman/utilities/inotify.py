@@ -0,0 +1,133 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Watch a directory for new files with Linux inotify."""
+
+import os
+import errno
+import ctypes
+import select
+import struct
+import ctypes.util
+
+from public import public
+
+
+# From <sys/inotify.h>.
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+# struct inotify_event {int wd; uint32_t mask, cookie, len; char name[];}
+EVENT = struct.Struct('iIII')
+# Enough for a burst of events on typical queue file names.
+BUFFER_SIZE = 64 * 1024
+
+_libc = None
+
+
+def _get_libc():
+    global _libc
+    if _libc is None:
+        try:
+            libc = ctypes.CDLL(
+                ctypes.util.find_library('c'), use_errno=True)
+            libc.inotify_init1
+            libc.inotify_add_watch
+        except (OSError, AttributeError):
+            raise OSError(errno.ENOSYS, 'inotify is not available')
+        libc.inotify_add_watch.argtypes = [
+            ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        _libc = libc
+    return _libc
+
+
+@public
+class DirectoryWatcher:
+    """Report the files which appear in a directory.
+
+    Files count as appearing when they are renamed into the directory or
+    closed after being written.  Nothing is read from the directory itself.
+    """
+
+    def __init__(self, directory, mask=IN_MOVED_TO):
+        """Start watching a directory.
+
+        :param directory: The directory to watch.
+        :type directory: str
+        :param mask: The inotify events to watch for.
+        :type mask: int
+        :raises OSError: When inotify is not available or the directory
+            can't be watched.
+        """
+        libc = _get_libc()
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(error, os.strerror(error), directory)
+        self.directory = directory
+        self._fd = fd
+        self._poll = select.poll()
+        self._poll.register(fd, select.POLLIN)
+
+    def read(self, timeout=None):
+        """Wait for files to appear.
+
+        :param timeout: The maximum number of seconds to wait, or None to
+            wait forever.
+        :type timeout: float
+        :return: The names of the files which appeared, which is empty if
+            the timeout expired.  None is returned when events were lost
+            because the kernel's queue overflowed; callers must then look at
+            the directory themselves.
+        :rtype: list of str, or None
+        """
+        if self._fd is None:
+            raise ValueError('Watcher is closed')
+        if not self._poll.poll(None if timeout is None else timeout * 1000):
+            return []
+        try:
+            data = os.read(self._fd, BUFFER_SIZE)
+        except BlockingIOError:                     # pragma: nocover
+            return []
+        names = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if mask & IN_IGNORED:
+                # The directory itself went away.
+                continue
+            names.append(os.fsdecode(name))
+        return names
+
+    def close(self):
+        """Stop watching the directory."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,92 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of GNU Mailman.
+#
+# GNU Mailman is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# GNU Mailman is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# GNU Mailman.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Test the DNS cache."""
+
+import time
+import unittest
+
+from dns.rdataclass import IN
+from dns.rdatatype import TXT
+from mailman.testing.helpers import configuration
+from mailman.testing.layers import ConfigLayer
+from mailman.utilities.dnscache import (
+    cache_default_resolver,
+    DNSCache,
+    get_dns_cache,
+    make_resolver,
+)
+from types import SimpleNamespace
+from unittest.mock import patch
+
+
+class TestDNSCache(unittest.TestCase):
+    layer = ConfigLayer
+
+    def _answer(self, ttl):
+        return SimpleNamespace(expiration=time.time() + ttl)
+
+    def test_ttl(self):
+        # Answers are cached for their TTL.
+        cache = DNSCache(10, 60)
+        key = ('_dmarc.example.com.', TXT, IN)
+        answer = self._answer(30)
+        cache.put(key, answer)
+        self.assertIs(cache.get(key), answer)
+        answer.expiration = time.time() - 1
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(cache.hits(), 1)
+        self.assertEqual(cache.misses(), 1)
+
+    def test_max_ttl(self):
+        # Answers are not cached for longer than the maximum TTL.
+        cache = DNSCache(10, 60)
+        answer = self._answer(86400)
+        cache.put(('example.com.', TXT, IN), answer)
+        self.assertLessEqual(answer.expiration, time.time() + 60)
+
+    def test_max_size(self):
+        cache = DNSCache(2, 60)
+        for name in ('a.example.com.', 'b.example.com.', 'c.example.com.'):
+            cache.put((name, TXT, IN), self._answer(30))
+        self.assertIsNone(cache.get(('a.example.com.', TXT, IN)))
+        self.assertIsNotNone(cache.get(('c.example.com.', TXT, IN)))
+
+    def test_shared_cache(self):
+        # All the resolvers share the process wide cache.
+        cache = get_dns_cache()
+        self.assertIsInstance(cache, DNSCache)
+        self.assertIs(make_resolver().cache, cache)
+        self.assertIs(make_resolver().cache, cache)
+
+    def test_settings(self):
+        with configuration('dns', cache_size=5, max_ttl='10m'):
+            cache = get_dns_cache()
+            self.assertEqual(cache.max_size, 5)
+            self.assertEqual(cache.max_ttl, 600)
+
+    def test_disabled(self):
+        with configuration('dns', cache_size=0):
+            self.assertIsNone(get_dns_cache())
+            self.assertIsNone(make_resolver().cache)
+
+    def test_default_resolver(self):
+        resolver = SimpleNamespace(cache=None)
+        with patch('dns.resolver.get_default_resolver',
+                   return_value=resolver):
+            cache_default_resolver()
+        self.assertIs(resolver.cache, get_dns_cache())